@@ -0,0 +1,93 @@
+'''
+Benchmark: flattening the v2.0 device catalog.
+
+Compares the column-wise extractor used by the fleet extractors
+(_type_df_from_devices) with the former chain of
+device_df['properties'].apply(pd.Series) and
+properties_df['_location_fixed'].apply(pd.Series) expansions.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_catalog_flatten.py [--devices 10000] [--repeat 3]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_python_api_test_HTTP import _type_df_from_devices
+
+DEVICE_TYPES = ['pile-temp-and-cercospora-monitor', 'low-cost-water-sampler', 'weather-station']
+
+def legacy_type_df(devices, device_type='pile-temp-and-cercospora-monitor'):
+    '''
+    The former get_all_type_var_ids_and_location device expansion.
+    '''
+    device_df = pd.DataFrame(devices)[['name', 'id', 'properties']]
+    properties_df = device_df['properties'].apply(pd.Series)
+    locations_df = properties_df['_location_fixed'].apply(pd.Series)
+    clean_df = device_df.join(properties_df)[['_device_type', 'name', 'id']]
+    clean_df = clean_df.join(locations_df)[['_device_type', 'lat', 'lng', 'name', 'id']]
+    return clean_df[clean_df['_device_type'] == device_type]
+
+def make_devices(count=10000, seed=0):
+    '''
+    Synthetic v2.0 device listing with the fields returned by Ubidots.
+    '''
+    rng = random.Random(seed)
+    devices = []
+    for i in range(count):
+        devices.append({
+            'id': f'{i:024x}',
+            'label': f'device-{i}',
+            'name': f'Device {i}',
+            'description': '',
+            'isActive': True,
+            'lastActivity': 1700000000000 + i,
+            'createdAt': '2023-01-01T00:00:00Z',
+            'tags': [],
+            'variablesCount': 15,
+            'properties': {
+                '_device_type': rng.choice(DEVICE_TYPES),
+                '_location_type': 'manual',
+                '_location_fixed': {'lat': rng.uniform(40, 46), 'lng': rng.uniform(-109, -103)},
+                '_icon': 'cloud',
+                '_color': '#EA6F4F',
+            },
+        })
+    return devices
+
+def best_time(func, devices, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(devices)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--devices', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    devices = make_devices(count=args.devices)
+    print(f"{args.devices} devices")
+    legacy_time, legacy_df = best_time(legacy_type_df, devices, repeat=args.repeat)
+    print(f"apply(pd.Series):  {legacy_time:8.3f} s")
+    new_time, new_df = best_time(lambda d: _type_df_from_devices(d, locations=True), devices,
+                                 repeat=args.repeat)
+    print(f"column-wise:       {new_time:8.3f} s")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+    # Both must select the same devices with the same values
+    pd.testing.assert_frame_equal(legacy_df.reset_index(drop=True), new_df, check_dtype=False)
+    print("outputs match")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+'''
+Benchmark: the client's entry points against the local mock server.
+
+Runs get_device_data, get_type_data, get_device_resampled and
+get_all_type_var_ids_and_location (plus the bulk and compact variants)
+against a MockUbidotsServer with a synthetic fleet, and reports for each: requests made, bytes transferred,
+wall time and peak traced memory.
+
+Results can be saved as JSON and compared with a previous run; requests and
+bytes must not grow, and wall time and memory must stay within --tolerance.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_client.py [--devices 10] [--variables 15] [--values 5000]
+                                      [--latency 0.02] [--save results.json]
+                                      [--compare baseline.json] [--tolerance 0.25]
+'''
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_mock_server import MockFleet, MockUbidotsServer
+from ubidots_python_api_test_HTTP import UbidotsClient
+
+DEVICE_TYPE = 'pile-temp-and-cercospora-monitor'
+
+def scenarios(device_id, last_values):
+    '''
+    :return: list of (name, function of a client) pairs
+    '''
+    return [
+        ('get_device_data', lambda c: c.get_device_data(device_id=device_id, last_values=last_values)),
+        ('get_device_data bulk', lambda c: c.get_device_data(device_id=device_id, last_values=last_values,
+                                                             bulk=True)),
+        ('get_type_data', lambda c: c.get_type_data(device_type=DEVICE_TYPE, last_values=last_values)),
+        ('get_type_data bulk', lambda c: c.get_type_data(device_type=DEVICE_TYPE, last_values=last_values,
+                                                         bulk=True)),
+        ('get_type_data compact', lambda c: c.get_type_data(device_type=DEVICE_TYPE, last_values=last_values,
+                                                            compact=True)),
+        ('get_device_resampled', lambda c: c.get_device_resampled(device_id=device_id, period='1H',
+                                                                  aggregations=('mean', 'min', 'max'))),
+        ('get_all_type_var_ids_and_location', lambda c: c.get_all_type_var_ids_and_location(device_type=DEVICE_TYPE)),
+    ]
+
+def measure(server, func):
+    '''
+    Runs func on a fresh client (no catalog cache, no rate limit) once timed and once traced.
+    :return: dict with requests, bytes_out, bytes_in, wall time in seconds and peak memory in MB
+    '''
+    def run():
+        func(UbidotsClient(token='benchmark', endpoint=server.url, rate_limit=None))
+
+    server.stats.reset()
+    start = time.perf_counter()
+    run()
+    wall = time.perf_counter() - start
+    stats = server.stats.snapshot()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return {'requests': stats['requests'], 'bytes_out': stats['bytes_out'],
+            'bytes_in': stats['bytes_in'], 'wall': wall, 'peak_mb': peak}
+
+def compare(results, baseline, tolerance):
+    '''
+    :return: list of regression messages (empty if none)
+    '''
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in ('requests', 'bytes_out'):
+            if current[key] > previous[key]:
+                regressions.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+        for key in ('wall', 'peak_mb'):
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {previous[key]:.3f} -> {current[key]:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--devices', type=int, default=10)
+    parser.add_argument('--variables', type=int, default=15)
+    parser.add_argument('--values', type=int, default=5000, help='values per variable on the server')
+    parser.add_argument('--last-values', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every response')
+    parser.add_argument('--only', nargs='*', help='names of the scenarios to run')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative growth of wall time and peak memory')
+    args = parser.parse_args()
+
+    fleet = MockFleet(devices=args.devices, variables=args.variables, values=args.values)
+    results = {}
+    print(f"{args.devices} devices x {args.variables} variables x {args.values} values, "
+          f"latency {args.latency * 1000:.0f} ms")
+    print(f"{'entry point':36} {'requests':>8} {'MB out':>8} {'KB in':>8} {'wall s':>8} {'peak MB':>8}")
+    with MockUbidotsServer(fleet, latency=args.latency) as server:
+        for name, func in scenarios(fleet.devices[0]['id'], args.last_values):
+            if args.only and name not in args.only:
+                continue
+            result = measure(server, func)
+            results[name] = result
+            print(f"{name:36} {result['requests']:8d} {result['bytes_out'] / 2**20:8.2f} "
+                  f"{result['bytes_in'] / 2**10:8.1f} {result['wall']:8.3f} {result['peak_mb']:8.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+if __name__ == '__main__':
+    main()
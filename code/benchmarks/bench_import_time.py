@@ -0,0 +1,83 @@
+'''
+Benchmark: import time of the client's light and heavy paths.
+
+Runs each scenario in a fresh interpreter with "python -X importtime" and sums
+the cumulative time of the modules it imports (interpreter startup excluded).
+A scenario fails if it exceeds its budget, or if a light path (token check,
+device listing) imports pandas or numpy.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_import_time.py [--repeat 5] [--scale 1.0]
+'''
+import argparse
+import os
+import subprocess
+import sys
+
+CODE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY_MODULES = ('pandas', 'numpy')
+
+# (name, code run in the fresh interpreter, budget in ms, whether pandas/numpy may be imported)
+SCENARIOS = [
+    ('import ubidots_python_api_test_HTTP', 'import ubidots_python_api_test_HTTP', 60, False),
+    ('token check', 'import ubidots_python_api_test_HTTP as u; u._validate_token', 250, False),
+    ('device listing (cli devices)', 'from ubidots_http.cli import main, _write_devices', 250, False),
+    ('DataFrame path (get_type_data)',
+     'import ubidots_python_api_test_HTTP as u; u.get_type_data; u._merge_var_dfs', 800, True),
+]
+
+def import_times(code):
+    '''
+    :return: list of (module name, cumulative microseconds, whether it is a top-level import)
+             for every module imported by code
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=CODE_DIR,
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # One leading space marks a top-level import; nested imports are indented further
+        times.append((name.strip(), int(cumulative), not name.startswith('  ')))
+    return times
+
+def measure(code, startup, repeat=5):
+    '''
+    :param startup: names of the modules imported by the interpreter on its own
+    :return: tuple of (best import time in ms, set of top-level package names imported)
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        times = [t for t in import_times(code) if t[0] not in startup]
+        best = min(best, sum(us for _, us, top in times if top) / 1000)
+    return best, {name.split('.')[0] for name, _, _ in times}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplier of every budget (e.g. 2 on a slow machine)')
+    args = parser.parse_args()
+
+    startup = {name for name, _, _ in import_times('pass')}
+    failures = []
+    print(f"{'scenario':36} {'ms':>8} {'budget':>8}  heavy modules")
+    for name, code, budget, heavy_allowed in SCENARIOS:
+        ms, modules = measure(code, startup, repeat=args.repeat)
+        budget *= args.scale
+        heavy = sorted(set(HEAVY_MODULES) & modules)
+        print(f"{name:36} {ms:8.1f} {budget:8.0f}  {', '.join(heavy) or '-'}")
+        if ms > budget:
+            failures.append(f"{name}: {ms:.1f} ms over the {budget:.0f} ms budget")
+        if heavy and not heavy_allowed:
+            failures.append(f"{name}: imports {', '.join(heavy)}")
+
+    for message in failures:
+        print(f"OVER BUDGET {message}")
+    if failures:
+        sys.exit(1)
+    print("all scenarios within budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+Benchmark: daily infection values of a fleet over a season.
+
+Builds a synthetic get_type_data frame (rh and t every --interval minutes for
+--devices devices over --days days), then times a full recompute with
+daily_infection_values and an incremental InfectionRisk.update with the values
+of the last day only. Both must give the same table, and the full recompute
+must stay within --budget seconds. The DIV table is read from --div-table (a CSV
+in the layout of InfectionRisk's div_table); without it, a made-up placeholder
+table is used, which is fine for timing but gives meaningless DIVs.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_infection_risk.py [--devices 100] [--days 153] [--interval 15]
+                                              [--repeat 3] [--budget 1.0] [--div-table path.csv]
+'''
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_http.risk import InfectionRisk, daily_infection_values
+
+START_MS = 1714521600000 # 2024-05-01 00:00 UTC
+
+def make_fleet_frame(devices=100, days=153, interval=15, seed=0):
+    '''
+    Synthetic wide frame in the get_type_data layout: humid nights and warm days, wetter on
+    some days than others, with a different humidity and temperature offset per device so
+    that the DIVs vary.
+    '''
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(START_MS, START_MS + days * 86400000, interval * 60000)
+    hour = (timestamps // 3600000 - 6) % 24 # roughly local solar time
+    day = (timestamps - START_MS) // 86400000
+    frames = []
+    for d in range(devices):
+        rh_offset, t_offset = rng.uniform(-4, 4), rng.uniform(-3, 3)
+        wet_days = rng.normal(0, 8, days)[day]
+        rh = 84 + rh_offset + wet_days + 12 * np.cos(hour / 24 * 2 * np.pi) + rng.normal(0, 3, len(timestamps))
+        t = 25 + t_offset - 6 * np.cos(hour / 24 * 2 * np.pi) + rng.normal(0, 1, len(timestamps))
+        frames.append(pd.DataFrame({'Timestamp': timestamps, 'rh': np.clip(rh, 0, 100), 't': t,
+                                    'name': f'Device {d}'}))
+    return pd.concat(frames, ignore_index=True)
+
+def placeholder_div_table(max_div=7):
+    '''
+    Made-up DIV table for timing only: the hours needed fall with the temperature and rise
+    with the DIV. It is not an agronomic reference.
+    '''
+    temps_f = np.arange(60, 86, 2)
+    hours = np.ceil(22 - (temps_f[:, None] - 60) * 0.75 + np.arange(max_div) * 3)
+    table = pd.DataFrame(hours, index=temps_f, columns=range(1, max_div + 1))
+    return table.where(table <= 24)
+
+def best_time(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--days', type=int, default=153)
+    parser.add_argument('--interval', type=int, default=15, help='minutes between two values')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=1.0, help='max seconds of the full recompute')
+    parser.add_argument('--div-table', help='CSV file of the DIV table (default: a placeholder table)')
+    args = parser.parse_args()
+
+    div_table = pd.read_csv(args.div_table, index_col=0) if args.div_table else placeholder_div_table()
+
+    df = make_fleet_frame(devices=args.devices, days=args.days, interval=args.interval)
+    print(f"{args.devices} devices x {args.days} days, {len(df)} rows")
+    full_time, full_df = best_time(lambda: daily_infection_values(df, div_table), repeat=args.repeat)
+    print(f"full recompute:      {full_time:8.3f} s")
+
+    last_day = df['Timestamp'] >= df['Timestamp'].max() - 86400000
+    def incremental():
+        risk = InfectionRisk(div_table)
+        risk.update(df[~last_day])
+        start = time.perf_counter()
+        risk.update(df[last_day])
+        return time.perf_counter() - start, risk.daily
+    update_time, update_df = min((incremental() for _ in range(args.repeat)), key=lambda r: r[0])
+    print(f"incremental update:  {update_time:8.3f} s ({int(last_day.sum())} new rows)")
+    print(f"daily infection values: {full_df['div'].value_counts().sort_index().to_dict()}")
+
+    pd.testing.assert_frame_equal(full_df, update_df, check_dtype=False)
+    print("outputs match")
+    if full_time > args.budget:
+        print(f"OVER BUDGET full recompute {full_time:.3f} s over {args.budget:.1f} s")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+'''
+Benchmark: parsing a large v1.6 values CSV response.
+
+Compares the former path (decode the body to a str, wrap it in StringIO and run
+pandas' default CSV reader) with _var_df_from_csv, which reads the raw bytes with
+pandas by default, or with pyarrow's multithreaded CSV reader into an Arrow-backed
+DataFrame when arrow=True.
+
+Parse time is the best of --repeat runs. Peak memory is measured once per parser
+in a fresh interpreter: memory traced by tracemalloc (Python objects and numpy)
+plus the peak of Arrow's memory pool, on top of the response body itself.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_value_parsing.py [--rows 1000000] [--repeat 3]
+'''
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import StringIO
+
+import pandas as pd
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_http.frames import _var_df_from_csv
+
+START_MS = 1717200000000 # 2024-06-01 00:00 UTC
+
+def make_payload(rows=1000000, label='air-temperature', seed=0):
+    '''
+    Synthetic values CSV in the layout returned by /api/v1.6/variables/<id>/values/?format=csv,
+    newest values first, with a JSON Context on some rows.
+    :return: body of the response as bytes
+    '''
+    rng = random.Random(seed)
+    lines = [f'Timestamp,Human readable date (UTC),{label},Context']
+    for i in range(rows, 0, -1):
+        timestamp = START_MS + i * 60000
+        date = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp // 1000))
+        context = '"{""source"": ""lora""}"' if i % 10 == 0 else '{}'
+        lines.append(f'{timestamp},{date},{rng.uniform(-5, 35):.3f},{context}')
+    return ('\n'.join(lines) + '\n').encode()
+
+def legacy_var_df(content):
+    '''
+    The former get_var_df parsing: req.text, then pd.read_csv(StringIO(text)).
+    '''
+    return pd.read_csv(StringIO(content.decode()), sep=',')
+
+PARSERS = {'str + StringIO + pandas': legacy_var_df,
+           'bytes + pandas (default)': _var_df_from_csv,
+           'bytes + pyarrow (Arrow-backed)': lambda content: _var_df_from_csv(content, arrow=True)}
+
+def best_time(func, content, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def peak_memory(parser, rows):
+    '''
+    Runs one parser in a fresh interpreter, so Arrow's pool peak only covers that parser.
+    :return: peak memory in MB above the response body
+    '''
+    result = subprocess.run([sys.executable, __file__, '--rows', str(rows), '--measure', parser],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])['peak_mb']
+
+def measure(parser, rows):
+    '''
+    Child side of peak_memory: prints the peak memory of parsing the payload as JSON.
+    '''
+    import pyarrow as pa
+    content = make_payload(rows=rows)
+    pool = pa.default_memory_pool()
+    arrow_base = pool.max_memory()
+    tracemalloc.start()
+    df = PARSERS[parser](content)
+    traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(json.dumps({'peak_mb': (traced + pool.max_memory() - arrow_base) / 2**20, 'rows': len(df)}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--measure', choices=PARSERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        return measure(args.measure, args.rows)
+
+    content = make_payload(rows=args.rows)
+    print(f"{args.rows} values, {len(content) / 2**20:.1f} MB body")
+    print(f"{'parser':32} {'parse s':>8} {'peak MB':>8}")
+    results = {}
+    for name, func in PARSERS.items():
+        seconds, df = best_time(func, content, repeat=args.repeat)
+        results[name] = df
+        print(f"{name:32} {seconds:8.3f} {peak_memory(name, args.rows):8.1f}")
+
+    # All must read the same values
+    legacy_df, bytes_df, arrow_df = results.values()
+    pd.testing.assert_frame_equal(legacy_df, bytes_df)
+    pd.testing.assert_frame_equal(legacy_df, arrow_df.astype(legacy_df.dtypes.to_dict()))
+    print("outputs match")
+
+if __name__ == '__main__':
+    main()
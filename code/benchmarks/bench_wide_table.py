@@ -0,0 +1,115 @@
+'''
+Benchmark: building a device's wide table from its variables' values.
+
+Compares the single-pass builder used by get_device_data (_merge_var_dfs) with
+the former chain of pairwise outer merges on
+['Timestamp', 'Human readable date (UTC)', 'Context'], then checks that both
+give the same table on the timed values and on values with duplicated
+timestamps, differing Context and non-numeric values.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_wide_table.py [--variables 20] [--rows 100000] [--repeat 3]
+'''
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_python_api_test_HTTP import _merge_var_dfs
+
+def legacy_merge(dfs):
+    '''
+    The former get_device_data merge: N-1 sequential outer merges on three keys.
+    '''
+    return reduce(lambda left, right:
+                  pd.merge(left, right,
+                           on=['Timestamp', 'Human readable date (UTC)', 'Context'],
+                           how='outer'),
+                  dfs)
+
+def make_var_dfs(variables=20, rows=100000, seed=0):
+    '''
+    Synthetic values of one device: every variable reports on a shared one-minute
+    clock, each with about 5% of its readings missing.
+    :return: list of DataFrames in the get_var_df layout
+    '''
+    rng = np.random.default_rng(seed)
+    clock = 1700000000000 + np.arange(int(rows * 1.05), dtype='int64') * 60000
+    dfs = []
+    for i in range(variables):
+        timestamps = np.sort(rng.choice(clock, size=rows, replace=False))
+        dfs.append(pd.DataFrame({
+            'Timestamp': timestamps,
+            'Human readable date (UTC)': pd.to_datetime(timestamps, unit='ms', utc=True)
+                                          .strftime('%Y-%m-%d %H:%M:%S'),
+            f'var{i}': rng.normal(20, 5, size=rows),
+            'Context': '{}',
+        }))
+    return dfs
+
+def edge_case_var_dfs(rows=1000, seed=0):
+    '''
+    Small values of one device that the single pass can't take as they are.
+    :return: dictionary of case name -> list of DataFrames in the get_var_df layout
+    '''
+    dfs = make_var_dfs(variables=3, rows=rows, seed=seed)
+    duplicated = [df.copy() for df in dfs]
+    duplicated[1] = pd.concat([duplicated[1], duplicated[1].iloc[[0, 5, 5]]]).sort_values('Timestamp', kind='stable')
+    context = [df.copy() for df in dfs]
+    context[2].loc[context[2].index[::7], 'Context'] = '{"source": "lora"}'
+    strings = [df.copy() for df in dfs]
+    strings[0] = strings[0].astype({'var0': object})
+    strings[0].loc[strings[0].index[::11], 'var0'] = 'oops'
+    return {'duplicated timestamps': duplicated, 'differing Context': context, 'non-numeric values': strings}
+
+def assert_same_table(legacy_df, new_df):
+    legacy_df = legacy_df.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(legacy_df[new_df.columns], new_df, check_dtype=False)
+
+def measure(func, dfs, repeat=3):
+    '''
+    :return: (best wall time in seconds, peak traced memory in MB, result)
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(dfs)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(dfs)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return best, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--variables', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    dfs = make_var_dfs(variables=args.variables, rows=args.rows)
+    print(f"{args.variables} variables x {args.rows} rows")
+    legacy_time, legacy_peak, legacy_df = measure(legacy_merge, dfs, repeat=args.repeat)
+    print(f"reduce(pd.merge): {legacy_time:8.3f} s  peak {legacy_peak:8.1f} MB")
+    new_time, new_peak, new_df = measure(_merge_var_dfs, dfs, repeat=args.repeat)
+    print(f"single pass:      {new_time:8.3f} s  peak {new_peak:8.1f} MB")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+    # Both builders must produce the same table
+    assert_same_table(legacy_df, new_df)
+    for case, case_dfs in edge_case_var_dfs().items():
+        assert_same_table(legacy_merge(case_dfs), _merge_var_dfs(case_dfs))
+        print(f"outputs match with {case}")
+    print("outputs match")
+
+if __name__ == '__main__':
+    main()
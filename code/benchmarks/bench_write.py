@@ -0,0 +1,94 @@
+'''
+Benchmark: uploading values with post_device_data against the local mock server.
+
+Uploads a synthetic wide frame (--values timestamps x --variables variables)
+in buffered multi-variable, multi-timestamp requests, and compares it with one
+POST per value (timed on --sample values and extrapolated). Reports requests,
+bytes sent, wall time and values per second for each.
+
+Usage (from the 'code' folder):
+    python benchmarks/bench_write.py [--values 200000] [--variables 5] [--latency 0.05]
+                                     [--batch-size 1000] [--max-connections 16]
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the 'code' folder to the system path to import the script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_mock_server import MockFleet, MockUbidotsServer
+from ubidots_python_api_test_HTTP import UbidotsClient
+
+START_MS = 1717200000000 # 2024-06-01 00:00 UTC
+
+def make_frame(values=200000, variables=5, seed=0):
+    '''
+    Synthetic wide frame in the get_device_data layout, one value per minute and variable.
+    '''
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'Timestamp': START_MS + np.arange(values, dtype='int64') * 60000})
+    for v in range(variables):
+        df[f'derived-{v}'] = rng.normal(20, 5, values).round(3)
+    return df
+
+def per_value(server, client, device_label, df, sample):
+    '''
+    The former way: one POST per value, timed on the first sample values.
+    :return: seconds per value
+    '''
+    url = f"{server.url}/api/v1.6/devices/{device_label}/"
+    labels = [label for label in df.columns if label != 'Timestamp']
+    start = time.perf_counter()
+    for i in range(sample):
+        label = labels[i % len(labels)]
+        row = df.iloc[i // len(labels)]
+        resp = client.session.request("POST", url, headers=client.headers,
+                                      json={label: {'value': float(row[label]), 'timestamp': int(row['Timestamp'])}})
+        resp.raise_for_status()
+    return (time.perf_counter() - start) / sample
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--values', type=int, default=200000, help='timestamps in the frame')
+    parser.add_argument('--variables', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--max-connections', type=int, default=16)
+    parser.add_argument('--sample', type=int, default=50, help='values sent one per request')
+    args = parser.parse_args()
+
+    df = make_frame(values=args.values, variables=args.variables)
+    total = args.values * args.variables
+    fleet = MockFleet(devices=1, variables=1, values=1)
+    device_label = fleet.devices[0]['label']
+    print(f"{total} values ({args.values} timestamps x {args.variables} variables), "
+          f"latency {args.latency * 1000:.0f} ms")
+    print(f"{'method':28} {'requests':>9} {'MB sent':>8} {'wall s':>9} {'values/s':>10}")
+    with MockUbidotsServer(fleet, latency=args.latency) as server:
+        client = UbidotsClient(token='benchmark', endpoint=server.url, rate_limit=None,
+                               max_connections=args.max_connections)
+        seconds = per_value(server, client, device_label, df, args.sample)
+        print(f"{'one POST per value (est.)':28} {total:9d} {'':>8} {seconds * total:9.1f} {1 / seconds:10.0f}")
+
+        server.stats.reset()
+        start = time.perf_counter()
+        sent = client.post_device_data(df, device_label=device_label, batch_size=args.batch_size,
+                                       max_requests=args.max_connections)
+        wall = time.perf_counter() - start
+        stats = server.stats.snapshot()
+        print(f"{'buffered post_device_data':28} {stats['requests']:9d} {stats['bytes_in'] / 2**20:8.1f} "
+              f"{wall:9.1f} {sent / wall:10.0f}")
+
+    written = server.written[device_label]
+    assert sent == total and all(len(written[label]) == args.values for label in df.columns[1:]), \
+        json.dumps({label: len(values) for label, values in written.items()})
+    print("all values written")
+
+if __name__ == '__main__':
+    main()
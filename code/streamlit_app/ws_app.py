@@ -1,13 +1,24 @@
 import streamlit as st
+import hashlib
 import os
 import sys
+import threading
+import time
 from datetime import datetime
 
+import pandas as pd
+
 # Add the 'code' folder to the system path to import the script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import the necessary function from your Python script
-from ubidots_python_api_test_HTTP import get_all_type_var_ids_and_location
+from ubidots_python_api_test_HTTP import CATALOG_TTL, get_all_type_var_ids_and_location
+
+REFRESH_TTL = CATALOG_TTL # Seconds before the device data is refreshed in the background
+POLL_INTERVAL = 1 # Seconds between screen updates while devices are loading
+LOADER_TTL = 4 * REFRESH_TTL # Seconds a loader (and the token it holds) is kept in memory before a new one is made
+MAX_LOADERS = 8 # Max number of loaders (tokens) kept in memory; the oldest is dropped first
+RETRY_BACKOFF = 30 # Seconds before a failed fetch is retried on its own; doubles with each failure, up to REFRESH_TTL
 
 # Function to format email text with CSV content
 def generate_email_body(df):
@@ -29,11 +40,106 @@ Best regards,
 
     return email_body
 
-# Cache the function that fetches the device data to avoid re-running it unnecessarily
-@st.cache_data(show_spinner=True)
-def fetch_device_data(device_type, headers):
-    """Fetch data from Ubidots API and cache the result."""
-    return get_all_type_var_ids_and_location(device_type=device_type, headers=headers, unl_export=False)
+class DeviceDataLoader:
+    """
+    Fetches the device data of one token in a background thread, so the page never waits on Ubidots.
+    Devices are shown as soon as their variable ids resolve. Once the data is older than REFRESH_TTL
+    it is fetched again in the background, and the previous data stays on screen until the new one is complete.
+    A failed fetch is kept on screen and only retried after a backoff, or when retry() is called.
+    """
+    def __init__(self, token, device_type):
+        self.headers = {"X-Auth-Token": token}
+        self.device_type = device_type
+        self.loaded_at = None  # time the last complete fetch finished
+        self.error = None
+        self.failed_at = None  # time the last failed fetch finished
+        self.failures = 0  # failed fetches in a row
+        self._lock = threading.Lock()
+        self._rows = []  # devices resolved so far by the fetch in progress
+        self._df = None  # last complete fetch
+        self._thread = None
+
+    @property
+    def loading(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def retry_delay(self):
+        """Seconds to wait after the last failed fetch before fetching again on its own."""
+        return min(RETRY_BACKOFF * 2 ** max(self.failures - 1, 0), REFRESH_TTL)
+
+    def refresh_if_stale(self, ttl=REFRESH_TTL):
+        """Start a background fetch if there is no data yet, the data is older than ttl,
+        or the last fetch failed more than retry_delay seconds ago."""
+        with self._lock:
+            if self.loading:
+                return
+            if self.error is not None:
+                if time.time() - self.failed_at < self.retry_delay:
+                    return
+            elif self.loaded_at is not None and time.time() - self.loaded_at < ttl:
+                return
+            self._start()
+
+    def retry(self):
+        """Start a background fetch now, unless one is already running."""
+        with self._lock:
+            if not self.loading:
+                self._start()
+
+    def _start(self):
+        self._rows = []
+        self.error = None
+        self._thread = threading.Thread(target=self._fetch, daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        """Return (device DataFrame, whether it is complete)."""
+        with self._lock:
+            if self._df is not None:
+                return self._df, True
+            rows = [row for row in self._rows if not row.empty]
+        return (pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()), False
+
+    def _fetch(self):
+        try:
+            df = get_all_type_var_ids_and_location(device_type=self.device_type, headers=self.headers,
+                                                   unl_export=False, on_device=self._add_device)
+        except Exception as e:
+            with self._lock:
+                self.error = e
+                self.failed_at = time.time()
+                self.failures += 1
+            return
+        with self._lock:
+            self._df = df
+            self._rows = []
+            self.loaded_at = time.time()
+            self.failures = 0
+
+    def _add_device(self, row_df):
+        with self._lock:
+            self._rows.append(row_df)
+
+# One loader per token and device type, shared by all sessions; keyed on a hash so the raw token is never a cache key.
+# Loaders expire after LOADER_TTL and at most MAX_LOADERS are kept, so tokens do not stay in memory for the life of the server
+@st.cache_resource(show_spinner=False, ttl=LOADER_TTL, max_entries=MAX_LOADERS)
+def get_device_data_loader(token_hash, device_type, _token):
+    return DeviceDataLoader(_token, device_type)
+
+@st.fragment(run_every=POLL_INTERVAL)
+def show_loading_progress(loader):
+    """Redraw only this part of the page while devices load. Only rendered while the loader is busy:
+    once the fetch is over it reruns the whole app, which then stops rendering it, so polling stops."""
+    if not loader.loading:
+        st.rerun()
+    df, complete = loader.snapshot()
+    if not complete:
+        st.info(f"Fetching device data... {len(df)} devices so far.")
+        if not df.empty:
+            st.dataframe(df.reindex(columns=['name', 'rh', 't', 'lat', 'lng']), hide_index=True)
+    else:
+        st.caption("Refreshing device data in the background...")
 
 # Streamlit app code
 def main():
@@ -64,24 +170,35 @@ def main():
     token = st.text_input("Please enter your Ubidots API token:", type="password")
 
     if token:
-        # Set headers with the provided token
-        headers = {"X-Auth-Token": token}
         st.success("API token set! Fetching device data...")
 
         # Set device type
         device_type = "pile-temp-and-cercospora-monitor"
 
         try:
-            # Use the cached function to fetch data, ensuring it only runs once unless token changes
-            df = fetch_device_data(device_type, headers)
+            # The loader fetches in the background; the page shows whatever devices have resolved so far
+            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            loader = get_device_data_loader(token_hash, device_type, token)
+            loader.refresh_if_stale()
+            if loader.loading:
+                show_loading_progress(loader)
+            elif loader.error is not None:
+                # Stays on screen until the retry: reruns do not fetch again before the backoff is over
+                st.error(f"Error fetching device data: {loader.error}")
+                if st.button("Retry"):
+                    loader.retry()
+                    st.rerun()
+            df, complete = loader.snapshot()
 
             if df.empty:
-                st.warning("No devices found. Please check your API token and try again.")
+                if complete:
+                    st.warning("No devices found. Please check your API token and try again.")
             else:
-                st.success("Device data fetched successfully!")
+                if complete:
+                    st.success("Device data fetched successfully!")
                 
                 # Filter df columns to only include relevant columns
-                df = df[['name', 'rh', 't', 'lat', 'lng']]
+                df = df.reindex(columns=['name', 'rh', 't', 'lat', 'lng'])
 
                 st.write("### Step 3: Select devices")
                 
@@ -0,0 +1,29 @@
+'''
+Fixtures of the tests: a small synthetic fleet served by the local mock server, and a
+client pointed at it. Run from the 'code' folder with: python -m pytest -q tests
+'''
+import os
+import sys
+
+import pytest
+
+# Add the 'code' folder to the system path to import the package and the mock server
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ubidots_mock_server import MockFleet, MockUbidotsServer
+from ubidots_http import UbidotsClient
+
+TOKEN = 'test-token'
+
+@pytest.fixture
+def fleet():
+    return MockFleet(devices=3, variables=2, values=600)
+
+@pytest.fixture
+def server(fleet):
+    with MockUbidotsServer(fleet, token=TOKEN) as server:
+        yield server
+
+@pytest.fixture
+def client(server):
+    return UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
@@ -0,0 +1,52 @@
+'''
+Checks of the catalog cache: a fresh listing is reused without a request, a stale one is
+revalidated with a conditional request, a changed one is downloaded again, and listings are
+not shared between tokens.
+'''
+import pytest
+
+from conftest import TOKEN
+from ubidots_http import UbidotsClient
+from ubidots_http.cache import CatalogCache
+from ubidots_http.transport import _HTTP_STATUS_ERRORS
+
+def test_listing_is_revalidated_once_stale(server, fleet, tmp_path):
+    path = str(tmp_path / 'catalog.sqlite')
+    cache = CatalogCache(path=path, ttl=3600)
+    client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=cache)
+    devices = client.get_all_devices()
+    assert [device['label'] for device in devices] == [device['label'] for device in fleet.devices]
+
+    # Fresh: neither this client nor the next run (same SQLite file) asks the server
+    server.stats.reset()
+    assert client.get_all_devices() == devices
+    rerun = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None,
+                          catalog_cache=CatalogCache(path=path, ttl=3600))
+    assert rerun.get_all_devices() == devices
+    assert server.stats.snapshot()['requests'] == 0
+
+    # Stale and unchanged: one conditional request answered 304, then fresh again
+    cache.ttl = 0
+    assert client.get_all_devices() == devices
+    assert server.stats.snapshot()['statuses'] == {304: 1}
+    cache.ttl = 3600
+    assert client.get_all_devices() == devices
+    assert server.stats.snapshot()['requests'] == 1
+
+    # Stale and changed: downloaded again, for the sync and the async path
+    fleet.devices[0]['name'] = 'Renamed device'
+    cache.ttl = 0
+    server.stats.reset()
+    assert client.get_all_devices()[0]['name'] == 'Renamed device'
+    fleet.devices[1]['name'] = 'Renamed again'
+    assert client._run(client.aget_all_devices())[1]['name'] == 'Renamed again'
+    assert server.stats.snapshot()['statuses'] == {200: 2}
+
+def test_other_token_does_not_share_the_cache(server, tmp_path):
+    cache = CatalogCache(path=str(tmp_path / 'catalog.sqlite'), ttl=3600)
+    UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=cache).get_all_devices()
+    other = UbidotsClient(token='wrong-token', endpoint=server.url, rate_limit=None, catalog_cache=cache)
+    server.stats.reset()
+    with pytest.raises(_HTTP_STATUS_ERRORS):
+        other.get_all_devices()
+    assert server.stats.snapshot()['statuses'] == {401: 1}
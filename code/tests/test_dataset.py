@@ -0,0 +1,23 @@
+'''
+Checks of the columnar dataset export: compact and default frames give the same rows, and
+exporting the same values again adds none.
+'''
+import pandas as pd
+import pytest
+
+def test_compact_export_matches_default_and_is_idempotent(client, fleet, tmp_path):
+    pytest.importorskip('pyarrow')
+    from ubidots_http.dataset import export_dataset, read_dataset
+    default_df = client.get_type_data(device_type=None, last_values=600)
+    compact_df = client.get_type_data(device_type=None, last_values=600, compact=True)
+    values = len(fleet.devices) * 2 * 600
+    assert export_dataset(compact_df, root=str(tmp_path / 'compact')) == values
+    assert export_dataset(compact_df, root=str(tmp_path / 'compact')) == 0
+    assert export_dataset(default_df, root=str(tmp_path / 'default')) == values
+
+    columns = ['name', 'label', 'Timestamp', 'value', 'Context']
+    compact = read_dataset(root=str(tmp_path / 'compact'))[columns].astype({'name': str, 'label': str})
+    default = read_dataset(root=str(tmp_path / 'default'))[columns].astype({'name': str, 'label': str})
+    assert len(compact) == values and not compact.duplicated(['name', 'label', 'Timestamp']).any()
+    pd.testing.assert_frame_equal(compact.sort_values(columns[:3], ignore_index=True),
+                                  default.sort_values(columns[:3], ignore_index=True), rtol=1e-6)
@@ -0,0 +1,12 @@
+'''
+Checks of the test fixtures: the client sees the synthetic fleet of the mock server.
+'''
+
+def test_client_reads_the_fleet(client, fleet):
+    devices_df = client.get_all_devices_df(device_type=None)
+    assert list(devices_df['label']) == [device['label'] for device in fleet.devices]
+    variable_id = fleet.variables[fleet.devices[0]['id']][0]['id']
+    _, rows = fleet.values(variable_id, limit=100)
+    df = client.get_var_df(variable_id, last_values=100)
+    assert sorted(df['Timestamp'].tolist()) == sorted(timestamp for timestamp, _ in rows)
+    assert sorted(df.iloc[:, 2].tolist()) == sorted(value for _, value in rows)
@@ -0,0 +1,40 @@
+'''
+Checks of the resampled fetch: periods the server rejects, or a server without the resample
+endpoint, are resampled locally with the same results.
+'''
+import pandas as pd
+
+from conftest import TOKEN
+from ubidots_mock_server import MockUbidotsServer
+from ubidots_http import UbidotsClient
+
+def test_resample_falls_back_per_period(client, server, fleet):
+    device_label = fleet.devices[0]['label']
+    hourly = client.get_device_resampled(device_label, period='1H')
+    assert client.server_resample is True
+    # The mock can't resample calendar months (400): only that period is resampled locally
+    server.stats.reset()
+    monthly = client.get_device_resampled(device_label, period='M')
+    routes = server.stats.snapshot()['routes']
+    assert routes.get('v1.6 resample') == 1 and routes.get('v1.6 values')
+    assert client.rejected_resamples == {('M', 'mean')} and client.server_resample is True
+    assert len(monthly) == 1
+    server.stats.reset()
+    pd.testing.assert_frame_equal(client.get_device_resampled(device_label, period='1H'), hourly)
+    assert 'v1.6 values' not in server.stats.snapshot()['routes']
+
+    # The same periods in the other order give the same tables
+    other = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
+    pd.testing.assert_frame_equal(other.get_device_resampled(device_label, period='M'), monthly)
+    pd.testing.assert_frame_equal(other.get_device_resampled(device_label, period='1H'), hourly)
+
+def test_resample_without_endpoint_resamples_locally(fleet):
+    device_label = fleet.devices[0]['label']
+    with MockUbidotsServer(fleet, token=TOKEN) as server:
+        expected = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None,
+                                 catalog_cache=None).get_device_resampled(device_label, period='1H')
+    with MockUbidotsServer(fleet, token=TOKEN, resample=False) as server:
+        client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
+        local = client.get_device_resampled(device_label, period='1H')
+    assert client.server_resample is False
+    pd.testing.assert_frame_equal(local, expected, check_dtype=False)
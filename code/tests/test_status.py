@@ -0,0 +1,15 @@
+'''
+Checks that error answers of the server raise instead of being parsed as values.
+'''
+import pytest
+
+from ubidots_http import UbidotsClient
+from ubidots_http.transport import _HTTP_STATUS_ERRORS
+
+def test_var_df_raises_on_error_status(server, fleet):
+    variable_id = fleet.variables[fleet.devices[0]['id']][0]['id']
+    client = UbidotsClient(token='wrong-token', endpoint=server.url, rate_limit=None, catalog_cache=None)
+    with pytest.raises(_HTTP_STATUS_ERRORS):
+        client.get_var_df(variable_id)
+    with pytest.raises(_HTTP_STATUS_ERRORS):
+        client._run(client.aget_var_df(variable_id))
@@ -0,0 +1,39 @@
+'''
+Checks of the incremental sync: each run only downloads the values newer than the stored
+watermarks, and a sync without a store uses the store at SYNC_DB.
+'''
+from ubidots_http import client as client_module
+
+def test_sync_only_downloads_new_values(client, server, fleet, tmp_path):
+    from ubidots_http.store import SyncStore
+    device = fleet.devices[0]
+    variables = fleet.variables[device['id']]
+    with SyncStore(str(tmp_path / 'sync.sqlite')) as store:
+        first = client.sync_device_data(device['label'], store=store)
+        assert first['new_values'].tolist() == [600] * len(variables)
+        assert len(store.get_device_data(device['label'])) == 600
+
+        server.stats.reset()
+        second = client.sync_device_data(device['label'], store=store)
+        assert second['new_values'].tolist() == [0] * len(variables)
+        assert second['last_timestamp'].tolist() == first['last_timestamp'].tolist()
+        assert server.stats.snapshot()['bytes_out'] < 2000 * len(variables)
+
+        fleet.values_count = 650
+        third = client.sync_device_data(device['label'], store=store)
+        assert third['new_values'].tolist() == [50] * len(variables)
+        assert (third['last_timestamp'] - first['last_timestamp'] == 50 * fleet.interval_ms).all()
+        for variable in variables:
+            _, rows = fleet.values(variable['id'])
+            stored = store.get_var_df(variable['id'])
+            assert sorted(stored['Timestamp'].tolist()) == sorted(timestamp for timestamp, _ in rows)
+
+def test_sync_without_store_uses_sync_db(client, fleet, tmp_path, monkeypatch):
+    from ubidots_http.store import SyncStore
+    path = str(tmp_path / 'default.sqlite')
+    monkeypatch.setattr(client_module, 'SYNC_DB', path)
+    summary_df, errors_df = client.sync_type_data(device_type=None, return_errors=True)
+    assert errors_df.empty
+    assert len(summary_df) == len(fleet.devices) * 2 and (summary_df['new_values'] == 600).all()
+    with SyncStore(path) as store:
+        assert store.get_watermark(fleet.variables[fleet.devices[0]['id']][0]['id']) is not None
@@ -0,0 +1,80 @@
+'''
+Checks of the per-token throttle: clients sharing a token share its connection cap, and a
+request cancelled while it waits gives its connection slot back.
+'''
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import TOKEN
+from ubidots_mock_server import MockUbidotsServer, _MockHandler
+from ubidots_http import UbidotsClient
+from ubidots_http.transport import _Throttle
+
+class CountingHandler(_MockHandler):
+    '''
+    Mock request handler recording the peak number of requests served at the same time.
+    '''
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _handle(self, method):
+        cls = CountingHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            super()._handle(method)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+def test_clients_sharing_a_token_share_the_connection_cap(fleet):
+    with MockUbidotsServer(fleet, token=TOKEN, latency=0.02) as server:
+        server._httpd.RequestHandlerClass = CountingHandler
+        clients = [UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, max_connections=2,
+                                 catalog_cache=None) for _ in range(3)]
+        assert len({id(client.throttle) for client in clients}) == 1
+        with ThreadPoolExecutor(len(clients)) as pool:
+            frames = list(pool.map(lambda client: client.get_type_data(device_type=None, last_values=100),
+                                   clients))
+    assert all(len(df) == len(frames[0]) for df in frames)
+    assert CountingHandler.peak == 2
+    assert clients[0].throttle._slots._value == 2
+
+def test_cancelled_wait_releases_the_slot():
+    throttle = _Throttle(rate_limit=1, max_connections=1)
+
+    async def request():
+        async with throttle:
+            pass
+
+    async def main():
+        await request()
+        task = asyncio.ensure_future(request()) # has the slot, waits about 1 s for the rate limit
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert throttle._slots._value == 1
+        await asyncio.wait_for(request(), timeout=5)
+
+    asyncio.run(main())
+
+def test_early_break_does_not_leak_slots(server, fleet):
+    variable_id = fleet.variables[fleet.devices[0]['id']][0]['id']
+    client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=4, max_connections=4,
+                           catalog_cache=None)
+
+    async def main():
+        for _ in range(4):
+            # The page prefetched in the background is cancelled while it waits for the rate limit
+            chunks = client.aiter_var_values(variable_id, page_size=50)
+            async for chunk in chunks:
+                await asyncio.sleep(0.05) # the next page is requested meanwhile
+                break
+            await chunks.aclose()
+        return await asyncio.wait_for(client.aget_var_df(variable_id, last_values=100), timeout=10)
+
+    assert len(client._run(main())) == 100
+    assert client.throttle._slots._value == 4
@@ -0,0 +1,22 @@
+'''
+Checks of the values CSV parsing: get_var_df keeps its numpy dtypes by default, and only
+returns Arrow-backed columns when asked to.
+'''
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+def test_var_df_dtypes(client, server, fleet):
+    variable_id = fleet.variables[fleet.devices[0]['id']][0]['id']
+    text = client.session.get(client._values_url(variable=variable_id, last_values=600),
+                              headers=client.headers).text
+    expected = pd.read_csv(StringIO(text), sep=',')
+    df = client.get_var_df(variable_id, last_values=600)
+    pd.testing.assert_frame_equal(df, expected)
+    pd.testing.assert_frame_equal(client._run(client.aget_var_df(variable_id, last_values=600)), expected)
+
+    pytest.importorskip('pyarrow')
+    arrow_df = client.get_var_df(variable_id, last_values=600, arrow=True)
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in arrow_df.dtypes)
+    pd.testing.assert_frame_equal(arrow_df.astype(expected.dtypes.to_dict()), expected)
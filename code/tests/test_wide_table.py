@@ -0,0 +1,40 @@
+'''
+Checks of the device wide table: a duplicated timestamp gives the same rows as the former
+chained outer merges.
+'''
+from functools import reduce
+
+import pandas as pd
+
+from conftest import TOKEN
+from ubidots_mock_server import MockFleet, MockUbidotsServer
+from ubidots_http import UbidotsClient
+from ubidots_http.frames import VALUE_KEYS
+
+def legacy_merge(dfs):
+    '''
+    The former get_device_data merge: sequential outer merges on the shared columns.
+    '''
+    wide = reduce(lambda left, right: pd.merge(left, right, on=VALUE_KEYS, how='outer'), dfs)
+    return wide.sort_values('Timestamp', kind='stable', ignore_index=True)
+
+class DuplicatingFleet(MockFleet):
+    '''
+    Fleet whose first variable of every device reports its newest value twice.
+    '''
+    def values(self, variable_id, start=None, end=None, offset=0, limit=None):
+        count, rows = super().values(variable_id, start=start, end=end, offset=offset, limit=limit)
+        if self.variable_index[variable_id] % len(self.variables[self.devices[0]['id']]) == 0 and rows:
+            rows = rows[:1] + rows
+        return count, rows
+
+def test_duplicated_timestamps_keep_outer_merge_rows():
+    fleet = DuplicatingFleet(devices=1, variables=2, values=300)
+    device = fleet.devices[0]
+    with MockUbidotsServer(fleet, token=TOKEN) as server:
+        client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
+        wide = client.get_device_data(device['label'], last_values=1000)
+        dfs = [client.get_var_df(variable['id'], last_values=1000) for variable in fleet.variables[device['id']]]
+    expected = legacy_merge(dfs)
+    assert len(wide) == 301
+    pd.testing.assert_frame_equal(wide[expected.columns], expected, check_dtype=False)
@@ -0,0 +1,43 @@
+'''
+Checks of the bulk writes against a mock server that fails some of them: every value is
+either sent or reported as failed, and a failed write is not sent again.
+'''
+import numpy as np
+import pandas as pd
+
+from conftest import TOKEN
+from ubidots_mock_server import START_MS, MockUbidotsServer
+from ubidots_http import UbidotsClient
+
+def make_upload_frame(values=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'Timestamp': START_MS + np.arange(values, dtype='int64') * 60000,
+                         'derived-0': rng.normal(20, 5, values).round(3),
+                         'derived-1': rng.normal(50, 10, values).round(3)})
+
+def test_partial_write_failure_is_reported(fleet):
+    df = make_upload_frame()
+    device_label = fleet.devices[0]['label']
+    with MockUbidotsServer(fleet, token=TOKEN, error_rate=0.5, seed=1) as server:
+        client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
+        sent, failed_df = client.post_device_data(df, device_label=device_label, batch_size=100,
+                                                  max_requests=1, return_errors=True)
+        stats = server.stats.snapshot()
+    total = 2 * len(df)
+    assert 0 < len(failed_df) < total // 100
+    assert sent + failed_df['values'].sum() == total
+    # One request per batch: a write that failed with a 5xx is not sent again
+    assert stats['requests'] == total // 100
+    written = server.written[device_label]
+    assert sum(len(values) for values in written.values()) == sent
+    for first, last in failed_df[['first_timestamp', 'last_timestamp']].itertuples(index=False):
+        assert not any(first <= timestamp <= last for values in written.values() for timestamp in values)
+
+def test_partial_type_write_failure_is_reported(fleet):
+    frames = [make_upload_frame().assign(name=device['name']) for device in fleet.devices]
+    with MockUbidotsServer(fleet, token=TOKEN, error_rate=0.5, seed=1) as server:
+        client = UbidotsClient(token=TOKEN, endpoint=server.url, rate_limit=None, catalog_cache=None)
+        summary_df, errors_df = client.post_type_data(pd.concat(frames, ignore_index=True), device_type=None,
+                                                      batch_size=100, return_errors=True)
+    assert (summary_df['values'] + summary_df['failed'] == 2000).all()
+    assert summary_df['failed'].sum() > 0 and len(errors_df) > 0
@@ -0,0 +1,86 @@
+'''
+Ubidots-Python-API-Client-Test-HTTP
+By A.J. Brown
+24 Aug 2022
+Updated: 4 Jan 2023
+
+This package is designed to pull data from Ubidots servers for streamlined data
+analysis.
+
+Help doc for HTTP and Ubidots:
+https://docs.ubidots.com/v1.6/reference/http # <<< version 1.6
+https://docs.ubidots.com/reference/welcome # <<< version 2.0
+
+Help doc for device types:
+https://help.ubidots.com/en/articles/2129204-device-types
+
+Please note that a mix of 1.6 and 2.0 are utilized in this doc as 2.0 is
+currently under development at Ubidots. Eventually, a full shift to 2.0 will
+be integrated.
+
+The UbidotsClient class holds the token, endpoint and session used by every
+request. The functions of the api module are thin wrappers around it, kept
+for existing scripts and the Streamlit app.
+
+The code is split into modules so that light tasks stay light: importing the package,
+validating a token or listing devices loads requests but not pandas. Names are
+imported from their module on first access, and only the modules that build
+DataFrames (frames, store, dataset, risk) import pandas, numpy or pyarrow.
+'''
+import importlib
+import logging
+
+logging.getLogger(__name__).addHandler(logging.NullHandler()) # silent unless the application configures logging
+
+# Module of every name the package exposes (private names kept for existing scripts)
+_EXPORTS = {
+    'config': ('ARROW_PARSING', 'BACKOFF', 'BULK_BATCH_SIZE', 'CATALOG_DB', 'CATALOG_TTL', 'DELAY',
+               'DEVICE_FIELDS', 'DEVICE_LABEL', 'DEVICE_NAME', 'DEVICE_TYPE_FILTER', 'ENDPOINT', 'EXPORT_DIR',
+               'EXPORT_PARTITIONS', 'HEADERS', 'MAX_ATTEMPTS', 'MAX_BACKOFF', 'MAX_CONNECTIONS',
+               'MAX_DEVICES', 'MAX_WORKERS', 'PAGE_SIZE', 'RATE_LIMIT', 'RESAMPLE_PERIOD',
+               'RESAMPLE_REJECTED', 'RESAMPLE_UNSUPPORTED', 'RETRY_STATUSES', 'RISK_RH_THRESHOLD', 'RISK_TIMEZONE',
+               'SYNC_DB', 'TIMEOUT', 'TOKEN', 'TOKEN_CHECK_TTL', 'VARIABLE_LABEL', 'WRITE_BATCH_SIZE',
+               'WRITE_MAX_BYTES'),
+    'transport': ('INSTRUMENTATION', 'SESSION', 'AsyncUbidotsSession', 'Instrumentation',
+                  'OpenTelemetrySink', 'PrometheusSink', 'UbidotsSession', '_HTTP_STATUS_ERRORS',
+                  '_TRANSIENT_ERRORS', '_Throttle', '_backoff_delay', '_get_throttle', '_mask',
+                  '_parse_retry_after', '_route'),
+    'cache': ('CatalogCache', '_token_hash'),
+    'client': ('AGGREGATIONS', 'UbidotsClient', '_amap_devices', '_bulk_series_body',
+               '_check_batch_size', '_filter_device_type', '_parse_period', '_resample_body',
+               '_to_epoch_ms'),
+    'frames': ('PERIOD_MS', 'VALUE_KEYS', 'parse_context', '_bulk_series_to_dfs',
+               '_combine_partials', '_concat_compact', '_device_vars_df', '_export_unl',
+               '_finish_partials', '_flatten_devices', '_merge_var_dfs', '_merge_var_dfs_outer',
+               '_partial_aggregates', '_period_starts', '_pivot_type_var_ids', '_resample_to_dfs',
+               '_stack_device_frames', '_type_df_from_devices', '_values_df_from_json',
+               '_values_df_from_rows', '_var_df_from_arrow_csv', '_var_df_from_csv',
+               '_var_df_from_pandas_csv', '_write_bodies'),
+    'store': ('SyncStore',),
+    'risk': ('DAILY_COLUMNS', 'InfectionRisk', 'daily_infection_values'),
+    'dataset': ('export_dataset', 'read_dataset', '_dataset_filters', '_import_pyarrow',
+                '_stored_partitions', '_wide_to_long'),
+    'api': ('CATALOG_CACHE', 'audit_tokens', 'get_all_devices_df',
+            'get_all_type_var_ids_and_location', 'get_device_data', 'get_device_resampled',
+            'get_device_vars_df', 'get_type_data', 'get_type_resampled', 'get_var_df',
+            'invalidate_catalog', 'iter_var_values', 'post_device_data', 'post_type_data',
+            'sync_device_data', 'sync_type_data', '_client', '_get_all_devices', '_get_device_token', '_get_device_vars', '_get_var',
+            '_list_devices', '_validate_token'),
+    'cli': ('OUTPUT_FORMATS', 'TOKEN_ENV', 'bcolors', 'main', '_build_parser', '_write_devices',
+            '_interactive_unl_export', '_read_token', '_run_cli_job', '_write_table'),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = [name for names in _EXPORTS.values() for name in names if not name.startswith('_')]
+
+def __getattr__(name):
+    '''
+    Imports the module defining name on first access (PEP 562).
+    '''
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
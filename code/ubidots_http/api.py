@@ -0,0 +1,466 @@
+'''
+Module-level functions, kept for existing scripts and the Streamlit app.
+
+Each one is a thin wrapper around a UbidotsClient sharing the package SESSION,
+CATALOG_CACHE and per-token throttle.
+'''
+# TODO: make a function to download all data for a group of devices and all vars
+
+import logging
+
+from .config import (ARROW_PARSING, BULK_BATCH_SIZE, DEVICE_LABEL, ENDPOINT, HEADERS, MAX_CONNECTIONS,
+                     MAX_DEVICES, MAX_WORKERS, PAGE_SIZE, RATE_LIMIT, RESAMPLE_PERIOD, SYNC_DB, TOKEN,
+                     VARIABLE_LABEL, WRITE_BATCH_SIZE, WRITE_MAX_BYTES)
+from .transport import SESSION
+from .cache import CatalogCache
+from .client import UbidotsClient
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE = CatalogCache() # Shared catalog cache used by all helpers (None to disable)
+
+def get_all_type_var_ids_and_location(device_type='pile-temp-and-cercospora-monitor',
+                                      headers=HEADERS,
+                                      unl_export=False,
+                                      max_devices=MAX_DEVICES,
+                                      rate_limit=RATE_LIMIT,
+                                      max_connections=MAX_CONNECTIONS,
+                                      return_errors=False,
+                                      on_device=None):
+    '''
+    Collects the ids of all variables for a specified device type, as well as the latitude and longitude.
+    Devices are queried concurrently; a device that fails is left out and reported instead of
+    aborting the whole pull. on_device lets a caller (e.g. a UI) show devices as soon as they resolve.
+    :param device_type: device type label as indicated in Ubidots; can also be found in individual device properties
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param unl_export: if True, export the name, rh, t, lat and lng columns to a timestamped CSV for UNL
+    :param max_devices: max number of devices queried at the same time
+    :param rate_limit: max requests per second shared by all requests using the same token
+    :param max_connections: max number of requests in flight at the same time for the same token
+    :param return_errors: if True, also return a DataFrame listing the devices that failed
+    :param on_device: optional function called with the one-row DataFrame of each device as soon
+                      as its variables are listed (from the thread running the requests)
+    :return: pandas.core.frame.DataFrame containing variable ids and location for all devices of specified type
+             (plus the error report DataFrame if return_errors is True)
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.get_all_type_var_ids_and_location(device_type=device_type,
+                                                    unl_export=unl_export,
+                                                    max_devices=max_devices,
+                                                    return_errors=return_errors,
+                                                    on_device=on_device)
+
+def get_type_data(device_type = 'pile-temp-and-cercospora-monitor', # other type can be: 'low-cost-water-sampler'
+                  headers=HEADERS,
+                  last_values = 5000,
+                  max_devices=MAX_DEVICES,
+                  max_workers=MAX_WORKERS,
+                  rate_limit=RATE_LIMIT,
+                  max_connections=MAX_CONNECTIONS,
+                  return_errors=False,
+                  bulk=False,
+                  batch_size=BULK_BATCH_SIZE,
+                  compact=False,
+                  start=None,
+                  end=None):
+    '''
+    Collects all variable data from all devices of a specified type, returns as single dataframe
+    with variables and  as columns, all organized by timestamp.
+    Devices, and the variables within each device, are downloaded concurrently; a device that
+    fails is left out and reported instead of aborting the whole pull.
+    With bulk=True the values of the whole fleet are requested batch_size variables at a time
+    instead of one request per variable.
+    With compact=True the frame uses a memory-compact schema: a UTC DatetimeIndex instead of
+    the Timestamp and human-readable date columns, float32 values, and categorical name and
+    Context columns (Context stays raw text until parse_context is called).
+    :param device_type: device type label as indicated in Ubidots; can also be found in individual device properties
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param last_values: number that designates how many of the most recent values to return in the dataframe
+    :param max_devices: max number of devices downloaded at the same time
+    :param max_workers: max number of variables downloaded at the same time within each device
+    :param rate_limit: max requests per second shared by all requests using the same token
+    :param max_connections: max number of requests in flight at the same time for the same token
+    :param return_errors: if True, also return a DataFrame listing the devices that failed
+    :param bulk: if True, fetch many variables per request (see BULK_BATCH_SIZE)
+    :param batch_size: max number of variables per bulk request
+    :param compact: if True, return the memory-compact schema
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :return: pandas.core.frame.DataFrame containing variable values plus timestamps for all devices of specified type
+             (plus the error report DataFrame if return_errors is True)
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.get_type_data(device_type=device_type,
+                                last_values=last_values,
+                                max_devices=max_devices,
+                                max_workers=max_workers,
+                                return_errors=return_errors,
+                                bulk=bulk,
+                                batch_size=batch_size,
+                                compact=compact,
+                                start=start,
+                                end=end)
+
+def sync_type_data(device_type='pile-temp-and-cercospora-monitor',
+                   headers=HEADERS,
+                   store_path=SYNC_DB,
+                   initial_start=None,
+                   max_devices=MAX_DEVICES,
+                   max_workers=MAX_WORKERS,
+                   return_errors=False):
+    '''
+    Incrementally syncs the values of all devices of a specified type into a local SQLite store.
+    Only values newer than each variable's last synced timestamp are downloaded.
+    Read the synced data back with SyncStore(store_path).get_device_data(device_id).
+    :param device_type: device type label as indicated in Ubidots; can also be found in individual device properties
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param store_path: path of the SQLite store (see Global variables)
+    :param initial_start: start of the window for variables never synced before (None = full history)
+    :param max_devices: max number of devices synced at the same time
+    :param max_workers: max number of variables synced at the same time within each device
+    :param return_errors: if True, also return a DataFrame listing the devices that failed
+    :return: pandas.core.frame.DataFrame with the number of new values and watermark of each variable
+             (plus the error report DataFrame if return_errors is True)
+    '''
+    from .store import SyncStore
+    with SyncStore(store_path) as store:
+        return _client(headers=headers).sync_type_data(device_type=device_type,
+                                                       store=store,
+                                                       initial_start=initial_start,
+                                                       max_devices=max_devices,
+                                                       max_workers=max_workers,
+                                                       return_errors=return_errors)
+
+def sync_device_data(device_id=DEVICE_LABEL, headers=HEADERS, store_path=SYNC_DB,
+                     initial_start=None, max_workers=MAX_WORKERS):
+    '''
+    Incrementally syncs the values of a single device into a local SQLite store.
+    Only values newer than each variable's last synced timestamp are downloaded.
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param store_path: path of the SQLite store (see Global variables)
+    :param initial_start: start of the window for variables never synced before (None = full history)
+    :param max_workers: max number of variables synced at the same time
+    :return: pandas.core.frame.DataFrame with the number of new values and watermark of each variable
+    '''
+    from .store import SyncStore
+    with SyncStore(store_path) as store:
+        return _client(headers=headers).sync_device_data(device_id=device_id,
+                                                         store=store,
+                                                         initial_start=initial_start,
+                                                         max_workers=max_workers)
+
+def get_device_data(device_id=DEVICE_LABEL, headers=HEADERS, last_values=5000,
+                    max_workers=MAX_WORKERS, rate_limit=RATE_LIMIT,
+                    max_connections=MAX_CONNECTIONS, bulk=False, batch_size=BULK_BATCH_SIZE,
+                    compact=False, start=None, end=None):
+    '''
+    Collects all variable data from specified device and returns DataFrame
+    with variables as columns, all merged by timestamp.
+    Variables are downloaded concurrently by a bounded pool of worker threads, or with
+    bulk=True, batch_size variables per request.
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param last_values: number that designates how many of the most recent values to return in the dataframe
+    :param max_workers: max number of variables downloaded at the same time (1 = one at a time)
+    :param rate_limit: max requests per second shared by all downloads using the same token
+    :param max_connections: max number of requests in flight at the same time for the same token
+    :param bulk: if True, fetch many variables per request (see BULK_BATCH_SIZE)
+    :param batch_size: max number of variables per bulk request
+    :param compact: if True, return the memory-compact schema (see get_type_data)
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :return: pandas.core.frame.DataFrame containing variable values plus timestamps for single device
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.get_device_data(device_id=device_id, last_values=last_values,
+                                  max_workers=max_workers, bulk=bulk, batch_size=batch_size,
+                                  compact=compact, start=start, end=end)
+
+def get_device_resampled(device_id=DEVICE_LABEL, headers=HEADERS, start=None, end=None,
+                         period=RESAMPLE_PERIOD, aggregations=('mean',), rate_limit=RATE_LIMIT,
+                         max_connections=MAX_CONNECTIONS, batch_size=BULK_BATCH_SIZE, compact=False):
+    '''
+    Collects one aggregated value per period for every variable of a device, e.g. hourly means,
+    in the same wide layout as get_device_data. Ubidots computes the statistics server-side
+    (see RESAMPLE_UNSUPPORTED and RESAMPLE_REJECTED for the fallback to local resampling).
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :param period: length of the periods, e.g. '15T', '1H', '1D', 'W' or 'M'
+    :param aggregations: statistics to compute (see AGGREGATIONS); with more than one, columns
+                         are named <label>_<aggregation>
+    :param rate_limit: max requests per second shared by all requests using the same token
+    :param max_connections: max number of requests in flight at the same time for the same token
+    :param batch_size: max number of variables per resample request
+    :param compact: if True, return the memory-compact schema (see get_type_data)
+    :return: pandas.core.frame.DataFrame with one row per period and one column per variable (and aggregation)
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.get_device_resampled(device_id=device_id, start=start, end=end, period=period,
+                                       aggregations=aggregations, batch_size=batch_size,
+                                       compact=compact)
+
+def get_type_resampled(device_type='pile-temp-and-cercospora-monitor', headers=HEADERS, start=None,
+                       end=None, period=RESAMPLE_PERIOD, aggregations=('mean',), max_devices=MAX_DEVICES,
+                       rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS,
+                       batch_size=BULK_BATCH_SIZE, return_errors=False, compact=False):
+    '''
+    get_device_resampled for all devices of a specified type, in the same layout as get_type_data.
+    :param device_type: device type label as indicated in Ubidots
+    :param max_devices: max number of devices downloaded at the same time
+    :param return_errors: if True, also return a DataFrame listing the devices that failed
+    (see get_device_resampled for the other parameters)
+    :return: pandas.core.frame.DataFrame with one row per device and period
+             (plus the error report DataFrame if return_errors is True)
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.get_type_resampled(device_type=device_type, start=start, end=end, period=period,
+                                     aggregations=aggregations, max_devices=max_devices,
+                                     batch_size=batch_size, return_errors=return_errors,
+                                     compact=compact)
+
+def get_var_df(url=ENDPOINT, device_id=DEVICE_LABEL, variable=VARIABLE_LABEL,
+            headers=HEADERS, last_values=5000, throttle=None, arrow=ARROW_PARSING):
+    # tested: good for v1.6 but NOT v2.0
+    '''
+    Function to generate dataframe of a single variable's values
+    :param url: api url for ubidots (see Global variables)
+    :param device_id: (not used currently) individual device label as created by Ubidots
+    :param variable: individual variable label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param last_values: number that designates how many of the most recent values to return in the dataframe
+    :param throttle: optional _Throttle shared between threads to respect the account rate limit
+    :param arrow: if True, parse with pyarrow (when installed) into Arrow-backed columns
+    :return: pandas.core.frame.DataFrame containing variable values plus timestamps for single device
+    '''
+    client = _client(headers=headers, endpoint=url)
+    if throttle is not None:
+        client.throttle = throttle
+    return client.get_var_df(variable=variable, last_values=last_values, arrow=arrow)
+
+def iter_var_values(variable=VARIABLE_LABEL, headers=HEADERS, start=None, end=None,
+                    page_size=PAGE_SIZE, label='value'):
+    '''
+    Streams a single variable's values page by page, optionally limited to a time window,
+    so that full-history pulls use constant memory.
+    :param variable: individual variable label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :param page_size: number of values per request and per chunk
+    :param label: name of the value column in each chunk
+    :return: generator of pandas.core.frame.DataFrame chunks, newest values first
+    '''
+    return _client(headers=headers).iter_var_values(variable=variable, start=start, end=end,
+                                                    page_size=page_size, label=label)
+
+def audit_tokens(headers=HEADERS, device_type=None, max_devices=MAX_DEVICES, rate_limit=RATE_LIMIT,
+                 max_connections=MAX_CONNECTIONS):
+    '''
+    Lists the tokens of every device and checks that each one can read its device's variables.
+    Devices are audited concurrently, and each validation result is cached for TOKEN_CHECK_TTL
+    seconds, so a repeated audit only lists the tokens again. Devices without a token, and
+    devices whose tokens could not be listed, are reported instead of aborting the audit.
+    :param headers: http headers (account token) used to list devices and their tokens
+    :param device_type: only audit devices of this type (None = all devices)
+    :param max_devices: max number of devices audited at the same time
+    :param rate_limit: max requests per second for each token
+    :param max_connections: max number of requests in flight at the same time for each token
+    :return: pandas.core.frame.DataFrame with one row per device token (one row for a device
+             without a token): name, id, token (masked), valid, status, checked_at, cached and error
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.audit_tokens(device_type=device_type, max_devices=max_devices)
+
+def post_device_data(df, device_label=DEVICE_LABEL, headers=HEADERS, batch_size=WRITE_BATCH_SIZE,
+                     max_bytes=WRITE_MAX_BYTES, rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS,
+                     return_errors=False):
+    '''
+    Uploads the values of a wide frame to a device, e.g. corrected or derived series.
+    Values are buffered into v1.6 device requests holding several variables and timestamps
+    each, and up to max_connections requests are in flight at a time over the pooled session,
+    with the usual backoff and rate limit. Bodies are built as requests complete, so a large
+    frame never sits in memory as JSON.
+    Writes are not idempotent, so a request is only retried on a 429 answer: after a
+    connection error, a timeout or a 5xx it may or may not have been stored. Such a request
+    does not stop the upload; its values are counted as failed and, with return_errors,
+    listed with their time range. Sending them again is at-least-once delivery: a value
+    stored by the failed request after all is then stored twice.
+    :param df: wide frame in the get_device_data layout (Timestamp column or compact index, one
+               column per variable label; Human readable date (UTC), Context and name are ignored)
+    :param device_label: label of the device (not its id); variables missing on it are created
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param batch_size: max number of values per request (see Global variables)
+    :param max_bytes: max size in bytes of a request body (see Global variables)
+    :param rate_limit: max requests per second for this token
+    :param max_connections: max number of requests in flight at the same time for this token
+    :param return_errors: if True, also return the requests that failed
+    :return: number of values sent, and with return_errors a pandas.core.frame.DataFrame with the
+             first_timestamp, last_timestamp, number of values and error of each failed request
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.post_device_data(df, device_label=device_label, batch_size=batch_size,
+                                   max_bytes=max_bytes, max_requests=max_connections,
+                                   return_errors=return_errors)
+
+def post_type_data(df, device_type='pile-temp-and-cercospora-monitor', headers=HEADERS, devices=None,
+                   max_devices=MAX_DEVICES, batch_size=WRITE_BATCH_SIZE, max_bytes=WRITE_MAX_BYTES,
+                   return_errors=False, rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS):
+    '''
+    Uploads the values of a wide frame of several devices (get_type_data layout, with a 'name'
+    column) to those devices, several devices at a time (see post_device_data).
+    :param df: wide frame in the get_type_data layout
+    :param device_type: device type label as indicated in Ubidots, used to find each name's device label
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param devices: optional dictionary of device name -> device label (skips the device listing)
+    :param max_devices: max number of devices uploaded at the same time
+    :param batch_size: max number of values per request (see Global variables)
+    :param max_bytes: max size in bytes of a request body (see Global variables)
+    :param return_errors: if True, also return the devices and requests that failed
+    :param rate_limit: max requests per second for this token
+    :param max_connections: max number of requests in flight at the same time for this token
+    :return: pandas.core.frame.DataFrame with the name, label and number of values sent and failed
+             of each device, and with return_errors a second DataFrame with the name, label (id)
+             and error of each device that failed or was not found, and of each failed request
+    '''
+    client = _client(headers=headers, rate_limit=rate_limit, max_connections=max_connections)
+    return client.post_type_data(df, device_type=device_type, devices=devices, max_devices=max_devices,
+                                 batch_size=batch_size, max_bytes=max_bytes, return_errors=return_errors)
+
+def get_all_devices_df(headers=HEADERS, device_type=None, fields=None):
+    #tested: good for v2.0
+    '''
+    Function to generate dataframe of all Ubidot devices and associated demographic info (not variables).
+    Mostly used to find specific device label
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param device_type: only list devices of this type (filtered by the server when it can)
+    :param fields: comma-separated device fields to return, e.g. DEVICE_FIELDS (None = all fields)
+    :return: pandas.core.frame.DataFrame containing list of devices and their properties
+    '''
+    return _client(headers=headers).get_all_devices_df(device_type=device_type, fields=fields)
+
+def get_device_vars_df(device_id=DEVICE_LABEL, headers=HEADERS, throttle=None):
+    # tested: good for v2.0
+    '''
+    Function to generate dataframe of a single device's variable names and associated demographic info.
+    Mostly used to find variable labels for a specific device
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param throttle: optional _Throttle shared between threads to respect the account rate limit
+    :return: pandas.core.frame.DataFrame containing variable info for single device
+    '''
+    client = _client(headers=headers)
+    if throttle is not None:
+        client.throttle = throttle
+    return client.get_device_vars_df(device_id=device_id)
+
+def _get_all_devices(headers=HEADERS, device_type=None, fields=None):
+    # tested: good for v2.0
+    '''
+    Function to generate list of all Ubidot devices and associated demographic info (not variables).
+    :private function (should not need to run, but used in main fxns)
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param device_type: only list devices of this type (filtered by the server when it can)
+    :param fields: comma-separated device fields to return (None = all fields)
+    :return: a list of dictionaries (1 dict = 1 device)
+    '''
+    return _client(headers=headers).get_all_devices(device_type=device_type, fields=fields)
+
+def _get_device_vars(device_id=DEVICE_LABEL, headers=HEADERS, throttle=None):
+    # tested: good for v2.0
+    '''
+    Function to generate list of a single device's variables and associated demographic info.
+    :private function (should not need to run, but used in main fxns)
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param throttle: optional _Throttle shared between threads to respect the account rate limit
+    :return: a list of dictionaries (1 dict = 1 device)
+    '''
+    client = _client(headers=headers)
+    if throttle is not None:
+        client.throttle = throttle
+    return client.get_device_vars(device_id=device_id)
+
+def _get_var(url=ENDPOINT, device=DEVICE_LABEL, variable=VARIABLE_LABEL,
+            token=TOKEN, last_values=5000):
+    # tested: good for v1.6 but NOT v2.0
+    try:
+        '''
+        # not working, and I'm not sure why
+        url = "https://{}/api/v1.6/devices/{}/{}/values/"\
+              "?page_size={}&format=csv".format(url,
+                                                device,
+                                                variable,
+                                                last_values)
+        '''
+        url = "https://{}/api/v1.6/variables/{}/values/"\
+              "?page_size={}".format(url,
+                                     variable,
+                                     last_values)
+        headers = {"X-Auth-Token": token}#, "Content-Type": "application/json"}
+        logger.debug("GET %s", url)
+        req = SESSION.get(url, headers=headers)
+        #print (req.text)
+    except Exception as e:
+        logger.error("Error posting, details: %s", e)
+        raise
+    return req.text
+
+def _validate_token(device_id=DEVICE_LABEL, token=TOKEN, endpoint=ENDPOINT):
+    #tested: good for v2.0
+    '''
+    Checks that a device token can read its device's variables (see UbidotsClient.validate_token).
+    :private function (should not need to run, but used in main fxns)
+    :param device_id: individual device label as created by Ubidots
+    :param token: device token to check
+    :param endpoint: api url for ubidots (see Global variables)
+    :return: True if the token is valid
+    '''
+    return _client(endpoint=endpoint).validate_token(device_id=device_id, token=token)['valid']
+
+def _get_device_token(device_id=DEVICE_LABEL, headers=HEADERS):
+    # tested: good for v1.6 but NOT v2.0
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param device_id: individual device label as created by Ubidots
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :return: the first token of the device, or None if it has no token
+    '''
+    tokens = _client(headers=headers).get_device_tokens(device_id=device_id)
+    return tokens[0]["token"] if tokens else None
+
+def _list_devices(token = TOKEN):
+    # tested: requires mix of v1.6 and v2.0
+    '''
+    Kept for existing scripts: audits the tokens of every device (see audit_tokens).
+    :private function (should not need to run, but used in main fxns)
+    :param token: account token used to list the devices and their tokens
+    :return: pandas.core.frame.DataFrame, one row per device token
+    '''
+    return audit_tokens(headers={"X-Auth-Token": token})
+
+def _client(headers=HEADERS, endpoint=ENDPOINT, rate_limit=RATE_LIMIT,
+            max_connections=MAX_CONNECTIONS):
+    '''
+    Builds the UbidotsClient used by the module-level functions. All of them share
+    the module SESSION, the module CATALOG_CACHE and, for a given token, the same _Throttle.
+    :private function (should not need to run, but used in main fxns)
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param endpoint: api url for ubidots (see Global variables)
+    :param rate_limit: max requests per second for this token
+    :param max_connections: max number of requests in flight at the same time for this token
+    :return: UbidotsClient instance
+    '''
+    return UbidotsClient(headers=headers, endpoint=endpoint, session=SESSION,
+                         rate_limit=rate_limit, max_connections=max_connections,
+                         catalog_cache=CATALOG_CACHE)
+
+def invalidate_catalog(headers=None):
+    '''
+    Drops cached device and variable catalogs, e.g. after adding devices or variables in Ubidots.
+    :param headers: only drop the catalogs cached for this token (None = all tokens)
+    '''
+    if CATALOG_CACHE is not None:
+        CATALOG_CACHE.invalidate(token=headers.get("X-Auth-Token") if headers else None)
@@ -0,0 +1,173 @@
+'''
+On-disk cache of device and variable catalogs, validated with ETags, and of
+device token validation results.
+'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .config import CATALOG_DB, CATALOG_TTL, DEVICE_LABEL, TOKEN, TOKEN_CHECK_TTL
+
+class CatalogCache:
+    '''
+    Two-level (memory and SQLite) cache of v2.0 device and variable listings, shared across
+    runs and app reloads. Entries are keyed by a hash of the token (the token itself is never
+    written to disk) and the listing url, and are used as is for ttl seconds. Stale entries
+    keep their ETag/Last-Modified so they can be revalidated with a conditional request.
+    It also remembers the outcome of device token validations (see audit_tokens), keyed by
+    a hash of the device token, for check_ttl seconds.
+    :param path: path of the SQLite file (see Global variables), or None for memory only
+    :param ttl: seconds an entry is used without asking the server
+    :param check_ttl: seconds a token validation result is reused
+    '''
+    def __init__(self, path=CATALOG_DB, ttl=CATALOG_TTL, check_ttl=TOKEN_CHECK_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.check_ttl = check_ttl
+        self._memory = {}
+        self._checks = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def get(self, token=TOKEN, url=''):
+        '''
+        :return: dict with the results, etag, last_modified and fetched_at of the listing, or None
+        '''
+        key = self._key(token, url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self.path is not None:
+                row = self._db().execute('''SELECT results, etag, last_modified, fetched_at
+                                            FROM catalog WHERE key = ?''', (key,)).fetchone()
+                if row:
+                    entry = {'results': json.loads(row[0]), 'etag': row[1],
+                             'last_modified': row[2], 'fetched_at': row[3]}
+                    self._memory[key] = entry
+        return entry
+
+    def put(self, token=TOKEN, url='', results=None, etag=None, last_modified=None):
+        '''
+        Stores a freshly downloaded listing.
+        '''
+        key = self._key(token, url)
+        entry = {'results': results, 'etag': etag, 'last_modified': last_modified,
+                 'fetched_at': time.time()}
+        with self._lock:
+            self._memory[key] = entry
+            if self.path is not None:
+                with self._db():
+                    self._db().execute('INSERT OR REPLACE INTO catalog VALUES (?, ?, ?, ?, ?, ?)',
+                                       (key, _token_hash(token), json.dumps(results), etag,
+                                        last_modified, entry['fetched_at']))
+
+    def touch(self, token=TOKEN, url=''):
+        '''
+        Marks a listing as fresh again after the server confirmed it did not change.
+        '''
+        key = self._key(token, url)
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                self._memory[key]['fetched_at'] = now
+            if self.path is not None:
+                with self._db():
+                    self._db().execute('UPDATE catalog SET fetched_at = ? WHERE key = ?', (now, key))
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    def get_token_check(self, token=TOKEN, device_id=DEVICE_LABEL):
+        '''
+        :return: dict with the valid, status and checked_at of the last validation of a device
+                 token, or None if it was never validated or the result is older than check_ttl
+        '''
+        key = self._key(token, device_id)
+        with self._lock:
+            check = self._checks.get(key)
+            if check is None and self.path is not None:
+                row = self._db().execute('''SELECT valid, status, checked_at
+                                            FROM token_checks WHERE key = ?''', (key,)).fetchone()
+                if row:
+                    check = {'valid': bool(row[0]), 'status': row[1], 'checked_at': row[2]}
+                    self._checks[key] = check
+        if check is None or time.time() - check['checked_at'] >= self.check_ttl:
+            return None
+        return check
+
+    def put_token_check(self, token=TOKEN, device_id=DEVICE_LABEL, valid=False, status=None):
+        '''
+        Stores the outcome of a device token validation (the token itself is not stored).
+        :return: the stored dict with valid, status and checked_at
+        '''
+        key = self._key(token, device_id)
+        check = {'valid': bool(valid), 'status': status, 'checked_at': time.time()}
+        with self._lock:
+            self._checks[key] = check
+            if self.path is not None:
+                with self._db():
+                    self._db().execute('INSERT OR REPLACE INTO token_checks VALUES (?, ?, ?, ?, ?)',
+                                       (key, _token_hash(token), int(check['valid']), status,
+                                        check['checked_at']))
+        return check
+
+    def invalidate(self, token=None):
+        '''
+        Drops cached listings and token validation results.
+        :param token: only drop the entries of this token (None = all tokens)
+        '''
+        with self._lock:
+            if token is None:
+                self._memory.clear()
+                self._checks.clear()
+            else:
+                prefix = _token_hash(token) + ' '
+                self._memory = {k: v for k, v in self._memory.items() if not k.startswith(prefix)}
+                self._checks = {k: v for k, v in self._checks.items() if not k.startswith(prefix)}
+            if self.path is not None:
+                with self._db():
+                    for table in ('catalog', 'token_checks'):
+                        if token is None:
+                            self._db().execute(f'DELETE FROM {table}')
+                        else:
+                            self._db().execute(f'DELETE FROM {table} WHERE token = ?', (_token_hash(token),))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _key(self, token, url):
+        return f"{_token_hash(token)} {url}"
+
+    def _db(self):
+        # Opened on first use so that importing the module does not create the file
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute('''CREATE TABLE IF NOT EXISTS catalog (
+                                          key TEXT PRIMARY KEY,
+                                          token TEXT,
+                                          results TEXT,
+                                          etag TEXT,
+                                          last_modified TEXT,
+                                          fetched_at REAL)''')
+                self._conn.execute('''CREATE TABLE IF NOT EXISTS token_checks (
+                                          key TEXT PRIMARY KEY,
+                                          token TEXT,
+                                          valid INTEGER,
+                                          status INTEGER,
+                                          checked_at REAL)''')
+        return self._conn
+
+def _token_hash(token):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: short sha256 digest of a token, safe to store or use as a cache key
+    '''
+    return hashlib.sha256((token or '').encode()).hexdigest()[:16]
@@ -0,0 +1,302 @@
+'''
+Command line entry point (see main), also run by ubidots_python_api_test_HTTP.py.
+'''
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .config import (DEVICE_FIELDS, ENDPOINT, EXPORT_DIR, MAX_CONNECTIONS, MAX_DEVICES, MAX_WORKERS, RATE_LIMIT,
+                     SYNC_DB)
+from .client import AGGREGATIONS
+from .api import _client, get_all_type_var_ids_and_location
+
+logger = logging.getLogger(__name__)
+
+class bcolors:
+    # https://stackoverflow.com/questions/287871/how-do-i-print-colored-text-to-the-terminal
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+TOKEN_ENV = 'UBIDOTS_TOKEN' # Environment variable the command line reads the API token from
+OUTPUT_FORMATS = ('csv', 'json', 'parquet', 'feather') # Table formats the command line can write
+
+def main(argv=None):
+    '''
+    Command line entry point, e.g. for unattended (cron) pulls:
+
+        python ubidots_python_api_test_HTTP.py catalog --device-type pile-temp-and-cercospora-monitor --unl
+        python ubidots_python_api_test_HTTP.py values -t TYPE_A -t TYPE_B --start 2024-06-01 --jobs 2
+        python ubidots_python_api_test_HTTP.py export -t TYPE_A --start 2024-06-01 --end 2024-06-02
+        python ubidots_python_api_test_HTTP.py sync -t TYPE_A --store output/ubidots_sync.sqlite
+        python ubidots_python_api_test_HTTP.py devices -t TYPE_A -o devices.json
+        python ubidots_python_api_test_HTTP.py audit -t TYPE_A -o output
+
+    The token is read from --token-file or the UBIDOTS_TOKEN environment variable. Every
+    device type is one job; --jobs runs several of them at the same time (they share the
+    token's rate limit). The devices subcommand only lists devices, without loading pandas.
+    The audit subcommand checks every device token and fails if one of them is not valid.
+    Without a subcommand, the interactive UNL export runs as before.
+    :param argv: list of arguments (None = sys.argv[1:])
+    :return: exit status: 0 if every job succeeded, 1 if a job, one of its devices or (audit)
+             one of the device tokens failed
+    '''
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format="%(levelname)s %(message)s")
+    if args.command is None:
+        return _interactive_unl_export(token=_read_token(args.token_file))
+
+    token = _read_token(args.token_file)
+    if not token:
+        parser.error(f"no API token: set {TOKEN_ENV} or pass --token-file")
+    if args.command == 'devices':
+        client = _client(headers={"X-Auth-Token": token}, endpoint=args.endpoint,
+                         rate_limit=args.rate_limit, max_connections=args.max_connections)
+        return _write_devices(client, device_types=args.device_type, fields=args.fields,
+                              output=args.output)
+    if args.command == 'audit':
+        args.device_type = args.device_type or [None]
+    jobs = [(device_type, _client(headers={"X-Auth-Token": token}, endpoint=args.endpoint,
+                                  rate_limit=args.rate_limit, max_connections=args.max_connections))
+            for device_type in dict.fromkeys(args.device_type)]
+    store = None
+    if args.command == 'sync':
+        from .store import SyncStore
+        store = SyncStore(args.store)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = [pool.submit(_run_cli_job, args.command, client, device_type, args, store)
+                       for device_type, client in jobs]
+            status = 0
+            failed_what = 'tokens' if args.command == 'audit' else 'devices'
+            for (device_type, _), future in zip(jobs, futures):
+                label = device_type or 'all devices'
+                try:
+                    summary, failed = future.result()
+                except Exception as exc:
+                    logger.error("%s: %s failed: %s", label, args.command, exc)
+                    print(f"{label}: FAILED ({exc})")
+                    status = 1
+                    continue
+                print(f"{label}: {summary}" + (f", {failed} {failed_what} failed" if failed else ""))
+                if failed:
+                    status = 1
+    finally:
+        if store is not None:
+            store.close()
+    return status
+
+def _build_parser():
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: argparse.ArgumentParser of the command line (see main)
+    '''
+    parser = argparse.ArgumentParser(description="Pull device catalogs and values from Ubidots.")
+    parser.add_argument('--token-file', help=f"file holding the API token (default: ${TOKEN_ENV})")
+    parser.add_argument('--endpoint', default=ENDPOINT, help="api host or base url")
+    parser.add_argument('--rate-limit', type=float, default=RATE_LIMIT,
+                        help="max requests per second for the token, shared by all jobs (0 = no limit)")
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                        help="max requests in flight for the token, shared by all jobs")
+    parser.add_argument('--log-level', default='info', choices=['debug', 'info', 'warning', 'error'])
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-t', '--device-type', action='append', required=True,
+                        help="device type label (repeat for several device types)")
+    common.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of device types processed at the same time")
+    common.add_argument('--max-devices', type=int, default=MAX_DEVICES,
+                        help="max devices processed at the same time within a job")
+    window = argparse.ArgumentParser(add_help=False)
+    window.add_argument('--start', help="only values at or after this time (date or epoch ms)")
+    window.add_argument('--end', help="only values at or before this time (date or epoch ms)")
+    window.add_argument('--last-values', type=int, default=5000,
+                        help="max values per variable")
+    window.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                        help="max variables downloaded at the same time within a device")
+    window.add_argument('--bulk', action='store_true',
+                        help="download several variables per request (data/raw/series)")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('-o', '--output', default='.', help="directory the files are written to")
+    output.add_argument('-f', '--format', default='csv', choices=OUTPUT_FORMATS)
+
+    catalog = commands.add_parser('catalog', parents=[common, output],
+                                  help="variable ids and location of every device")
+    catalog.add_argument('--unl', action='store_true',
+                         help="keep only the name, rh, t, lat and lng columns (UNL export)")
+    values = commands.add_parser('values', parents=[common, window, output],
+                                 help="values of every device, one table per device type")
+    values.add_argument('--period', help="resample to this period, e.g. 1H or 1D")
+    values.add_argument('--aggregation', action='append', choices=AGGREGATIONS,
+                        help="statistic of each period (repeat for several; default mean)")
+    export = commands.add_parser('export', parents=[common, window],
+                                 help="add values to the partitioned columnar dataset, replacing re-exported ones")
+    export.add_argument('--root', default=EXPORT_DIR, help="dataset directory")
+    export.add_argument('-f', '--format', default='parquet', choices=['parquet', 'feather'])
+    export.add_argument('--compression', default='zstd')
+    sync = commands.add_parser('sync', parents=[common],
+                               help="incrementally sync values into the local SQLite store")
+    sync.add_argument('--store', default=SYNC_DB, help="path of the SQLite store")
+    sync.add_argument('--initial-start', help="start of the window for variables never synced before")
+    sync.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                      help="max variables synced at the same time within a device")
+    devices = commands.add_parser('devices', help="list devices as JSON (does not load pandas)")
+    devices.add_argument('-t', '--device-type', action='append',
+                         help="only devices of this type (repeat for several; default all)")
+    devices.add_argument('--fields', default=DEVICE_FIELDS,
+                         help="comma-separated device fields ('' = all fields)")
+    devices.add_argument('-o', '--output', help="file the JSON is written to (default: standard output)")
+    audit = commands.add_parser('audit', parents=[output],
+                                help="check that every device token is valid (results are cached)")
+    audit.add_argument('-t', '--device-type', action='append',
+                       help="only devices of this type (repeat for several; default all)")
+    audit.add_argument('-j', '--jobs', type=int, default=1,
+                       help="number of device types audited at the same time")
+    audit.add_argument('--max-devices', type=int, default=MAX_DEVICES,
+                       help="maximum number of devices audited at the same time")
+    return parser
+
+def _read_token(token_file=None):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param token_file: file holding the token (None = read the UBIDOTS_TOKEN environment variable)
+    :return: API token, or '' if none is set
+    '''
+    if token_file:
+        with open(token_file) as f:
+            return f.read().strip()
+    return os.environ.get(TOKEN_ENV, '').strip()
+
+def _run_cli_job(command, client, device_type, args, store=None):
+    '''
+    Runs one command line subcommand for one device type.
+    :private function (should not need to run, but used in main fxns)
+    :return: tuple of (summary text, number of devices that failed)
+    '''
+    from .dataset import export_dataset
+    if command == 'audit':
+        report_df = client.audit_tokens(device_type=device_type, max_devices=args.max_devices)
+        path = _write_table(report_df, args.output, f'token_audit_{device_type or "all"}', args.format)
+        valid = report_df['valid'].fillna(False)
+        tokenless = int((report_df['error'] == 'no token').sum())
+        bad = len(report_df) - int(valid.sum()) - tokenless
+        return f"{int(valid.sum())} valid tokens, {tokenless} devices without a token -> {path}", bad
+    if command == 'catalog':
+        df, errors_df = client.get_all_type_var_ids_and_location(device_type=device_type,
+                                                                  max_devices=args.max_devices,
+                                                                  return_errors=True)
+        if args.unl:
+            df = df.reindex(columns=['name', 'rh', 't', 'lat', 'lng'])
+        path = _write_table(df, args.output, f'catalog_{device_type}', args.format)
+        return f"{len(df)} devices -> {path}", len(errors_df)
+    if command == 'sync':
+        df, errors_df = client.sync_type_data(device_type=device_type, store=store,
+                                              initial_start=args.initial_start,
+                                              max_devices=args.max_devices,
+                                              max_workers=args.max_workers,
+                                              return_errors=True)
+        new_values = int(df['new_values'].sum()) if not df.empty else 0
+        return f"{new_values} new values -> {args.store}", len(errors_df)
+    if command == 'values' and args.period:
+        df, errors_df = client.get_type_resampled(device_type=device_type, start=args.start,
+                                                  end=args.end, period=args.period,
+                                                  aggregations=tuple(args.aggregation or ('mean',)),
+                                                  max_devices=args.max_devices, return_errors=True)
+    else:
+        df, errors_df = client.get_type_data(device_type=device_type, last_values=args.last_values,
+                                             max_devices=args.max_devices, max_workers=args.max_workers,
+                                             return_errors=True, bulk=args.bulk,
+                                             start=args.start, end=args.end)
+    if command == 'export':
+        rows = export_dataset(df, device_type=device_type, root=args.root,
+                              file_format=args.format, compression=args.compression)
+        return f"{rows} values -> {args.root}", len(errors_df)
+    path = _write_table(df, args.output, f'values_{device_type}', args.format)
+    return f"{len(df)} rows -> {path}", len(errors_df)
+
+def _write_devices(client, device_types=None, fields=DEVICE_FIELDS, output=None):
+    '''
+    Writes the devices of the given types (all devices if None) as a JSON list.
+    :private function (should not need to run, but used in main fxns)
+    :param output: path of the JSON file (None = standard output)
+    :return: exit status
+    '''
+    devices = []
+    for device_type in device_types or [None]:
+        devices.extend(client.get_all_devices(device_type=device_type, fields=fields or None))
+    if output is None:
+        print(json.dumps(devices, indent=2))
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(devices, f, indent=2)
+        print(f"{len(devices)} devices -> {output}")
+    return 0
+
+def _write_table(df, directory, name, file_format='csv'):
+    '''
+    Writes a DataFrame to a timestamped file, e.g. values_<device type>_20240604_120000.csv.
+    :private function (should not need to run, but used in main fxns)
+    :param file_format: one of OUTPUT_FORMATS (parquet and feather require pyarrow)
+    :return: path of the file written
+    '''
+    import pandas as pd
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(directory, f'{name}_{timestamp}.{file_format}')
+    df = df.reset_index(drop=not isinstance(df.index, pd.DatetimeIndex))
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+    elif file_format == 'json':
+        df.to_json(path, orient='records', lines=True, date_format='iso')
+    elif file_format == 'parquet':
+        df.to_parquet(path, index=False)
+    elif file_format == 'feather':
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Unknown file_format {file_format!r}, expected one of {OUTPUT_FORMATS}")
+    return path
+
+def _interactive_unl_export(token=''):
+    '''
+    The original double-click flow (used by the Western Sugar exe): asks for the API token
+    unless one is set, writes the UNL export of the CLS sensors and waits before closing.
+    :private function (should not need to run, but used in main fxns)
+    :return: exit status
+    '''
+    # Initialization message
+    print("Initializing code...")
+
+    # Prompt the user for the API token
+    while not token:
+        token = input("Please enter your API token: ")
+        if not token:
+            print("API token cannot be empty. Please try again.")
+
+    # Call the function with the necessary parameters
+    get_all_type_var_ids_and_location(
+        device_type='pile-temp-and-cercospora-monitor',
+        headers={"X-Auth-Token": token},
+        unl_export=True)
+
+    # Display the dataframe (optional)
+    print("Dataframe export complete. Resulting CSV can be found in the current working directory (i.e., 'code').")
+
+    # Inform the user that the window will close and add a delay
+    print("The window will close in 10 seconds. Please make a note of any information displayed.")
+    time.sleep(10)
+    return 0
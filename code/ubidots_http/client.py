@@ -0,0 +1,1258 @@
+'''
+UbidotsClient: the token, endpoint and sessions used by every request.
+
+Listing devices and variables returns plain lists of dictionaries and never
+imports pandas; methods that return DataFrames import the frames module on first use.
+'''
+
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from .config import (ARROW_PARSING, BULK_BATCH_SIZE, DEVICE_FIELDS, DEVICE_LABEL, DEVICE_TYPE_FILTER,
+                     ENDPOINT, MAX_CONNECTIONS, MAX_DEVICES, MAX_WORKERS, PAGE_SIZE, RATE_LIMIT,
+                     RESAMPLE_PERIOD, RESAMPLE_REJECTED, RESAMPLE_UNSUPPORTED, RETRY_STATUSES, SYNC_DB,
+                     TOKEN, VARIABLE_LABEL, WRITE_BATCH_SIZE, WRITE_MAX_BYTES)
+from .transport import (_HTTP_STATUS_ERRORS, INSTRUMENTATION, AsyncUbidotsSession, UbidotsSession,
+                        _get_throttle, _mask)
+
+logger = logging.getLogger(__name__)
+
+class UbidotsClient:
+    '''
+    Client for the Ubidots REST API. It holds the token, endpoint and pooled session so
+    that the same headers reach every request.
+    Sync methods mirror the module-level functions. Async methods (prefixed with "a")
+    keep many requests in flight on one event loop; the fleet-wide extractors
+    (get_type_data, get_all_type_var_ids_and_location) run on them.
+    Use as an async context manager, or call aclose(), when using the async methods directly.
+    :param token: Ubidots API token (ignored if headers is given)
+    :param endpoint: api url for ubidots (see Global variables); a full base url such as
+                     'http://localhost:8000' is also accepted
+    :param headers: http headers to send with every request; built from token if None
+    :param session: UbidotsSession to reuse; a new one is created if None
+    :param rate_limit: max requests per second for this token
+    :param max_connections: max number of requests in flight at the same time for this token
+    :param catalog_cache: CatalogCache for device and variable catalogs (None = always ask the server)
+    '''
+    def __init__(self, token=TOKEN, endpoint=ENDPOINT, headers=None, session=None,
+                 rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS, catalog_cache=None):
+        self.headers = dict(headers) if headers is not None else {"X-Auth-Token": token}
+        self.token = self.headers.get("X-Auth-Token", token)
+        self.endpoint = endpoint
+        self.base_url = endpoint if "://" in endpoint else f"https://{endpoint}"
+        self.rate_limit = rate_limit
+        self.max_connections = max_connections
+        self.session = session if session is not None else UbidotsSession(pool_size=max_connections)
+        self.throttle = _get_throttle(headers=self.headers, rate_limit=rate_limit,
+                                      max_connections=max_connections)
+        self.catalog_cache = catalog_cache
+        self.instrumentation = getattr(self.session, 'instrumentation', INSTRUMENTATION)
+        self.server_resample = None # None until known, then whether the server accepts resample requests
+        self.rejected_resamples = set() # (period, aggregation) pairs the server refused to resample
+        self._async_session = None
+
+    # ---------------------------------------------------------------- sync API
+
+    def get_all_devices(self, device_type=None, fields=None):
+        '''
+        Lists devices, asking the server to filter by type and return only the given fields.
+        If the server rejects the filter, the full list is downloaded and filtered locally.
+        :param device_type: only list devices of this type
+        :param fields: comma-separated device fields to return (None = all fields)
+        :return: a list of dictionaries (1 dict = 1 device)
+        '''
+        try:
+            devices = self._paginate(self._devices_url(device_type=device_type, fields=fields))
+        except _HTTP_STATUS_ERRORS as e:
+            if not (device_type or fields) or e.response.status_code != 400:
+                raise
+            logger.info("Device filter not supported by the server, filtering locally")
+            devices = self._paginate(self._devices_url())
+        return _filter_device_type(devices, device_type=device_type)
+
+    def get_device_vars(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: a list of dictionaries (1 dict = 1 variable)
+        '''
+        return self._paginate(f"{self.base_url}/api/v2.0/devices/{device_id}/variables")
+
+    def get_device_tokens(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: a list of dictionaries (1 dict = 1 token of the device); empty if it has none
+        '''
+        # Not cached: the catalog cache is written to disk and must never hold tokens
+        return self._paginate(self._device_tokens_url(device_id), cache=False)
+
+    def validate_token(self, device_id=DEVICE_LABEL, token=TOKEN):
+        '''
+        Checks that a device token can read its device's variables (v2.0). The result is kept
+        in the catalog cache for TOKEN_CHECK_TTL seconds.
+        :param device_id: individual device label as created by Ubidots
+        :param token: device token to check
+        :return: dict with valid, status, checked_at (epoch seconds) and cached
+        '''
+        check = self._cached_token_check(token, device_id)
+        if check is None:
+            resp = self.session.get(self._token_check_url(device_id), headers={"X-Auth-Token": token},
+                                    throttle=self._token_throttle(token))
+            check = self._store_token_check(token, device_id, resp.status_code)
+        return check
+
+    def get_all_devices_df(self, device_type=None, fields=None):
+        '''
+        :param device_type: only list devices of this type
+        :param fields: comma-separated device fields to return (None = all fields)
+        :return: pandas.core.frame.DataFrame containing list of devices and their properties
+        '''
+        import pandas as pd
+        df = pd.DataFrame(self.get_all_devices(device_type=device_type, fields=fields))
+        logger.info("Listed %d devices", len(df))
+        return df
+
+    def get_device_vars_df(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: pandas.core.frame.DataFrame containing variable info for single device
+        '''
+        from .frames import _device_vars_df
+        return _device_vars_df(self.get_device_vars(device_id=device_id))
+
+    def get_var_df(self, variable=VARIABLE_LABEL, last_values=5000, start=None, end=None,
+                   arrow=ARROW_PARSING):
+        '''
+        :param variable: individual variable label as created by Ubidots
+        :param last_values: number that designates how many of the most recent values to return
+        :param start: only values at or after this time (epoch ms, datetime, or date string)
+        :param end: only values at or before this time (epoch ms, datetime, or date string)
+        :param arrow: if True, parse with pyarrow (when installed) into Arrow-backed columns
+        :return: pandas.core.frame.DataFrame containing variable values plus timestamps
+        '''
+        from .frames import _var_df_from_csv
+        url = self._values_url(variable=variable, last_values=last_values, start=start, end=end)
+        logger.debug("GET %s", url)
+        with self.instrumentation.span('variable', variable):
+            try:
+                req = self.session.get(url, headers=self.headers, throttle=self.throttle)
+                req.raise_for_status()
+            except Exception as e:
+                logger.error("Error posting, details: %s", e)
+                raise
+            return _var_df_from_csv(req.content, arrow=arrow)
+
+    def iter_var_values(self, variable=VARIABLE_LABEL, start=None, end=None, page_size=PAGE_SIZE,
+                        label='value'):
+        '''
+        Streams a variable's values page by page (see iter_var_values for parameters).
+        The next page is downloaded in the background while the caller processes the current one.
+        :return: generator of pandas.core.frame.DataFrame chunks, newest values first
+        '''
+        from .frames import _values_df_from_json
+        next = self._values_page_url(variable=variable, start=start, end=end, page_size=page_size)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self._get_json, next)
+            while future is not None:
+                data = future.result()
+                next = data.get("next")
+                future = pool.submit(self._get_json, next) if next else None
+                if data.get("results"):
+                    yield _values_df_from_json(data["results"], label=label)
+
+    def get_vars_bulk(self, variables, labels=None, last_values=5000, start=None, end=None,
+                      batch_size=BULK_BATCH_SIZE):
+        '''
+        Sync entry point for aget_vars_bulk.
+        '''
+        return self._run(self.aget_vars_bulk(variables=variables, labels=labels,
+                                             last_values=last_values, start=start, end=end,
+                                             batch_size=batch_size))
+
+    def get_vars_resampled(self, variables, labels=None, start=None, end=None, period=RESAMPLE_PERIOD,
+                           aggregation='mean', batch_size=BULK_BATCH_SIZE):
+        '''
+        Sync entry point for aget_vars_resampled.
+        '''
+        return self._run(self.aget_vars_resampled(variables=variables, labels=labels, start=start,
+                                                  end=end, period=period, aggregation=aggregation,
+                                                  batch_size=batch_size))
+
+    def get_device_resampled(self, device_id=DEVICE_LABEL, start=None, end=None, period=RESAMPLE_PERIOD,
+                             aggregations=('mean',), batch_size=BULK_BATCH_SIZE, compact=False):
+        '''
+        Sync entry point for aget_device_resampled (see get_device_resampled for parameters).
+        '''
+        return self._run(self.aget_device_resampled(device_id=device_id, start=start, end=end,
+                                                    period=period, aggregations=aggregations,
+                                                    batch_size=batch_size, compact=compact))
+
+    def get_type_resampled(self, device_type='pile-temp-and-cercospora-monitor', start=None, end=None,
+                           period=RESAMPLE_PERIOD, aggregations=('mean',), max_devices=MAX_DEVICES,
+                           batch_size=BULK_BATCH_SIZE, return_errors=False, compact=False):
+        '''
+        Sync entry point for aget_type_resampled (see get_type_resampled for parameters).
+        '''
+        return self._run(self.aget_type_resampled(device_type=device_type, start=start, end=end,
+                                                  period=period, aggregations=aggregations,
+                                                  max_devices=max_devices, batch_size=batch_size,
+                                                  return_errors=return_errors, compact=compact))
+
+    def get_device_data(self, device_id=DEVICE_LABEL, last_values=5000, max_workers=MAX_WORKERS,
+                        bulk=False, batch_size=BULK_BATCH_SIZE, compact=False, start=None, end=None):
+        '''
+        Downloads the device's variables with a bounded pool of worker threads,
+        or batch_size variables per request if bulk is True.
+        :param device_id: individual device label as created by Ubidots
+        :param last_values: number that designates how many of the most recent values to return
+        :param max_workers: max number of variables downloaded at the same time (1 = one at a time)
+        :param bulk: if True, fetch many variables per request
+        :param batch_size: max number of variables per bulk request
+        :param compact: if True, return the memory-compact schema
+        :param start: only values at or after this time (epoch ms, datetime, or date string)
+        :param end: only values at or before this time (epoch ms, datetime, or date string)
+        :return: pandas.core.frame.DataFrame containing variable values plus timestamps for single device
+        '''
+        from .frames import _merge_var_dfs
+        if bulk:
+            return self._run(self.aget_device_data(device_id=device_id, last_values=last_values,
+                                                   bulk=True, batch_size=batch_size,
+                                                   compact=compact, start=start, end=end))
+        with self.instrumentation.span('device', device_id):
+            var_ids = list(self.get_device_vars_df(device_id=device_id)['id'])
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(var_ids)))) as pool:
+                # map() keeps the variable order so the merged columns match a serial run
+                dfs = list(pool.map(lambda i: self.get_var_df(variable=i, last_values=last_values,
+                                                              start=start, end=end),
+                                    var_ids))
+        merged_df = _merge_var_dfs(dfs, compact=compact)
+        logger.info("Downloaded %d variables of device %s", len(var_ids), device_id)
+        return merged_df
+
+    def get_type_data(self, device_type='pile-temp-and-cercospora-monitor', last_values=5000,
+                      max_devices=MAX_DEVICES, max_workers=MAX_WORKERS, return_errors=False,
+                      bulk=False, batch_size=BULK_BATCH_SIZE, compact=False, start=None, end=None):
+        '''
+        Sync entry point for aget_type_data (see get_type_data for parameters).
+        '''
+        return self._run(self.aget_type_data(device_type=device_type,
+                                             last_values=last_values,
+                                             max_devices=max_devices,
+                                             max_workers=max_workers,
+                                             return_errors=return_errors,
+                                             bulk=bulk,
+                                             batch_size=batch_size,
+                                             compact=compact,
+                                             start=start,
+                                             end=end))
+
+    def get_all_type_var_ids_and_location(self, device_type='pile-temp-and-cercospora-monitor',
+                                          unl_export=False, max_devices=MAX_DEVICES,
+                                          return_errors=False, on_device=None):
+        '''
+        Sync entry point for aget_all_type_var_ids_and_location
+        (see get_all_type_var_ids_and_location for parameters).
+        '''
+        return self._run(self.aget_all_type_var_ids_and_location(device_type=device_type,
+                                                                 unl_export=unl_export,
+                                                                 max_devices=max_devices,
+                                                                 return_errors=return_errors,
+                                                                 on_device=on_device))
+
+    def sync_device_data(self, device_id=DEVICE_LABEL, store=None, initial_start=None,
+                         max_workers=MAX_WORKERS):
+        '''
+        Sync entry point for async_device_data (see sync_device_data for parameters).
+        '''
+        return self._run(self.async_device_data(device_id=device_id, store=store,
+                                                initial_start=initial_start,
+                                                max_workers=max_workers))
+
+    def sync_type_data(self, device_type='pile-temp-and-cercospora-monitor', store=None,
+                       initial_start=None, max_devices=MAX_DEVICES, max_workers=MAX_WORKERS,
+                       return_errors=False):
+        '''
+        Sync entry point for async_type_data (see sync_type_data for parameters).
+        '''
+        return self._run(self.async_type_data(device_type=device_type, store=store,
+                                              initial_start=initial_start,
+                                              max_devices=max_devices,
+                                              max_workers=max_workers,
+                                              return_errors=return_errors))
+
+    def audit_tokens(self, device_type=None, max_devices=MAX_DEVICES):
+        '''
+        Sync entry point for aaudit_tokens (see audit_tokens for parameters).
+        '''
+        return self._run(self.aaudit_tokens(device_type=device_type, max_devices=max_devices))
+
+    def post_device_data(self, df, device_label=DEVICE_LABEL, batch_size=WRITE_BATCH_SIZE,
+                         max_bytes=WRITE_MAX_BYTES, max_requests=MAX_CONNECTIONS, return_errors=False):
+        '''
+        Sync entry point for apost_device_data (see post_device_data for parameters).
+        '''
+        return self._run(self.apost_device_data(df, device_label=device_label, batch_size=batch_size,
+                                                max_bytes=max_bytes, max_requests=max_requests,
+                                                return_errors=return_errors))
+
+    def post_type_data(self, df, device_type='pile-temp-and-cercospora-monitor', devices=None,
+                       max_devices=MAX_DEVICES, batch_size=WRITE_BATCH_SIZE, max_bytes=WRITE_MAX_BYTES,
+                       return_errors=False):
+        '''
+        Sync entry point for apost_type_data (see post_type_data for parameters).
+        '''
+        return self._run(self.apost_type_data(df, device_type=device_type, devices=devices,
+                                              max_devices=max_devices, batch_size=batch_size,
+                                              max_bytes=max_bytes, return_errors=return_errors))
+
+    # --------------------------------------------------------------- async API
+
+    async def aget_all_devices(self, device_type=None, fields=None):
+        '''
+        Async version of get_all_devices.
+        '''
+        try:
+            devices = await self._apaginate(self._devices_url(device_type=device_type, fields=fields))
+        except _HTTP_STATUS_ERRORS as e:
+            if not (device_type or fields) or e.response.status_code != 400:
+                raise
+            logger.info("Device filter not supported by the server, filtering locally")
+            devices = await self._apaginate(self._devices_url())
+        return _filter_device_type(devices, device_type=device_type)
+
+    async def aget_device_vars(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: a list of dictionaries (1 dict = 1 variable)
+        '''
+        return await self._apaginate(f"{self.base_url}/api/v2.0/devices/{device_id}/variables")
+
+    async def aget_device_tokens(self, device_id=DEVICE_LABEL):
+        '''
+        Async version of get_device_tokens.
+        '''
+        return await self._apaginate(self._device_tokens_url(device_id), cache=False)
+
+    async def avalidate_token(self, device_id=DEVICE_LABEL, token=TOKEN):
+        '''
+        Async version of validate_token.
+        '''
+        check = self._cached_token_check(token, device_id)
+        if check is None:
+            resp = await self._get_async_session().get(self._token_check_url(device_id),
+                                                       headers={"X-Auth-Token": token},
+                                                       throttle=self._token_throttle(token))
+            check = self._store_token_check(token, device_id, resp.status_code)
+        return check
+
+    async def aget_device_vars_df(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: pandas.core.frame.DataFrame containing variable info for single device
+        '''
+        from .frames import _device_vars_df
+        return _device_vars_df(await self.aget_device_vars(device_id=device_id))
+
+    async def aget_var_df(self, variable=VARIABLE_LABEL, last_values=5000, start=None, end=None,
+                          arrow=ARROW_PARSING):
+        '''
+        Async version of get_var_df.
+        '''
+        from .frames import _var_df_from_csv
+        url = self._values_url(variable=variable, last_values=last_values, start=start, end=end)
+        logger.debug("GET %s", url)
+        with self.instrumentation.span('variable', variable):
+            req = await self._get_async_session().get(url, headers=self.headers, throttle=self.throttle)
+            req.raise_for_status()
+            return _var_df_from_csv(req.content, arrow=arrow)
+
+    async def aiter_var_values(self, variable=VARIABLE_LABEL, start=None, end=None,
+                               page_size=PAGE_SIZE, label='value'):
+        '''
+        Async version of iter_var_values; the next page is requested while the current one is consumed.
+        :return: async generator of pandas.core.frame.DataFrame chunks, newest values first
+        '''
+        from .frames import _values_df_from_json
+        next = self._values_page_url(variable=variable, start=start, end=end, page_size=page_size)
+        task = asyncio.ensure_future(self._aget_json(next))
+        try:
+            while task is not None:
+                data = await task
+                next = data.get("next")
+                task = asyncio.ensure_future(self._aget_json(next)) if next else None
+                if data.get("results"):
+                    yield _values_df_from_json(data["results"], label=label)
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def aget_vars_bulk(self, variables, labels=None, last_values=5000, start=None, end=None,
+                             batch_size=BULK_BATCH_SIZE):
+        '''
+        Downloads the values of many variables with one data/raw/series request per batch_size
+        variables; the batches are sent concurrently.
+        :param variables: list of variable ids
+        :param labels: value column name of each variable (defaults to the variable ids)
+        :param last_values: max number of most recent values kept per variable
+        :param start: only values at or after this time (epoch ms, datetime, or date string)
+        :param end: only values at or before this time (epoch ms, datetime, or date string)
+        :param batch_size: max number of variables per request
+        :return: list of DataFrames in the get_var_df layout, one per variable, in the given order
+        '''
+        dfs = []
+        for _, outcome in await self._abulk_batches(variables, labels=labels, last_values=last_values,
+                                                     start=start, end=end, batch_size=batch_size):
+            if isinstance(outcome, Exception):
+                raise outcome
+            dfs.extend(outcome)
+        return dfs
+
+    async def aget_vars_resampled(self, variables, labels=None, start=None, end=None,
+                                  period=RESAMPLE_PERIOD, aggregation='mean', batch_size=BULK_BATCH_SIZE):
+        '''
+        Asks the server for one aggregated value per period and variable (v1.6 data/stats/resample,
+        batch_size variables per request). If the server can't resample, the raw values are
+        streamed page by page instead and aggregated locally as they arrive, so memory stays
+        proportional to the number of periods rather than the number of values.
+        :param variables: list of variable ids
+        :param labels: value column name of each variable (defaults to the variable ids)
+        :param start: only values at or after this time (epoch ms, datetime, or date string)
+        :param end: only values at or before this time (epoch ms, datetime, or date string)
+        :param period: length of the periods, e.g. '15T', '1H', '1D', 'W' or 'M'
+        :param aggregation: one of AGGREGATIONS
+        :param batch_size: max number of variables per server request
+        :return: list of DataFrames in the get_var_df layout, one per variable, one row per period
+        '''
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {aggregation!r}, expected one of {AGGREGATIONS}")
+        _parse_period(period)
+        labels = list(labels) if labels is not None else list(variables)
+        key = (period, aggregation)
+        if self.server_resample is not False and key not in self.rejected_resamples:
+            try:
+                dfs = await self._aresample_server(variables, labels, start=start, end=end, period=period,
+                                                   aggregation=aggregation, batch_size=batch_size)
+                self.server_resample = True
+                return dfs
+            except _HTTP_STATUS_ERRORS as e:
+                status = e.response.status_code
+                if status in RESAMPLE_REJECTED:
+                    # Only this period/aggregation is refused, others may still be resampled by the server
+                    logger.info("Server can't resample %s %s (%s), resampling locally", period, aggregation, status)
+                    self.rejected_resamples.add(key)
+                elif status in RESAMPLE_UNSUPPORTED and not self.server_resample:
+                    logger.info("Resampling not supported by the server (%s), resampling locally", status)
+                    self.server_resample = False
+                else:
+                    raise
+        return list(await asyncio.gather(*(self._aresample_local(variable, label, start=start, end=end,
+                                                                 period=period, aggregation=aggregation)
+                                           for variable, label in zip(variables, labels))))
+
+    async def aget_device_resampled(self, device_id=DEVICE_LABEL, start=None, end=None,
+                                    period=RESAMPLE_PERIOD, aggregations=('mean',),
+                                    batch_size=BULK_BATCH_SIZE, compact=False):
+        '''
+        Async version of get_device_resampled (see get_device_resampled for parameters).
+        '''
+        from .frames import _merge_var_dfs
+        if isinstance(aggregations, str):
+            aggregations = [aggregations]
+        with self.instrumentation.span('device', device_id):
+            var_df = await self.aget_device_vars_df(device_id=device_id)
+            dfs = []
+            for aggregation in aggregations:
+                labels = list(var_df['label'])
+                if len(aggregations) > 1:
+                    labels = [f"{label}_{aggregation}" for label in labels]
+                dfs.extend(await self.aget_vars_resampled(list(var_df['id']), labels=labels, start=start,
+                                                          end=end, period=period, aggregation=aggregation,
+                                                          batch_size=batch_size))
+        return _merge_var_dfs(dfs, compact=compact)
+
+    async def aget_type_resampled(self, device_type='pile-temp-and-cercospora-monitor', start=None,
+                                  end=None, period=RESAMPLE_PERIOD, aggregations=('mean',),
+                                  max_devices=MAX_DEVICES, batch_size=BULK_BATCH_SIZE,
+                                  return_errors=False, compact=False):
+        '''
+        Async version of get_type_resampled (see get_type_resampled for parameters).
+        '''
+        from .frames import _stack_device_frames, _type_df_from_devices
+        with self.instrumentation.span('type', device_type):
+            type_df = _type_df_from_devices(await self.aget_all_devices(device_type=device_type, fields=DEVICE_FIELDS),
+                                            device_type=device_type)
+            results, errors_df = await _amap_devices(lambda device_id: self.aget_device_resampled(device_id=device_id,
+                                                                                                  start=start,
+                                                                                                  end=end,
+                                                                                                  period=period,
+                                                                                                  aggregations=aggregations,
+                                                                                                  batch_size=batch_size,
+                                                                                                  compact=compact),
+                                                     type_df=type_df,
+                                                     max_devices=max_devices)
+        type_data_df = _stack_device_frames(results, compact=compact)
+        if return_errors:
+            return type_data_df, errors_df
+        return type_data_df
+
+    async def aget_device_data(self, device_id=DEVICE_LABEL, last_values=5000,
+                               max_workers=MAX_WORKERS, bulk=False, batch_size=BULK_BATCH_SIZE,
+                               compact=False, start=None, end=None):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :param last_values: number that designates how many of the most recent values to return
+        :param max_workers: max number of variables of this device in flight at the same time
+        :param bulk: if True, fetch many variables per request
+        :param batch_size: max number of variables per bulk request
+        :param compact: if True, return the memory-compact schema
+        :param start: only values at or after this time (epoch ms, datetime, or date string)
+        :param end: only values at or before this time (epoch ms, datetime, or date string)
+        :return: pandas.core.frame.DataFrame containing variable values plus timestamps for single device
+        '''
+        from .frames import _merge_var_dfs
+        if bulk:
+            with self.instrumentation.span('device', device_id):
+                var_df = await self.aget_device_vars_df(device_id=device_id)
+                dfs = await self.aget_vars_bulk(list(var_df['id']), labels=list(var_df['label']),
+                                                last_values=last_values, start=start, end=end,
+                                                batch_size=batch_size)
+            return _merge_var_dfs(dfs, compact=compact)
+        slots = asyncio.Semaphore(max(1, max_workers))
+
+        async def fetch(variable):
+            async with slots:
+                return await self.aget_var_df(variable=variable, last_values=last_values,
+                                              start=start, end=end)
+
+        with self.instrumentation.span('device', device_id):
+            var_ids = list((await self.aget_device_vars_df(device_id=device_id))['id'])
+            dfs = await asyncio.gather(*(fetch(i) for i in var_ids))
+        merged_df = _merge_var_dfs(list(dfs), compact=compact)
+        logger.info("Downloaded %d variables of device %s", len(var_ids), device_id)
+        return merged_df
+
+    async def aget_type_data(self, device_type='pile-temp-and-cercospora-monitor', last_values=5000,
+                             max_devices=MAX_DEVICES, max_workers=MAX_WORKERS, return_errors=False,
+                             bulk=False, batch_size=BULK_BATCH_SIZE, compact=False, start=None, end=None):
+        '''
+        Async version of get_type_data (see get_type_data for parameters).
+        '''
+        from .frames import _stack_device_frames, _type_df_from_devices
+        with self.instrumentation.span('type', device_type):
+            type_df = _type_df_from_devices(await self.aget_all_devices(device_type=device_type, fields=DEVICE_FIELDS),
+                                            device_type=device_type)
+            if bulk:
+                results, errors_df = await self._abulk_type_data(type_df, last_values=last_values,
+                                                                 max_devices=max_devices,
+                                                                 batch_size=batch_size,
+                                                                 compact=compact,
+                                                                 start=start,
+                                                                 end=end)
+            else:
+                results, errors_df = await _amap_devices(lambda device_id: self.aget_device_data(device_id=device_id,
+                                                                                                 last_values=last_values,
+                                                                                                 max_workers=max_workers,
+                                                                                                 compact=compact,
+                                                                                                 start=start,
+                                                                                                 end=end),
+                                                         type_df=type_df,
+                                                         max_devices=max_devices)
+        type_data_df = _stack_device_frames(results, compact=compact)
+        if return_errors:
+            return type_data_df, errors_df
+        return type_data_df
+
+    async def aget_all_type_var_ids_and_location(self, device_type='pile-temp-and-cercospora-monitor',
+                                                 unl_export=False, max_devices=MAX_DEVICES,
+                                                 return_errors=False, on_device=None):
+        '''
+        Async version of get_all_type_var_ids_and_location
+        (see get_all_type_var_ids_and_location for parameters).
+        '''
+        from .frames import _export_unl, _pivot_type_var_ids, _type_df_from_devices
+        type_df = _type_df_from_devices(await self.aget_all_devices(device_type=device_type, fields=DEVICE_FIELDS),
+                                        device_type=device_type,
+                                        locations=True)
+
+        def report(name, var_list):
+            on_device(_pivot_type_var_ids([(name, var_list)], type_df))
+
+        results, errors_df = await _amap_devices(lambda device_id: self.aget_device_vars(device_id=device_id),
+                                                 type_df=type_df,
+                                                 max_devices=max_devices,
+                                                 on_result=report if on_device is not None else None)
+        pivot_df_wLocations = _pivot_type_var_ids(results, type_df)
+
+        if unl_export:
+            _export_unl(pivot_df_wLocations)
+
+        if return_errors:
+            return pivot_df_wLocations, errors_df
+        return pivot_df_wLocations
+
+    async def async_var(self, variable=VARIABLE_LABEL, store=None, device_id=DEVICE_LABEL,
+                        label=None, initial_start=None):
+        '''
+        Appends the values of a variable newer than its watermark to the store, then moves the
+        watermark forward. The watermark only moves once every page has been stored, so an
+        interrupted sync is simply resumed on the next run.
+        :param variable: individual variable label as created by Ubidots
+        :param store: SyncStore to append to (None = open the store at SYNC_DB for this call)
+        :param device_id: individual device label as created by Ubidots
+        :param label: variable label used as column name when reading the store back
+        :param initial_start: start of the window if the variable was never synced (None = full history)
+        :return: dict with the device, variable, label, number of new values and watermark
+        '''
+        if store is None:
+            from .store import SyncStore
+            with SyncStore(SYNC_DB) as store:
+                return await self.async_var(variable=variable, store=store, device_id=device_id,
+                                            label=label, initial_start=initial_start)
+        watermark = store.get_watermark(variable)
+        start = watermark + 1 if watermark is not None else initial_start
+        new_values = 0
+        last_timestamp = watermark
+        async for chunk in self.aiter_var_values(variable=variable, start=start):
+            new_values += store.append(variable, chunk)
+            chunk_last = int(chunk['Timestamp'].max())
+            last_timestamp = chunk_last if last_timestamp is None else max(last_timestamp, chunk_last)
+        store.set_watermark(variable, device_id=device_id, label=label, timestamp=last_timestamp)
+        return {'device': device_id, 'variable': variable, 'label': label,
+                'new_values': new_values, 'last_timestamp': last_timestamp}
+
+    async def async_device_data(self, device_id=DEVICE_LABEL, store=None, initial_start=None,
+                                max_workers=MAX_WORKERS):
+        '''
+        Async version of sync_device_data (see sync_device_data for parameters).
+        Without a store, the store at SYNC_DB is opened for this call.
+        '''
+        import pandas as pd
+        if store is None:
+            from .store import SyncStore
+            with SyncStore(SYNC_DB) as store:
+                return await self.async_device_data(device_id=device_id, store=store,
+                                                    initial_start=initial_start, max_workers=max_workers)
+        var_df = await self.aget_device_vars_df(device_id=device_id)
+        slots = asyncio.Semaphore(max(1, max_workers))
+
+        async def sync(variable, label):
+            async with slots:
+                return await self.async_var(variable=variable, store=store, device_id=device_id,
+                                            label=label, initial_start=initial_start)
+
+        rows = await asyncio.gather(*(sync(i, label) for i, label in zip(var_df['id'], var_df['label'])))
+        return pd.DataFrame(list(rows), columns=['device', 'variable', 'label', 'new_values',
+                                                 'last_timestamp'])
+
+    async def async_type_data(self, device_type='pile-temp-and-cercospora-monitor', store=None,
+                              initial_start=None, max_devices=MAX_DEVICES, max_workers=MAX_WORKERS,
+                              return_errors=False):
+        '''
+        Async version of sync_type_data (see sync_type_data for parameters).
+        Without a store, the store at SYNC_DB is opened for this call.
+        '''
+        import pandas as pd
+        from .frames import _type_df_from_devices
+        if store is None:
+            from .store import SyncStore
+            with SyncStore(SYNC_DB) as store:
+                return await self.async_type_data(device_type=device_type, store=store,
+                                                  initial_start=initial_start, max_devices=max_devices,
+                                                  max_workers=max_workers, return_errors=return_errors)
+        type_df = _type_df_from_devices(await self.aget_all_devices(device_type=device_type, fields=DEVICE_FIELDS),
+                                        device_type=device_type)
+        results, errors_df = await _amap_devices(lambda device_id: self.async_device_data(device_id=device_id,
+                                                                                          store=store,
+                                                                                          initial_start=initial_start,
+                                                                                          max_workers=max_workers),
+                                                 type_df=type_df,
+                                                 max_devices=max_devices)
+        dfs = []
+        for name, df in results:
+            df.insert(0, 'name', name)
+            dfs.append(df)
+
+        summary_df = pd.concat(dfs).reset_index(drop=True) if dfs else pd.DataFrame()
+        if return_errors:
+            return summary_df, errors_df
+        return summary_df
+
+    async def aaudit_tokens(self, device_type=None, max_devices=MAX_DEVICES):
+        '''
+        Async version of audit_tokens (see audit_tokens for parameters).
+        '''
+        import pandas as pd
+        devices = await self.aget_all_devices(device_type=device_type, fields=DEVICE_FIELDS)
+        type_df = {'name': [d.get('name') for d in devices], 'id': [d['id'] for d in devices]}
+
+        async def audit(device_id):
+            tokens = [t['token'] for t in await self.aget_device_tokens(device_id=device_id) if t.get('token')]
+            checks = await asyncio.gather(*(self.avalidate_token(device_id=device_id, token=token)
+                                            for token in tokens))
+            return device_id, list(zip(tokens, checks))
+
+        results, errors_df = await _amap_devices(audit, type_df=type_df, max_devices=max_devices)
+        rows = []
+        for name, (device_id, checks) in results:
+            if not checks:
+                rows.append({'name': name, 'id': device_id, 'error': 'no token'})
+            for token, check in checks:
+                rows.append({'name': name, 'id': device_id, 'token': _mask(token), **check})
+        for name, device_id, error in errors_df.itertuples(index=False):
+            rows.append({'name': name, 'id': device_id, 'error': error})
+        report_df = pd.DataFrame(rows, columns=['name', 'id', 'token', 'valid', 'status', 'checked_at',
+                                                'cached', 'error'])
+        report_df['valid'] = report_df['valid'].astype('boolean')
+        report_df['status'] = report_df['status'].astype('Int64')
+        report_df['checked_at'] = pd.to_datetime(report_df['checked_at'], unit='s', utc=True)
+        report_df['cached'] = report_df['cached'].eq(True)
+        logger.info("Audited %d tokens of %d devices: %d valid, %d invalid",
+                    report_df['token'].notna().sum(), len(devices), report_df['valid'].sum(),
+                    (~report_df['valid']).sum())
+        return report_df
+
+    async def apost_device_data(self, df, device_label=DEVICE_LABEL, batch_size=WRITE_BATCH_SIZE,
+                                max_bytes=WRITE_MAX_BYTES, max_requests=MAX_CONNECTIONS, return_errors=False):
+        '''
+        Async version of post_device_data (see post_device_data for parameters).
+        '''
+        import pandas as pd
+        from .frames import _write_bodies
+        _check_batch_size(batch_size)
+        url = f"{self.base_url}/api/v1.6/devices/{device_label}/"
+        headers = {**self.headers, "Content-Type": "application/json"}
+        session = self._get_async_session()
+        bodies = _write_bodies(df, batch_size=batch_size, max_bytes=max_bytes)
+        sent = 0
+        failed = []
+
+        async def sender():
+            # Each sender builds its next body only once its previous request is done
+            nonlocal sent
+            for count, first, last, body in bodies:
+                try:
+                    resp = await session.request("POST", url, headers=headers, throttle=self.throttle,
+                                                 idempotent=False, content=body)
+                    resp.raise_for_status()
+                except Exception as e:
+                    failed.append({'first_timestamp': first, 'last_timestamp': last, 'values': count,
+                                   'error': repr(e)})
+                    continue
+                sent += count
+
+        with self.instrumentation.span('write', device_label):
+            await asyncio.gather(*(sender() for _ in range(max(1, max_requests))))
+        failed_df = pd.DataFrame(failed, columns=['first_timestamp', 'last_timestamp', 'values', 'error'])
+        failed_df = failed_df.sort_values('first_timestamp', ignore_index=True)
+        if len(failed_df):
+            logger.error("Sent %d values to device %s, %d values in %d requests failed, first error: %s",
+                         sent, device_label, failed_df['values'].sum(), len(failed_df), failed_df['error'][0])
+        else:
+            logger.info("Sent %d values to device %s", sent, device_label)
+        if return_errors:
+            return sent, failed_df
+        return sent
+
+    async def apost_type_data(self, df, device_type='pile-temp-and-cercospora-monitor', devices=None,
+                              max_devices=MAX_DEVICES, batch_size=WRITE_BATCH_SIZE,
+                              max_bytes=WRITE_MAX_BYTES, return_errors=False):
+        '''
+        Async version of post_type_data (see post_type_data for parameters).
+        '''
+        import pandas as pd
+        _check_batch_size(batch_size)
+        if devices is None:
+            listing = await self.aget_all_devices(device_type=device_type, fields=f'{DEVICE_FIELDS},label')
+            devices = {d.get('name'): d.get('label') for d in listing}
+        frames = {name: group for name, group in df.groupby('name', sort=False, observed=True)}
+        unknown = [name for name in frames if not devices.get(name)]
+        type_df = {'name': [name for name in frames if devices.get(name)]}
+        type_df['id'] = [devices[name] for name in type_df['name']]
+        labels = dict(zip(type_df['id'], type_df['name']))
+        per_device = max(1, self.max_connections // max(1, min(max_devices, len(labels) or 1)))
+        with self.instrumentation.span('write type', device_type):
+            results, errors_df = await _amap_devices(lambda label: self.apost_device_data(frames[labels[label]],
+                                                                                          device_label=label,
+                                                                                          batch_size=batch_size,
+                                                                                          max_bytes=max_bytes,
+                                                                                          max_requests=per_device,
+                                                                                          return_errors=True),
+                                                     type_df=type_df, max_devices=max_devices)
+        failed_dfs = [pd.DataFrame({'name': name, 'id': devices[name],
+                                    'error': [f"{values} values from {first} to {last} not sent: {error}"
+                                              for first, last, values, error in failed_df.itertuples(index=False)]})
+                      for name, (_, failed_df) in results if len(failed_df)]
+        if failed_dfs:
+            errors_df = pd.concat([errors_df, *failed_dfs], ignore_index=True)
+        if unknown:
+            logger.error("No device of type %s named %s, their values were not sent", device_type, unknown)
+            errors_df = pd.concat([errors_df, pd.DataFrame({'name': unknown, 'id': None,
+                                                            'error': f"no device of type {device_type!r}"})],
+                                  ignore_index=True)
+        summary_df = pd.DataFrame({'name': [name for name, _ in results],
+                                   'label': [devices[name] for name, _ in results],
+                                   'values': [sent for _, (sent, _) in results],
+                                   'failed': [int(failed_df['values'].sum()) for _, (_, failed_df) in results]})
+        if return_errors:
+            return summary_df, errors_df
+        return summary_df
+
+    async def aclose(self):
+        '''
+        Closes the async session; it is re-created on the next async call.
+        '''
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+        return False
+
+    # ----------------------------------------------------------------- helpers
+
+    def _values_url(self, variable=VARIABLE_LABEL, last_values=5000, start=None, end=None):
+        '''
+        :return: v1.6 url of the last values of a variable in CSV format, optionally
+                 limited to the window between start and end
+        '''
+        # TODO: the device-scoped url below is not working, and I'm not sure why
+        # "https://{}/api/v1.6/devices/{}/{}/values/?page_size={}&format=csv"
+        url = "{}/api/v1.6/variables/{}/values/"\
+              "?page_size={}&format=csv".format(self.base_url,
+                                                variable,
+                                                last_values)
+        if start is not None:
+            url += f"&start={_to_epoch_ms(start)}"
+        if end is not None:
+            url += f"&end={_to_epoch_ms(end)}"
+        return url
+
+    async def _abulk_batches(self, variables, labels=None, last_values=5000, start=None, end=None,
+                             batch_size=BULK_BATCH_SIZE):
+        '''
+        Sends one data/raw/series request per batch of variables, all concurrently.
+        :return: list of (variable positions in the batch, list of DataFrames or the Exception raised)
+        '''
+        from .frames import _bulk_series_to_dfs
+        _check_batch_size(batch_size)
+        variables = list(variables)
+        labels = list(labels) if labels is not None else variables
+        batches = [list(range(i, min(i + batch_size, len(variables))))
+                   for i in range(0, len(variables), batch_size)]
+        session = self._get_async_session()
+        url = f"{self.base_url}/api/v1.6/data/raw/series"
+
+        async def fetch(batch):
+            logger.debug("Making bulk request for %d variables to %s", len(batch), url)
+            body = _bulk_series_body([variables[i] for i in batch], last_values=last_values,
+                                     start=start, end=end)
+            with self.instrumentation.span('batch', f"{len(batch)} variables from {variables[batch[0]]}"):
+                resp = await session.request("POST", url, headers=self.headers, throttle=self.throttle,
+                                             json=body)
+                resp.raise_for_status()
+                return _bulk_series_to_dfs(resp.json(), labels=[labels[i] for i in batch],
+                                           last_values=last_values)
+
+        outcomes = await asyncio.gather(*(fetch(batch) for batch in batches), return_exceptions=True)
+        return list(zip(batches, outcomes))
+
+    async def _abulk_type_data(self, type_df, last_values=5000, max_devices=MAX_DEVICES,
+                               batch_size=BULK_BATCH_SIZE, compact=False, start=None, end=None):
+        '''
+        Bulk version of the per-device fan-out of aget_type_data: the variable catalogs are
+        listed per device, then the values of the whole fleet are fetched batch_size variables
+        per request and split back per device. A failed batch only fails the devices it covers.
+        :return: tuple of (list of (device name, wide DataFrame), errors DataFrame)
+        '''
+        import pandas as pd
+        from .frames import _merge_var_dfs
+        _check_batch_size(batch_size) # before listing the catalogs of the whole fleet
+
+        async def catalog(device_id):
+            return device_id, await self.aget_device_vars(device_id=device_id)
+
+        catalogs, errors_df = await _amap_devices(catalog, type_df=type_df, max_devices=max_devices)
+        owners, variables, labels = [], [], []
+        for k, (_, (_, var_list)) in enumerate(catalogs):
+            owners.extend([k] * len(var_list))
+            variables.extend(var['id'] for var in var_list)
+            labels.extend(var['label'] for var in var_list)
+        var_dfs = [None] * len(variables)
+        failed = {}
+        for batch, outcome in await self._abulk_batches(variables, labels=labels,
+                                                         last_values=last_values,
+                                                         start=start, end=end,
+                                                         batch_size=batch_size):
+            for position, i in enumerate(batch):
+                if isinstance(outcome, Exception):
+                    failed.setdefault(owners[i], outcome)
+                else:
+                    var_dfs[i] = outcome[position]
+        results = []
+        errors = []
+        for k, (name, (device_id, _)) in enumerate(catalogs):
+            if k in failed:
+                logger.error("Device %s (%s) failed, details: %s", name, device_id, failed[k])
+                errors.append({'name': name, 'id': device_id, 'error': repr(failed[k])})
+                continue
+            results.append((name, _merge_var_dfs([df for df, owner in zip(var_dfs, owners) if owner == k],
+                                                 compact=compact)))
+        if errors:
+            errors_df = pd.concat([errors_df, pd.DataFrame(errors, columns=['name', 'id', 'error'])],
+                                  ignore_index=True)
+        return results, errors_df
+
+    async def _aresample_server(self, variables, labels, start=None, end=None, period=RESAMPLE_PERIOD,
+                                aggregation='mean', batch_size=BULK_BATCH_SIZE):
+        '''
+        Sends one data/stats/resample request per batch_size variables, concurrently.
+        :return: list of DataFrames in the get_var_df layout, one per variable
+        '''
+        from .frames import _resample_to_dfs
+        session = self._get_async_session()
+        url = f"{self.base_url}/api/v1.6/data/stats/resample/"
+        batches = [list(range(i, min(i + max(1, batch_size), len(variables))))
+                   for i in range(0, len(variables), max(1, batch_size))]
+
+        async def fetch(batch):
+            logger.debug("Making resample request for %d variables to %s", len(batch), url)
+            body = _resample_body([variables[i] for i in batch], period=period, aggregation=aggregation,
+                                  start=start, end=end)
+            with self.instrumentation.span('batch', f"{len(batch)} variables from {variables[batch[0]]}"):
+                resp = await session.request("POST", url, headers=self.headers, throttle=self.throttle,
+                                             json=body)
+                resp.raise_for_status()
+                return _resample_to_dfs(resp.json(), labels=[labels[i] for i in batch])
+
+        dfs = []
+        for outcome in await asyncio.gather(*(fetch(batch) for batch in batches)):
+            dfs.extend(outcome)
+        return dfs
+
+    async def _aresample_local(self, variable, label, start=None, end=None, period=RESAMPLE_PERIOD,
+                               aggregation='mean'):
+        '''
+        Streams a variable's raw values and folds each page into per-period partial aggregates.
+        :return: DataFrame in the get_var_df layout, one row per period
+        '''
+        from .frames import _combine_partials, _finish_partials, _partial_aggregates
+        partials = None
+        with self.instrumentation.span('variable', variable):
+            async for page in self.aiter_var_values(variable=variable, start=start, end=end, label=label):
+                partials = _combine_partials(partials, _partial_aggregates(page, label, period))
+        return _finish_partials(partials, label, aggregation)
+
+    def _devices_url(self, device_type=None, fields=None):
+        '''
+        :return: v2.0 url of the device list, with the server-side type filter and field projection
+        '''
+        params = {}
+        if device_type:
+            params[DEVICE_TYPE_FILTER] = device_type
+        if fields:
+            params['fields'] = fields
+        url = f"{self.base_url}/api/v2.0/devices/"
+        return f"{url}?{urlencode(params)}" if params else url
+
+    def _device_tokens_url(self, device_id=DEVICE_LABEL):
+        '''
+        :return: v1.6 url of the tokens of a device (data source)
+        '''
+        return f"{self.base_url}/api/v1.6/datasources/{device_id}/tokens/"
+
+    def _token_check_url(self, device_id=DEVICE_LABEL):
+        '''
+        :return: v2.0 url of the cheapest request a valid device token is allowed to make
+        '''
+        return f"{self.base_url}/api/v2.0/devices/{device_id}/variables/?page_size=1"
+
+    def _values_page_url(self, variable=VARIABLE_LABEL, start=None, end=None, page_size=PAGE_SIZE):
+        '''
+        :return: v1.6 url of the first JSON page of a variable's values within [start, end]
+        '''
+        url = f"{self.base_url}/api/v1.6/variables/{variable}/values/?page_size={page_size}"
+        if start is not None:
+            url += f"&start={_to_epoch_ms(start)}"
+        if end is not None:
+            url += f"&end={_to_epoch_ms(end)}"
+        return url
+
+    def _get_json(self, url):
+        logger.debug("Making request to %s", url)
+        resp = self.session.get(url, headers=self.headers, throttle=self.throttle)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _aget_json(self, url):
+        logger.debug("Making request to %s", url)
+        resp = await self._get_async_session().get(url, headers=self.headers, throttle=self.throttle)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _paginate(self, url, cache=True):
+        '''
+        Follows the "next" links of a v2.0 listing, through the catalog cache if there is one.
+        A cached listing is returned as is while fresh; once stale, it is revalidated with a
+        conditional request on its first page and only downloaded again if it changed.
+        :param cache: if False, neither read nor write the catalog cache
+        :return: list of all "results" entries
+        '''
+        entry = self._cached_listing(url) if cache else None
+        if entry is not None and self.catalog_cache.is_fresh(entry):
+            return entry['results']
+        logger.debug("Making request to %s", url)
+        resp = self.session.get(url, headers=self._conditional_headers(entry), throttle=self.throttle)
+        if resp.status_code == 304 and entry is not None:
+            self.catalog_cache.touch(self.token, url)
+            return entry['results']
+        resp.raise_for_status()
+        data = resp.json()
+        results = list(data["results"])
+        next = data["next"]
+        while next:
+            logger.debug("Making request to %s", next)
+            page = self.session.get(next, headers=self.headers, throttle=self.throttle)
+            page.raise_for_status()
+            data = page.json()
+            next = data["next"]
+            results.extend(data["results"])
+        if cache:
+            self._cache_listing(url, results, resp)
+        return results
+
+    async def _apaginate(self, url, cache=True):
+        '''
+        Async version of _paginate.
+        '''
+        entry = self._cached_listing(url) if cache else None
+        if entry is not None and self.catalog_cache.is_fresh(entry):
+            return entry['results']
+        session = self._get_async_session()
+        logger.debug("Making request to %s", url)
+        resp = await session.get(url, headers=self._conditional_headers(entry), throttle=self.throttle)
+        if resp.status_code == 304 and entry is not None:
+            self.catalog_cache.touch(self.token, url)
+            return entry['results']
+        resp.raise_for_status()
+        data = resp.json()
+        results = list(data["results"])
+        next = data["next"]
+        while next:
+            logger.debug("Making request to %s", next)
+            page = await session.get(next, headers=self.headers, throttle=self.throttle)
+            page.raise_for_status()
+            data = page.json()
+            next = data["next"]
+            results.extend(data["results"])
+        if cache:
+            self._cache_listing(url, results, resp)
+        return results
+
+    def _cached_listing(self, url):
+        return self.catalog_cache.get(self.token, url) if self.catalog_cache is not None else None
+
+    def _conditional_headers(self, entry):
+        '''
+        :return: request headers, plus If-None-Match / If-Modified-Since when entry has validators
+        '''
+        headers = dict(self.headers)
+        if entry is not None and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _cache_listing(self, url, results, resp):
+        if self.catalog_cache is not None and resp.status_code < 400:
+            self.catalog_cache.put(self.token, url, results,
+                                   etag=resp.headers.get('ETag'),
+                                   last_modified=resp.headers.get('Last-Modified'))
+
+    def _cached_token_check(self, token, device_id):
+        '''
+        :return: the fresh cached validation result of a device token (with cached=True), or None
+        '''
+        check = self.catalog_cache.get_token_check(token, device_id) if self.catalog_cache is not None else None
+        return dict(check, cached=True) if check is not None else None
+
+    def _store_token_check(self, token, device_id, status):
+        '''
+        Logs and caches the outcome of a validation request. Transient failures (RETRY_STATUSES
+        left after all attempts) are reported but not cached.
+        :return: dict with valid, status, checked_at and cached=False
+        '''
+        valid = 200 <= status < 300
+        if valid:
+            logger.info("Token %s for %s validated.", _mask(token), device_id)
+        else:
+            logger.warning("Token %s for %s failed validation with %s", _mask(token), device_id, status)
+        if self.catalog_cache is not None and status not in RETRY_STATUSES:
+            check = self.catalog_cache.put_token_check(token, device_id, valid=valid, status=status)
+        else:
+            check = {'valid': valid, 'status': status, 'checked_at': time.time()}
+        return dict(check, cached=False)
+
+    def _token_throttle(self, token):
+        # Requests sent with a device token count against that token's own rate limit
+        return _get_throttle(headers={"X-Auth-Token": token}, rate_limit=self.rate_limit,
+                             max_connections=self.max_connections)
+
+    def _get_async_session(self):
+        if self._async_session is None:
+            self._async_session = AsyncUbidotsSession(pool_size=self.max_connections,
+                                                      timeout=self.session.timeout,
+                                                      max_attempts=self.session.max_attempts,
+                                                      backoff=self.session.backoff,
+                                                      max_backoff=self.session.max_backoff,
+                                                      sync_session=self.session,
+                                                      instrumentation=self.instrumentation)
+        return self._async_session
+
+    def _run(self, coro):
+        '''
+        Runs an async method to completion from sync code, then closes the async session.
+        '''
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.aclose()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(runner())
+        # Already inside an event loop (e.g. IPython): run on a separate thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, runner()).result()
+
+def _bulk_series_body(variables, last_values=5000, start=None, end=None):
+    '''
+    Builds the JSON body of a v1.6 data/raw/series request.
+    :private function (should not need to run, but used in main fxns)
+    :param variables: list of variable ids
+    :param last_values: max number of most recent values per variable
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :return: dict
+    '''
+    body = {'variables': list(variables),
+            'columns': ['timestamp', 'value.value', 'value.context'],
+            'join_dataframes': False,
+            'limit': last_values}
+    if start is not None:
+        body['start'] = _to_epoch_ms(start)
+    if end is not None:
+        body['end'] = _to_epoch_ms(end)
+    return body
+
+AGGREGATIONS = ('mean', 'min', 'max', 'sum', 'count', 'first', 'last') # Statistics the resample endpoint computes
+
+def _parse_period(period):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param period: resample period, e.g. '15T', '1H', '1D', 'W' or 'M'
+    :return: tuple of (count, unit) with unit one of S, T, H, D, W, M
+    '''
+    match = re.fullmatch(r'(\d*)\s*(S|T|MIN|H|D|W|M)', str(period).strip().upper())
+    if match is None or match.group(1) in ('0',):
+        raise ValueError(f"Unknown period {period!r}, expected e.g. '15T', '1H', '1D', 'W' or 'M'")
+    count, unit = int(match.group(1) or 1), match.group(2)
+    if unit == 'MIN':
+        unit = 'T'
+    if unit in ('W', 'M') and count != 1:
+        raise ValueError(f"Calendar periods ({unit}) can only be resampled one at a time, not {period!r}")
+    return count, unit
+
+def _resample_body(variables, period=RESAMPLE_PERIOD, aggregation='mean', start=None, end=None):
+    '''
+    Builds the JSON body of a v1.6 data/stats/resample request.
+    :private function (should not need to run, but used in main fxns)
+    :return: dict
+    '''
+    body = {'variables': list(variables),
+            'aggregation': aggregation,
+            'period': period,
+            'join_dataframes': True}
+    if start is not None:
+        body['start'] = _to_epoch_ms(start)
+    if end is not None:
+        body['end'] = _to_epoch_ms(end)
+    return body
+
+def _to_epoch_ms(value):
+    '''
+    Converts a time given as epoch ms, datetime or date string (UTC if naive) to epoch ms.
+    :private function (should not need to run, but used in main fxns)
+    '''
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    import pandas as pd
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.timestamp() * 1000)
+
+def _check_batch_size(batch_size):
+    '''
+    Raises a ValueError unless batch_size (variables or values per request) is at least 1.
+    :private function (should not need to run, but used in main fxns)
+    '''
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size!r}")
+
+def _filter_device_type(devices, device_type=None):
+    '''
+    Keeps the devices of a given type; a no-op when the server already applied the filter.
+    :private function (should not need to run, but used in main fxns)
+    :param devices: list of device dictionaries
+    :param device_type: device type label, or None to keep all devices
+    :return: list of device dictionaries
+    '''
+    if not device_type:
+        return devices
+    return [d for d in devices if (d.get('properties') or {}).get('_device_type') == device_type]
+
+async def _amap_devices(func, type_df, max_devices=MAX_DEVICES, on_result=None):
+    '''
+    Awaits func(device_id) for every device of type_df, with at most max_devices in flight.
+    A device that raises is recorded in the error report instead of aborting the whole fleet.
+    :private function (should not need to run, but used in main fxns)
+    :param func: coroutine function called with the device id of each device
+    :param type_df: pandas.core.frame.DataFrame with the 'name' and 'id' of each device
+    :param max_devices: max number of devices processed at the same time
+    :param on_result: optional function called with (device name, func result) as each device completes
+    :return: tuple of (list of (device name, func result) in type_df order,
+             pandas.core.frame.DataFrame with the name, id and error of each failed device)
+    '''
+    import pandas as pd
+    devices = list(zip(type_df['name'], type_df['id']))
+    slots = asyncio.Semaphore(max(1, max_devices))
+
+    async def run(name, device_id):
+        async with slots:
+            result = await func(device_id)
+        if on_result is not None:
+            on_result(name, result)
+        return result
+
+    outcomes = await asyncio.gather(*(run(name, device_id) for name, device_id in devices),
+                                    return_exceptions=True)
+    results = []
+    errors = []
+    for (name, device_id), outcome in zip(devices, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Device %s (%s) failed, details: %s", name, device_id, outcome)
+            errors.append({'name': name, 'id': device_id, 'error': repr(outcome)})
+        else:
+            results.append((name, outcome))
+    return results, pd.DataFrame(errors, columns=['name', 'id', 'error'])
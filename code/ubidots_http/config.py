@@ -0,0 +1,44 @@
+'''
+Global variables shared by every module of the package.
+
+Edit them here (or pass the matching arguments) to point the client at another
+account, endpoint or local folder.
+'''
+
+import os
+
+# Global variables
+ENDPOINT = 'industrial.api.ubidots.com'
+DEVICE_NAME  = '' # must manually define using ubidots 'name' device attribute
+DEVICE_LABEL = '' # must manually define using ubidots device 'id' attribute
+VARIABLE_LABEL = '' # must manually define using ubidots variable 'id' attribute
+TOKEN = '' # Place API token here
+HEADERS = {"X-Auth-Token": TOKEN} # must manually change after defining TOKEN #, "Content-Type": "application/json"}
+DELAY = 1 # Delay in seconds
+MAX_WORKERS = 8 # Max number of variables downloaded at the same time for one device
+RATE_LIMIT = 4 # Max requests per second sent with one account token (None to disable)
+MAX_DEVICES = 4 # Max number of devices processed at the same time in fleet-wide pulls
+MAX_CONNECTIONS = 16 # Max number of requests in flight at the same time for one account token
+TIMEOUT = (5, 60) # (connect, read) timeout in seconds for every request
+MAX_ATTEMPTS = 5 # Max number of attempts per request before giving up
+BACKOFF = 0.5 # Base delay in seconds of the exponential backoff between attempts
+MAX_BACKOFF = 30 # Longest delay in seconds between two attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504) # HTTP status codes worth retrying
+PAGE_SIZE = 1000 # Number of values per page (and per chunk) when streaming variable values
+SYNC_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'output', 'ubidots_sync.sqlite') # Local store for incremental sync
+CATALOG_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'output', 'ubidots_catalog.sqlite') # On-disk device/variable catalog cache
+CATALOG_TTL = 900 # Seconds a cached device or variable catalog is used without asking the server
+TOKEN_CHECK_TTL = 3600 # Seconds a device token validation result is reused by audit_tokens
+DEVICE_FIELDS = 'id,name,properties' # Device fields requested when listing a fleet (properties holds _device_type and _location_fixed)
+DEVICE_TYPE_FILTER = 'properties___device_type' # v2.0 device list filter on the device type property
+ARROW_PARSING = False # Default of get_var_df's arrow option: parse value CSVs with pyarrow's multithreaded reader into Arrow-backed DataFrames (needs pyarrow)
+BULK_BATCH_SIZE = 10 # Max number of variables per bulk values request (data/raw/series)
+RESAMPLE_PERIOD = '1H' # Default period of resampled values: [count]S, T, H, D, or W/M (calendar week/month)
+RESAMPLE_REJECTED = (400,) # Statuses meaning the server can't resample that period/aggregation; it is resampled locally
+RESAMPLE_UNSUPPORTED = (404, 405, 501) # Statuses meaning the server can't resample at all; the client then resamples locally
+WRITE_BATCH_SIZE = 1000 # Max number of values (dots) per write request, across all of its variables
+WRITE_MAX_BYTES = 100000 # Max size in bytes of a write request body; larger batches are split
+RISK_RH_THRESHOLD = 90 # Hourly mean relative humidity (%) at or above which an hour counts toward the daily infection value
+RISK_TIMEZONE = 'America/Denver' # Time zone whose calendar days the daily infection values are computed for
+EXPORT_PARTITIONS = ['device_type', 'name', 'date'] # Partition keys of the columnar export, outermost first
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'output', 'dataset') # Root of the columnar export dataset
@@ -0,0 +1,158 @@
+'''
+Partitioned Parquet/Feather dataset of downloaded values. Requires pyarrow.
+'''
+
+import os
+import pandas as pd
+import uuid
+
+from .config import EXPORT_DIR, EXPORT_PARTITIONS
+from .client import _to_epoch_ms
+from .frames import VALUE_KEYS
+
+def export_dataset(df, device_type='pile-temp-and-cercospora-monitor', root=EXPORT_DIR,
+                   file_format='parquet', compression='zstd'):
+    '''
+    Adds the values of get_type_data (or get_device_data plus a 'name' column) to a columnar
+    dataset, partitioned by device type, device name and UTC date (hive style, e.g.
+    device_type=.../name=.../date=2024-06-04/part-....parquet).
+    Rows are stored long: one row per device, variable label and timestamp, with the label
+    dictionary-encoded. The partitions (device and date) holding values of df are rewritten
+    with their stored rows plus the new ones, a new value replacing a stored one of the same
+    device, label and timestamp, so exporting overlapping windows again adds no duplicates.
+    Other partitions are left untouched. Requires pyarrow.
+    :param df: wide DataFrame with a 'name' column, as returned by get_type_data (default or
+               compact schema)
+    :param device_type: device type label the devices belong to
+    :param root: dataset directory (see Global variables)
+    :param file_format: 'parquet' or 'feather'
+    :param compression: codec for the files, e.g. 'zstd', 'snappy' or 'lz4' (None = uncompressed)
+    :return: number of rows added (values replacing stored ones are not counted)
+    '''
+    pa, ds = _import_pyarrow()
+    if file_format == 'parquet':
+        file_options = ds.ParquetFileFormat().make_write_options(compression=compression)
+    elif file_format == 'feather':
+        file_options = ds.IpcFileFormat().make_write_options(compression=compression)
+    else:
+        raise ValueError(f"Unknown file_format {file_format!r}, expected 'parquet' or 'feather'")
+    long_df = _wide_to_long(df, device_type=device_type)
+    if long_df.empty:
+        return 0
+    stored_df = _stored_partitions(long_df, root=root, file_format=file_format)
+    if not stored_df.empty:
+        long_df = pd.concat([stored_df, long_df], ignore_index=True)
+        long_df = long_df.drop_duplicates(subset=['name', 'label', 'Timestamp'], keep='last')
+        long_df['label'] = long_df['label'].astype('category')
+    table = pa.Table.from_pandas(long_df, preserve_index=False)
+    ds.write_dataset(table, root,
+                     format='parquet' if file_format == 'parquet' else 'ipc',
+                     partitioning=EXPORT_PARTITIONS, partitioning_flavor='hive',
+                     basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{file_format}",
+                     existing_data_behavior='delete_matching',
+                     file_options=file_options)
+    return len(long_df) - len(stored_df)
+
+def read_dataset(root=EXPORT_DIR, device_type=None, names=None, start=None, end=None,
+                 file_format='parquet'):
+    '''
+    Loads (part of) a dataset written by export_dataset. Filters are applied to the partition
+    paths and row groups, so only the needed files are read. Requires pyarrow.
+    :param root: dataset directory (see Global variables)
+    :param device_type: only read this device type
+    :param names: only read these device names (list)
+    :param start: only values at or after this time (epoch ms, datetime, or date string)
+    :param end: only values at or before this time (epoch ms, datetime, or date string)
+    :param file_format: 'parquet' or 'feather'
+    :return: pandas.core.frame.DataFrame with device_type, name, date, label, Timestamp, value and Context columns
+    '''
+    pa, ds = _import_pyarrow()
+    partitioning = ds.partitioning(pa.schema([(key, pa.string()) for key in EXPORT_PARTITIONS]),
+                                   flavor='hive')
+    dataset = ds.dataset(root, format='parquet' if file_format == 'parquet' else 'ipc',
+                         partitioning=partitioning)
+    expression = None
+    for condition in _dataset_filters(ds, device_type=device_type, names=names, start=start, end=end):
+        expression = condition if expression is None else expression & condition
+    df = dataset.to_table(filter=expression).to_pandas()
+    df['name'] = df['name'].astype('category')
+    return df[EXPORT_PARTITIONS + ['label', 'Timestamp', 'value', 'Context']]
+
+def _import_pyarrow():
+    '''
+    Imports pyarrow on demand, since only the columnar export needs it.
+    :private function (should not need to run, but used in main fxns)
+    :return: tuple of (pyarrow, pyarrow.dataset)
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("Columnar export requires pyarrow: pip install pyarrow") from e
+    return pa, ds
+
+def _wide_to_long(df, device_type='pile-temp-and-cercospora-monitor'):
+    '''
+    Reshapes a wide values frame to one row per device, variable label and timestamp.
+    :private function (should not need to run, but used in main fxns)
+    :param df: wide DataFrame with a 'name' column, as returned by get_type_data
+    :param device_type: device type label stored with every row
+    :return: pandas.core.frame.DataFrame with device_type, name, date, label, Timestamp, value and Context
+    '''
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if 'Timestamp' not in df.columns:
+        # Compact schema: the UTC DatetimeIndex named Timestamp
+        df = df.assign(Timestamp=pd.DatetimeIndex(df.index).as_unit('ms').asi8).reset_index(drop=True)
+    labels = [c for c in df.columns if c not in VALUE_KEYS and c != 'name']
+    long_df = df.melt(id_vars=['name', 'Timestamp', 'Context'], value_vars=labels,
+                      var_name='label', value_name='value').dropna(subset=['value'])
+    long_df['Timestamp'] = long_df['Timestamp'].astype('int64')
+    # float64 whatever the schema (compact values are float32), so all files share one schema
+    long_df['value'] = pd.to_numeric(long_df['value'], errors='coerce').astype('float64')
+    long_df['label'] = long_df['label'].astype('category')
+    long_df['Context'] = long_df['Context'].astype(str)
+    long_df['name'] = long_df['name'].astype(str)
+    long_df.insert(0, 'device_type', device_type)
+    long_df.insert(2, 'date', pd.to_datetime(long_df['Timestamp'], unit='ms', utc=True).dt.strftime('%Y-%m-%d'))
+    return long_df.reset_index(drop=True)
+
+def _stored_partitions(long_df, root=EXPORT_DIR, file_format='parquet'):
+    '''
+    Reads the rows already stored in the partitions that long_df is about to rewrite.
+    :private function (should not need to run, but used in main fxns)
+    :param long_df: rows to export, as returned by _wide_to_long
+    :param root: dataset directory (see Global variables)
+    :param file_format: 'parquet' or 'feather'
+    :return: pandas.core.frame.DataFrame with the columns of long_df (empty if nothing is stored)
+    '''
+    if not os.path.isdir(root) or not os.listdir(root):
+        return pd.DataFrame(columns=long_df.columns)
+    keys = long_df[EXPORT_PARTITIONS].drop_duplicates()
+    days = pd.to_datetime(long_df['Timestamp'].agg(['min', 'max']), unit='ms').dt.floor('D')
+    stored_df = read_dataset(root=root, device_type=keys['device_type'].iloc[0],
+                             names=keys['name'].unique().tolist(), start=days.iloc[0],
+                             end=days.iloc[1] + pd.Timedelta(days=1, milliseconds=-1), file_format=file_format)
+    # The filters select every date of every name in the window; keep the partitions being rewritten only
+    stored_df = stored_df.astype({'name': str}).merge(keys, on=EXPORT_PARTITIONS)
+    return stored_df[list(long_df.columns)]
+
+def _dataset_filters(ds, device_type=None, names=None, start=None, end=None):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: list of pyarrow.dataset expressions for read_dataset
+    '''
+    filters = []
+    if device_type is not None:
+        filters.append(ds.field('device_type') == device_type)
+    if names is not None:
+        filters.append(ds.field('name').isin(list(names)))
+    if start is not None:
+        start_ms = _to_epoch_ms(start)
+        filters.append(ds.field('date') >= pd.Timestamp(start_ms, unit='ms').strftime('%Y-%m-%d'))
+        filters.append(ds.field('Timestamp') >= start_ms)
+    if end is not None:
+        end_ms = _to_epoch_ms(end)
+        filters.append(ds.field('date') <= pd.Timestamp(end_ms, unit='ms').strftime('%Y-%m-%d'))
+        filters.append(ds.field('Timestamp') <= end_ms)
+    return filters
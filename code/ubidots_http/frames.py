@@ -0,0 +1,501 @@
+'''
+Builds the pandas DataFrames returned by the client from API responses:
+value tables, wide device tables, catalogs and resampled values.
+
+It imports pandas and numpy, so the client and the module-level functions import it
+inside the methods that return DataFrames rather than at the top.
+'''
+
+import numpy as np
+import pandas as pd
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from functools import reduce
+from io import BytesIO, StringIO
+from pandas.api.types import union_categoricals
+
+from .config import ARROW_PARSING, WRITE_BATCH_SIZE, WRITE_MAX_BYTES
+from .client import _filter_device_type, _parse_period
+
+logger = logging.getLogger(__name__)
+
+def parse_context(context):
+    '''
+    Decodes the Context of a values frame on demand. Each distinct Context string is parsed once,
+    so this is cheap on the categorical Context of the compact schema.
+    :param context: Context column (pandas Series) of get_device_data or get_type_data
+    :return: pandas.core.series.Series of dictionaries (raw strings where the text is not JSON)
+    '''
+    def decode(text):
+        try:
+            return json.loads(text)
+        except (TypeError, ValueError):
+            return text
+
+    context = context.astype('category')
+    decoded = [decode(text) for text in context.cat.categories]
+    return pd.Series([decoded[code] if code >= 0 else None for code in context.cat.codes],
+                     index=context.index, name=context.name, dtype=object)
+
+def _var_df_from_csv(content, arrow=ARROW_PARSING):
+    '''
+    Parses a v1.6 values CSV response. The raw bytes are parsed without being decoded to a str
+    first. By default pandas reads them into the usual numpy dtypes.
+    With arrow=True and pyarrow installed, they are handed to pyarrow's multithreaded CSV reader
+    with an explicit schema (int64 Timestamp, float64 values, string date and Context), and the
+    DataFrame returned is Arrow-backed whatever the body holds: a value column that is not
+    numeric is read as strings, and a body pyarrow can't parse is read by pandas and converted
+    to Arrow types.
+    :private function (should not need to run, but used in main fxns)
+    :param content: body of the CSV response (bytes, or str)
+    :param arrow: if True, parse with pyarrow when it is installed
+    :return: pandas.core.frame.DataFrame containing variable values plus timestamps
+    '''
+    if arrow:
+        try:
+            try:
+                return _var_df_from_arrow_csv(content)
+            except ValueError as e: # pyarrow.ArrowInvalid, e.g. a value that is not a number
+                logger.debug("Values are not all numbers (%s), reading them as strings", e)
+                return _var_df_from_arrow_csv(content, numeric=False)
+        except ImportError:
+            logger.debug("pyarrow is not installed, parsing values with pandas")
+        except ValueError as e:
+            logger.debug("Arrow could not parse the values (%s), parsing with pandas", e)
+            return _var_df_from_pandas_csv(content).convert_dtypes(dtype_backend='pyarrow')
+    return _var_df_from_pandas_csv(content)
+
+def _var_df_from_pandas_csv(content):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param content: body of the CSV response (bytes, or str)
+    :return: pandas.core.frame.DataFrame in the get_var_df layout
+    '''
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return pd.read_csv(BytesIO(content), sep=',')
+    return pd.read_csv(StringIO(content), sep=',')
+
+def _var_df_from_arrow_csv(content, numeric=True):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param content: body of the CSV response (bytes, or str)
+    :param numeric: if True, read the value column as float64, otherwise as strings
+    :return: Arrow-backed pandas.core.frame.DataFrame in the get_var_df layout
+    '''
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    if isinstance(content, str):
+        content = content.encode()
+    buffer = pa.py_buffer(content)
+    # Only the header line is decoded, to give the value column its type
+    end = content.find(b'\n')
+    header = bytes(content[:end if end >= 0 else len(content)]).decode().rstrip('\r')
+    value_type = pa.float64() if numeric else pa.string()
+    column_types = {name: pa.int64() if name == 'Timestamp' else
+                          pa.string() if name in VALUE_KEYS else value_type
+                    for name in next(csv.reader([header]), [])}
+    table = pa_csv.read_csv(buffer, read_options=pa_csv.ReadOptions(use_threads=True),
+                            convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _values_df_from_json(results, label='value'):
+    '''
+    Converts one page of v1.6 JSON values to the same layout as the CSV values.
+    :private function (should not need to run, but used in main fxns)
+    :param results: list of {'timestamp', 'value', 'context'} dictionaries
+    :param label: name of the value column
+    :return: pandas.core.frame.DataFrame with Timestamp, Human readable date (UTC), label and Context columns
+    '''
+    rows = [(r.get('timestamp'), r.get('value'), json.dumps(r.get('context') or {})) for r in results]
+    return _values_df_from_rows(rows, label=label)
+
+def _bulk_series_to_dfs(data, labels, last_values=None):
+    '''
+    Splits a data/raw/series response back into one DataFrame per variable.
+    :private function (should not need to run, but used in main fxns)
+    :param data: decoded JSON response; data['results'][i] holds the rows of the i-th variable
+    :param labels: value column name of each requested variable
+    :param last_values: max number of most recent values kept per variable (None = all)
+    :return: list of DataFrames in the get_var_df layout
+    '''
+    dfs = []
+    for label, rows in zip(labels, data['results']):
+        rows = sorted(((r[0], r[1], json.dumps(r[2] if len(r) > 2 and r[2] is not None else {}))
+                       for r in rows), key=lambda r: r[0], reverse=True)
+        dfs.append(_values_df_from_rows(rows[:last_values] if last_values else rows, label=label))
+    return dfs
+
+PERIOD_MS = {'S': 1000, 'T': 60000, 'H': 3600000, 'D': 86400000} # Length of the fixed period units
+
+def _period_starts(timestamps, period):
+    '''
+    Start (epoch ms, UTC) of the period each timestamp falls in.
+    :private function (should not need to run, but used in main fxns)
+    :param timestamps: numpy array of epoch ms
+    :param period: resample period (see _parse_period)
+    :return: numpy array of epoch ms
+    '''
+    count, unit = _parse_period(period)
+    if unit in PERIOD_MS:
+        length = count * PERIOD_MS[unit]
+        return timestamps - timestamps % length
+    # Calendar weeks (starting Monday) and months
+    dates = pd.to_datetime(timestamps, unit='ms').to_period(unit).start_time
+    return dates.as_unit('ms').asi8
+
+def _partial_aggregates(df, label, period):
+    '''
+    Aggregates one page of raw values per period, in a form that can be combined with other pages.
+    :private function (should not need to run, but used in main fxns)
+    :param df: DataFrame in the get_var_df layout
+    :param label: name of the value column
+    :param period: resample period (see _parse_period)
+    :return: DataFrame indexed by period start with sum, count, min, max, first_ts, first, last_ts and last
+    '''
+    timestamps = df['Timestamp'].to_numpy(dtype='int64')
+    page = pd.DataFrame({'period': _period_starts(timestamps, period),
+                         'ts': timestamps,
+                         'value': pd.to_numeric(df[label], errors='coerce').to_numpy(dtype='float64')})
+    page = page.dropna(subset=['value']).sort_values('ts')
+    groups = page.groupby('period')['value']
+    times = page.groupby('period')['ts']
+    return pd.DataFrame({'sum': groups.sum(), 'count': groups.count(), 'min': groups.min(),
+                         'max': groups.max(), 'first_ts': times.first(), 'first': groups.first(),
+                         'last_ts': times.last(), 'last': groups.last()})
+
+def _combine_partials(left, right):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: partial aggregates of the union of two sets of values (see _partial_aggregates)
+    '''
+    if left is None:
+        return right
+    both = pd.concat([left, right])
+    combined = both.groupby(level=0).agg({'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'})
+    firsts = both.sort_values('first_ts').groupby(level=0)[['first_ts', 'first']].first()
+    lasts = both.sort_values('last_ts').groupby(level=0)[['last_ts', 'last']].last()
+    return combined.join(firsts).join(lasts)
+
+def _finish_partials(partials, label, aggregation):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: DataFrame in the get_var_df layout with one row per period
+    '''
+    if partials is None or partials.empty:
+        return _values_df_from_rows([], label=label)
+    if aggregation == 'mean':
+        values = partials['sum'] / partials['count']
+    else:
+        values = partials[aggregation]
+    return _values_df_from_rows(list(zip(partials.index.astype('int64'), values, ['{}'] * len(values))),
+                                label=label)
+
+def _resample_to_dfs(data, labels):
+    '''
+    Splits a joined data/stats/resample response ([timestamp, value of each variable] rows)
+    into one DataFrame per variable, leaving out the periods without a value.
+    :private function (should not need to run, but used in main fxns)
+    :return: list of DataFrames in the get_var_df layout
+    '''
+    rows = data.get('results') or []
+    dfs = []
+    for i, label in enumerate(labels):
+        dfs.append(_values_df_from_rows([(row[0], row[i + 1], '{}') for row in rows
+                                         if len(row) > i + 1 and row[i + 1] is not None],
+                                        label=label))
+    return dfs
+
+VALUE_KEYS = ['Timestamp', 'Human readable date (UTC)', 'Context'] # Columns shared by all value frames
+
+def _merge_var_dfs(dfs, compact=False):
+    '''
+    Builds one wide DataFrame from the values of each variable of a device, in a single pass:
+    the timestamps of all variables are united once into a sorted integer index, each variable's
+    values are scattered into its column by position in that index, and the date and Context of
+    the first variable seen at each timestamp are kept.
+    Columns come out in the same order as the former chain of outer merges
+    (Timestamp, date, first variable, Context, other variables), sorted by Timestamp.
+    The single pass only gives the same table as the outer merges when each variable has at
+    most one value per timestamp, all variables at a timestamp share its Context, and all
+    values are numeric. Otherwise the table is built with those outer merges instead (see
+    _merge_var_dfs_outer): a duplicated timestamp gives one row per combination of duplicates,
+    a different Context gives its own row, and non-numeric values are kept as they are.
+    With compact=True the table uses the compact schema instead: a UTC DatetimeIndex named
+    Timestamp, float32 values, no human-readable date, and Context as a categorical of raw
+    strings (see parse_context).
+    :private function (should not need to run, but used in main fxns)
+    :param dfs: list of DataFrames as returned by get_var_df
+    :param compact: if True, return the compact schema
+    :return: pandas.core.frame.DataFrame with one column per variable
+    '''
+    dfs = [df for df in dfs if df is not None]
+    if not dfs:
+        if compact:
+            return pd.DataFrame({'Context': pd.Categorical([])},
+                                index=pd.DatetimeIndex([], tz='UTC', name='Timestamp'))
+        return pd.DataFrame(columns=VALUE_KEYS)
+    unique_timestamps = np.unique(np.concatenate([df['Timestamp'].to_numpy(dtype='int64') for df in dfs]))
+    dates = None if compact else np.empty(len(unique_timestamps), dtype=object)
+    contexts = np.empty(len(unique_timestamps), dtype=object)
+    filled = np.zeros(len(unique_timestamps), dtype=bool)
+    labels = [label for df in dfs for label in df.columns if label not in VALUE_KEYS]
+    matrix = np.full((len(unique_timestamps), len(labels)), np.nan,
+                     dtype='float32' if compact else 'float64')
+    column = 0
+    for df in dfs:
+        if not df['Timestamp'].is_unique:
+            return _merge_var_dfs_outer(dfs, compact=compact)
+        rows = np.searchsorted(unique_timestamps, df['Timestamp'].to_numpy(dtype='int64'))
+        context = df['Context'].astype(object).where(df['Context'].notna(), None).to_numpy()
+        # Rows already covered by an earlier variable must have the same Context
+        covered = np.flatnonzero(filled[rows])
+        if len(covered) and (contexts[rows[covered]] != context[covered]).any():
+            return _merge_var_dfs_outer(dfs, compact=compact)
+        # Only read the date and Context of rows not already covered by an earlier variable
+        new_rows = np.flatnonzero(~filled[rows])
+        if len(new_rows):
+            if not compact:
+                dates[rows[new_rows]] = df['Human readable date (UTC)'].iloc[new_rows].to_numpy(dtype=object)
+            contexts[rows[new_rows]] = context[new_rows]
+            filled[rows[new_rows]] = True
+        for label in df.columns:
+            if label in VALUE_KEYS:
+                continue
+            values = pd.to_numeric(df[label], errors='coerce')
+            if values.isna().sum() > df[label].isna().sum():
+                return _merge_var_dfs_outer(dfs, compact=compact)
+            matrix[rows, column] = values.to_numpy(dtype='float64', na_value=np.nan)
+            column += 1
+    if compact:
+        index = pd.DatetimeIndex(pd.to_datetime(unique_timestamps, unit='ms', utc=True), name='Timestamp')
+        wide = pd.DataFrame(matrix, columns=labels, index=index, copy=False)
+        wide['Context'] = pd.Categorical(contexts)
+        return wide
+    # The value matrix becomes the frame's single float block without being copied
+    wide = pd.DataFrame(matrix, columns=labels, copy=False)
+    wide.insert(0, 'Timestamp', unique_timestamps)
+    wide.insert(1, 'Human readable date (UTC)', dates)
+    wide.insert(min(3, len(wide.columns)), 'Context', contexts)
+    return wide
+
+def _merge_var_dfs_outer(dfs, compact=False):
+    '''
+    Builds the wide DataFrame with a chain of outer merges on Timestamp, date and Context, for
+    the values the single pass of _merge_var_dfs can't handle. In the compact schema the values
+    become float32 (non-numeric values become NaN) and a duplicated timestamp stays duplicated
+    in the index.
+    :private function (should not need to run, but used in main fxns)
+    :param dfs: list of DataFrames as returned by get_var_df
+    :param compact: if True, return the compact schema
+    :return: pandas.core.frame.DataFrame with one column per variable, sorted by Timestamp
+    '''
+    logger.debug("Duplicated timestamps, differing Context or non-numeric values, merging with pd.merge")
+    wide = reduce(lambda left, right: pd.merge(left, right, on=VALUE_KEYS, how='outer'),
+                  [df.astype({'Timestamp': 'int64', 'Human readable date (UTC)': object, 'Context': object})
+                   for df in dfs])
+    wide = wide.sort_values('Timestamp', kind='stable', ignore_index=True)
+    if not compact:
+        return wide
+    labels = [label for label in wide.columns if label not in VALUE_KEYS]
+    index = pd.DatetimeIndex(pd.to_datetime(wide['Timestamp'].to_numpy(), unit='ms', utc=True), name='Timestamp')
+    compact_df = pd.DataFrame({label: pd.to_numeric(wide[label], errors='coerce').to_numpy(dtype='float32',
+                                                                                          na_value=np.nan)
+                               for label in labels}, index=index)
+    compact_df['Context'] = pd.Categorical(wide['Context'].to_numpy(dtype=object))
+    return compact_df
+
+def _stack_device_frames(results, compact=False):
+    '''
+    Stacks the wide frames of several devices, adding the device name as a 'name' column.
+    :private function (should not need to run, but used in main fxns)
+    :param results: list of (device name, DataFrame from _merge_var_dfs)
+    :param compact: if True, the frames use the compact schema (see _concat_compact)
+    :return: pandas.core.frame.DataFrame
+    '''
+    if compact:
+        return _concat_compact(results)
+    dfs = []
+    for name, df in results:
+        df['name'] = name
+        dfs.append(df)
+
+    return pd.concat(dfs).reset_index(drop=True) if dfs else pd.DataFrame()
+
+def _concat_compact(results):
+    '''
+    Stacks the compact frames of several devices without ever holding the device name or
+    Context as one Python string per row: both are assembled as categoricals.
+    :private function (should not need to run, but used in main fxns)
+    :param results: list of (device name, compact DataFrame from _merge_var_dfs)
+    :return: pandas.core.frame.DataFrame in the compact schema with a categorical 'name' column
+    '''
+    if not results:
+        return pd.DataFrame()
+    names = [name for name, _ in results]
+    frames = [df for _, df in results]
+    categories = list(dict.fromkeys(names))
+    codes = np.repeat([categories.index(name) for name in names], [len(df) for df in frames])
+    # Devices without values have empty categories of another dtype; align them before the union
+    contexts = union_categoricals([df['Context'].cat.rename_categories(df['Context'].cat.categories.astype(object))
+                                   for df in frames])
+    type_data_df = pd.concat([df.drop(columns='Context') for df in frames])
+    value_labels = list(type_data_df.columns)
+    # Variables missing from some devices must not widen the frame back to float64
+    type_data_df = type_data_df.astype({label: 'float32' for label in value_labels})
+    type_data_df['Context'] = contexts
+    type_data_df['name'] = pd.Categorical.from_codes(codes, categories=categories)
+    return type_data_df
+
+def _device_vars_df(var_list):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param var_list: list of variable dictionaries of a single device
+    :return: pandas.core.frame.DataFrame containing variable info for single device
+    '''
+    if not var_list:
+        return pd.DataFrame(columns=['id', 'label'])
+    var_df = pd.DataFrame(var_list)
+    device_name = (var_list[0].get('device') or {}).get('name')
+    logger.debug("Variable dataframe returned for device name: %s", device_name)
+    return var_df
+
+def _flatten_devices(devices, locations=False):
+    '''
+    Column-wise extractor for the raw v2.0 device listing: pulls only the needed keys out of
+    each device and its nested properties, without building a Series per row.
+    :private function (should not need to run, but used in main fxns)
+    :param devices: list of device dictionaries as returned by _get_all_devices
+    :param locations: if True, also extract lat and lng from properties['_location_fixed']
+    :return: pandas.core.frame.DataFrame with _device_type, (lat, lng,) name and id columns
+    '''
+    properties = [d.get('properties') or {} for d in devices]
+    columns = {'_device_type': [p.get('_device_type') for p in properties]}
+    if locations:
+        fixed = [p.get('_location_fixed') or {} for p in properties]
+        columns['lat'] = pd.to_numeric(pd.Series([f.get('lat') for f in fixed], dtype=object), errors='coerce')
+        columns['lng'] = pd.to_numeric(pd.Series([f.get('lng') for f in fixed], dtype=object), errors='coerce')
+    columns['name'] = [d.get('name') for d in devices]
+    columns['id'] = [d.get('id') for d in devices]
+    return pd.DataFrame(columns)
+
+def _type_df_from_devices(devices, device_type='pile-temp-and-cercospora-monitor', locations=False):
+    '''
+    Selects the devices of a given type from the device catalog.
+    :private function (should not need to run, but used in main fxns)
+    :param devices: list of device dictionaries as returned by _get_all_devices
+    :param device_type: device type label as indicated in Ubidots
+    :param locations: if True, add the lat and lng columns from the device's fixed location
+    :return: pandas.core.frame.DataFrame with the _device_type, name and id (and lat, lng) of each device
+    '''
+    # Select only devices of specified type before flattening the rest
+    return _flatten_devices(_filter_device_type(devices, device_type=device_type), locations=locations)
+
+def _pivot_type_var_ids(results, type_df):
+    '''
+    Pivots the variable catalogs of a fleet to one row per device and one variable id column
+    per variable label, with the device location.
+    :private function (should not need to run, but used in main fxns)
+    :param results: list of (device name, list of variable dictionaries) tuples
+    :param type_df: pandas.core.frame.DataFrame with the name, lat and lng of each device
+    :return: pandas.core.frame.DataFrame containing variable ids and location for all devices
+    '''
+    names, labels, ids = [], [], []
+    for name, var_list in results:
+        for var in var_list:
+            if var.get('label') is not None and var.get('id') is not None:
+                names.append(name)
+                labels.append(var['label'])
+                ids.append(var['id'])
+    if not names:
+        return pd.DataFrame()  # Handle the case when no device has variables
+    # Pivot to wide format
+    type_vars_df = pd.DataFrame({'name': names, 'label': labels, 'id': ids})
+    pivot_df = type_vars_df.pivot(index='name', columns='label', values='id').reset_index()
+    # Merge with lat/lng columns from type_df dataframe
+    return pivot_df.merge(type_df[['name', 'lat', 'lng']], on='name', how='left')
+
+def _export_unl(pivot_df_wLocations):
+    '''
+    Exports the columns needed by UNL to a timestamped CSV in the current working directory.
+    :private function (should not need to run, but used in main fxns)
+    :param pivot_df_wLocations: DataFrame as returned by get_all_type_var_ids_and_location
+    '''
+    # Drop all columns except for those needed for UNL: 'name', 'rh', 't', 'lat', 'lng'
+    if not pivot_df_wLocations.empty:
+        unl_df = pivot_df_wLocations[['name', 'rh', 't', 'lat', 'lng']]
+        # Get timestamp and generate file name
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_filename = os.path.join(os.getcwd(), f'unl_export_{timestamp}.csv')
+        # Export to CSV
+        unl_df.to_csv(f'{output_filename}', index=False)
+
+def _write_bodies(df, batch_size=WRITE_BATCH_SIZE, max_bytes=WRITE_MAX_BYTES):
+    '''
+    Buffers the values of a wide frame into v1.6 device write bodies, each holding several
+    variables and timestamps ({"label": [{"value": v, "timestamp": t}, ...], ...}), oldest
+    values first. Missing and non-numeric values are skipped. The JSON bodies are built one
+    at a time as the generator is consumed, but the sorted timestamps and values and the
+    position of every value to send are numpy arrays over the whole frame (a few tens of
+    bytes per value on top of the frame itself).
+    :private function (should not need to run, but used in main fxns)
+    :param df: wide frame in the get_device_data layout (default or compact schema)
+    :param batch_size: max number of values per body
+    :param max_bytes: max size of a body; a batch over it is split in two until it fits
+    :return: generator of (number of values, first timestamp, last timestamp, JSON body as bytes)
+    '''
+    if 'Timestamp' in df.columns:
+        timestamps = df['Timestamp'].to_numpy(dtype='int64')
+    else:
+        # Compact schema: the UTC DatetimeIndex named Timestamp
+        timestamps = pd.DatetimeIndex(df.index).as_unit('ms').asi8
+    labels = [label for label in df.columns if label not in VALUE_KEYS and label != 'name']
+    if not labels or not len(df):
+        return
+    values = np.column_stack([pd.to_numeric(df[label], errors='coerce').to_numpy(dtype='float64',
+                                                                                  na_value=np.nan)
+                              for label in labels])
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, values = timestamps[order], values[order]
+    # Row-major positions of the finite values: timestamp by timestamp, variables in column order
+    rows, columns = np.nonzero(np.isfinite(values))
+    dot_timestamps = timestamps[rows]
+    dot_values = values[rows, columns]
+    keys = [json.dumps(label) for label in labels]
+
+    def bodies(first, last):
+        batch_columns = columns[first:last]
+        parts = []
+        for column in np.unique(batch_columns):
+            mask = batch_columns == column
+            dots = ','.join(f'{{"value":{value!r},"timestamp":{timestamp}}}' for value, timestamp in
+                            zip(dot_values[first:last][mask].tolist(), dot_timestamps[first:last][mask].tolist()))
+            parts.append(f'{keys[column]}:[{dots}]')
+        body = ('{' + ','.join(parts) + '}').encode()
+        if len(body) > max_bytes and last - first > 1:
+            middle = (first + last) // 2
+            yield from bodies(first, middle)
+            yield from bodies(middle, last)
+        else:
+            yield last - first, int(dot_timestamps[first]), int(dot_timestamps[last - 1]), body
+
+    for first in range(0, len(rows), batch_size):
+        yield from bodies(first, min(first + batch_size, len(rows)))
+
+def _values_df_from_rows(rows, label='value'):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param rows: list of (timestamp, value, context) tuples read from a SyncStore
+    :param label: name of the value column
+    :return: pandas.core.frame.DataFrame in the same layout as get_var_df
+    '''
+    rows_df = pd.DataFrame(rows, columns=['timestamp', 'value', 'context'])
+    return pd.DataFrame({
+        'Timestamp': rows_df['timestamp'],
+        'Human readable date (UTC)': pd.to_datetime(rows_df['timestamp'], unit='ms', utc=True)
+                                       .dt.strftime('%Y-%m-%d %H:%M:%S'),
+        label: rows_df['value'],
+        'Context': rows_df['context'],
+    })
@@ -0,0 +1,256 @@
+'''
+Cercospora leaf spot infection risk computed locally from the relative humidity and
+temperature values of a fleet (the wide frames of get_type_data or get_device_data),
+instead of shipping the rh and t variable ids to UNL.
+
+Raw values are reduced to hourly means per device, and each local calendar day gets a
+Daily Infection Value (DIV) from the number of hours whose mean relative humidity is at
+or above RISK_RH_THRESHOLD and the mean temperature of those hours, looked up in a DIV
+table supplied by the caller (there is no built-in table). Every step runs on whole
+columns (bincount, searchsorted, grouped sums), never looping over devices or values in
+Python.
+
+It imports pandas and numpy, like frames.
+'''
+
+import numpy as np
+import pandas as pd
+
+from .config import RISK_RH_THRESHOLD, RISK_TIMEZONE
+
+HOUR_MS = 3600000
+
+DAILY_COLUMNS = ['name', 'date', 'hours', 'high_rh_hours', 'high_rh_temp', 'div', 'div_2day',
+                 'div_total'] # Columns of the daily infection value table
+
+class InfectionRisk:
+    '''
+    Daily infection values of a fleet, updated incrementally: each update only reduces the
+    new values to hourly sums, adds them to the hourly state and recomputes, for each device
+    with new values, the days from its first new value on. Values at or before the last
+    timestamp already seen for a device are ignored, so overlapping pulls (e.g. the last
+    values of every variable) can be fed as is.
+    :param div_table: DIV table, as a DataFrame indexed by the lower bound (degrees F) of each
+                      band of mean temperature of the high-RH hours, in increasing order, with one
+                      column per DIV (1, 2, ...) holding the number of high-RH hours a day needs
+                      for that DIV (NaN where it is never reached), e.g. read from a CSV file with
+                      pd.read_csv(path, index_col=0)
+    :param rh: label of the relative humidity variable (%)
+    :param t: label of the temperature variable
+    :param fahrenheit: if True, temperatures are in degrees F (degrees C otherwise)
+    :param tz: time zone whose calendar days the daily values are computed for (see Global variables)
+    :param rh_threshold: hourly mean relative humidity (%) at or above which an hour counts as high RH
+    '''
+    def __init__(self, div_table, rh='rh', t='t', fahrenheit=False, tz=RISK_TIMEZONE,
+                 rh_threshold=RISK_RH_THRESHOLD):
+        self.div_temps_f, self.div_hours = _div_arrays(div_table)
+        self.rh = rh
+        self.t = t
+        self.fahrenheit = fahrenheit
+        self.tz = tz
+        self.rh_threshold = rh_threshold
+        self.hourly = None # (name, hour in epoch ms) -> rh_sum, rh_count, t_sum, t_count
+        self.daily = pd.DataFrame(columns=DAILY_COLUMNS)
+        self._last_ts = pd.Series(dtype='int64') # device name -> last timestamp added
+
+    def update(self, df, name=None):
+        '''
+        Adds new values and recomputes the daily infection values of the devices they belong to.
+        :param df: wide frame of get_type_data (with a 'name' column) or get_device_data,
+                   in the default or the compact schema
+        :param name: device name of a frame without a 'name' column
+        :return: pandas.core.frame.DataFrame of daily infection values (see daily_infection_values)
+        '''
+        codes, devices, timestamps = _device_codes_and_timestamps(df, name=name)
+        # Drop the values already added, using each device's last timestamp
+        seen = self._last_ts.reindex(devices).fillna(-1).to_numpy(dtype='int64')
+        new = timestamps > seen[codes] if len(devices) else np.zeros(0, dtype=bool)
+        if not new.any():
+            return self.daily
+        codes, timestamps = codes[new], timestamps[new]
+        rh_values = _numeric_column(df, self.rh)[new]
+        t_values = _numeric_column(df, self.t)[new]
+        last = pd.Series(timestamps).groupby(codes).max()
+        self._last_ts = self._last_ts.combine(pd.Series(last.to_numpy(), index=devices[last.index]),
+                                              max, fill_value=-1).astype('int64')
+
+        partials = _hourly_partials(codes, devices, timestamps, rh_values, t_values)
+        self.hourly = partials if self.hourly is None else self.hourly.add(partials, fill_value=0)
+        # Recompute each device from the day before its first new value (needed for div_2day)
+        first_day = pd.Series(_local_dates(partials.index.get_level_values('hour').to_numpy(), tz=self.tz),
+                              index=partials.index.get_level_values('name')).groupby(level=0).min()
+        hourly = self.hourly[self.hourly.index.get_level_values('name').isin(first_day.index)]
+        names = hourly.index.get_level_values('name')
+        dates = _local_dates(hourly.index.get_level_values('hour').to_numpy(), tz=self.tz)
+        since = first_day.reindex(names).to_numpy() - np.timedelta64(1, 'D')
+        recent = _daily_from_hourly(hourly[dates >= since], (self.div_temps_f, self.div_hours),
+                                    fahrenheit=self.fahrenheit, tz=self.tz, rh_threshold=self.rh_threshold)
+        recent = recent[recent['date'].to_numpy() >= first_day.reindex(recent['name']).to_numpy()]
+        if len(self.daily):
+            # Earlier days are unchanged, and div_total carries on from the last of them
+            old_first = first_day.reindex(self.daily['name']).to_numpy()
+            kept = self.daily[~(self.daily['date'].to_numpy() >= old_first)]
+            before = self.daily[self.daily['date'].to_numpy() < old_first - np.timedelta64(1, 'D')]
+            carry = before.groupby('name', sort=False)['div_total'].last()
+            recent = recent.assign(div_total=recent['div_total'].to_numpy() +
+                                   carry.reindex(recent['name']).fillna(0).to_numpy(dtype='int64'))
+            recent = pd.concat([kept, recent])
+        self.daily = recent.sort_values(['name', 'date'], kind='stable').reset_index(drop=True)
+        return self.daily
+
+def daily_infection_values(df, div_table, rh='rh', t='t', fahrenheit=False, tz=RISK_TIMEZONE,
+                           rh_threshold=RISK_RH_THRESHOLD, name=None):
+    '''
+    Computes the cercospora Daily Infection Value of every device and day of a wide frame,
+    e.g. get_type_data(device_type='pile-temp-and-cercospora-monitor'). Use InfectionRisk to
+    keep the result up to date as new values arrive.
+    :param df: wide frame of get_type_data (with a 'name' column) or get_device_data,
+               in the default or the compact schema
+    :param div_table: DIV table (see InfectionRisk)
+    :param rh: label of the relative humidity variable (%)
+    :param t: label of the temperature variable
+    :param fahrenheit: if True, temperatures are in degrees F (degrees C otherwise)
+    :param tz: time zone whose calendar days the daily values are computed for (see Global variables)
+    :param rh_threshold: hourly mean relative humidity (%) at or above which an hour counts as high RH
+    :param name: device name of a frame without a 'name' column
+    :return: pandas.core.frame.DataFrame with one row per device and day: name, date, hours (with
+             both rh and t), high_rh_hours, high_rh_temp (mean temperature of the high-RH hours,
+             in the unit of t), div, div_2day (DIV of the day plus the previous day) and
+             div_total (running total of the device)
+    '''
+    risk = InfectionRisk(div_table, rh=rh, t=t, fahrenheit=fahrenheit, tz=tz, rh_threshold=rh_threshold)
+    return risk.update(df, name=name)
+
+def _device_codes_and_timestamps(df, name=None):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: tuple of (device code of each row, array of device names, timestamps in epoch ms)
+    '''
+    if 'Timestamp' in df.columns:
+        timestamps = df['Timestamp'].to_numpy(dtype='int64')
+    else:
+        # Compact schema: the UTC DatetimeIndex named Timestamp
+        timestamps = pd.DatetimeIndex(df.index).as_unit('ms').asi8
+    if 'name' not in df.columns:
+        return np.zeros(len(df), dtype='int64'), np.array([name], dtype=object), timestamps
+    names = df['name']
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes = names.cat.codes.to_numpy(dtype='int64')
+        devices = names.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, devices = pd.factorize(names)
+        devices = np.asarray(devices, dtype=object)
+    return codes, devices, timestamps
+
+def _numeric_column(df, label):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :return: float64 numpy array of a variable's values (NaN where missing or not numeric)
+    '''
+    if label not in df.columns:
+        raise KeyError(f"Variable {label!r} not in the frame (columns: {list(df.columns)})")
+    return pd.to_numeric(df[label], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def _hourly_partials(codes, devices, timestamps, rh_values, t_values):
+    '''
+    Sums and counts of the values of each device and hour, with one bincount per column.
+    :private function (should not need to run, but used in main fxns)
+    :return: DataFrame indexed by (name, hour in epoch ms) with rh_sum, rh_count, t_sum and t_count
+    '''
+    hours = timestamps // HOUR_MS
+    first = hours.min()
+    span = int(hours.max() - first + 1)
+    keys = codes * span + (hours - first)
+    size = len(devices) * span
+    if size > max(4 * len(keys), 1 << 20):
+        # Sparse data (e.g. a few values over years): only count the hours present
+        unique_keys, keys = np.unique(keys, return_inverse=True)
+        size = len(unique_keys)
+    else:
+        unique_keys = None
+    columns = {}
+    for prefix, values in (('rh', rh_values), ('t', t_values)):
+        ok = ~np.isnan(values)
+        columns[f'{prefix}_sum'] = np.bincount(keys[ok], weights=values[ok], minlength=size)
+        columns[f'{prefix}_count'] = np.bincount(keys[ok], minlength=size).astype('float64')
+    present = np.flatnonzero((columns['rh_count'] > 0) | (columns['t_count'] > 0))
+    absolute = present if unique_keys is None else unique_keys[present]
+    index = pd.MultiIndex.from_arrays([devices[absolute // span], (absolute % span + first) * HOUR_MS],
+                                      names=['name', 'hour'])
+    return pd.DataFrame({column: values[present] for column, values in columns.items()}, index=index)
+
+def _local_dates(hours, tz=RISK_TIMEZONE):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param hours: numpy array of epoch ms
+    :return: numpy datetime64 array of the local calendar day of each hour
+    '''
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    days = pd.to_datetime(unique_hours, unit='ms', utc=True).tz_convert(tz).tz_localize(None).normalize()
+    return days.to_numpy()[inverse]
+
+def _div_arrays(div_table):
+    '''
+    Checks a DIV table and splits it into numpy arrays for _div_lookup.
+    :private function (should not need to run, but used in main fxns)
+    :param div_table: DIV table (see InfectionRisk)
+    :return: tuple of (lower temperature bound of each band in degrees F,
+             hours needed for each DIV in each band, inf where never reached)
+    '''
+    if not isinstance(div_table, pd.DataFrame) or div_table.empty:
+        raise TypeError("div_table must be a non-empty DataFrame (see InfectionRisk)")
+    temps_f = pd.to_numeric(pd.Series(div_table.index), errors='coerce').to_numpy(dtype='float64')
+    hours = div_table.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+    if np.isnan(temps_f).any() or (np.diff(temps_f) <= 0).any():
+        raise ValueError("div_table must be indexed by increasing temperatures (degrees F)")
+    hours = np.where(np.isnan(hours), np.inf, hours)
+    if (hours[:, 1:] < hours[:, :-1]).any():
+        raise ValueError("div_table hours must not decrease from one DIV to the next")
+    return temps_f, hours
+
+def _div_lookup(high_rh_hours, temp_f, div_temps_f, div_hours):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param high_rh_hours: numpy array of the number of high-RH hours of each day
+    :param temp_f: numpy array of the mean temperature of those hours, in degrees F (NaN if none)
+    :param div_temps_f: lower temperature bound of each band (see _div_arrays)
+    :param div_hours: hours needed for each DIV in each band (see _div_arrays)
+    :return: numpy array of daily infection values (0 up to the number of columns of the table)
+    '''
+    band = np.searchsorted(div_temps_f, np.nan_to_num(temp_f, nan=-np.inf), side='right') - 1
+    thresholds = div_hours[np.clip(band, 0, None)]
+    div = (np.asarray(high_rh_hours)[:, None] >= thresholds).sum(axis=1)
+    return np.where(band >= 0, div, 0)
+
+def _daily_from_hourly(hourly, div_arrays, fahrenheit=False, tz=RISK_TIMEZONE,
+                       rh_threshold=RISK_RH_THRESHOLD):
+    '''
+    :private function (should not need to run, but used in main fxns)
+    :param hourly: hourly sums as returned by _hourly_partials
+    :param div_arrays: DIV table as returned by _div_arrays
+    :return: DataFrame of daily infection values (see daily_infection_values)
+    '''
+    if hourly.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rh = hourly['rh_sum'].to_numpy() / hourly['rh_count'].to_numpy()
+        t = hourly['t_sum'].to_numpy() / hourly['t_count'].to_numpy()
+    high = rh >= rh_threshold
+    high_t = high & ~np.isnan(t)
+    hours_df = pd.DataFrame({'name': hourly.index.get_level_values('name'),
+                             'date': _local_dates(hourly.index.get_level_values('hour').to_numpy(), tz=tz),
+                             'hours': ~np.isnan(rh) & ~np.isnan(t),
+                             'high_rh_hours': high,
+                             'high_t_sum': np.where(high_t, t, 0.0),
+                             'high_t_count': high_t})
+    daily = hours_df.groupby(['name', 'date'], sort=True).sum().reset_index()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        daily['high_rh_temp'] = daily['high_t_sum'] / daily['high_t_count']
+    temp_f = daily['high_rh_temp'].to_numpy() if fahrenheit else daily['high_rh_temp'].to_numpy() * 9 / 5 + 32
+    daily['div'] = _div_lookup(daily['high_rh_hours'].to_numpy(), temp_f, *div_arrays)
+    # The previous day only counts if it is the previous calendar day of the same device
+    same_device = daily['name'].eq(daily['name'].shift())
+    consecutive = same_device & daily['date'].diff().eq(pd.Timedelta(days=1))
+    daily['div_2day'] = daily['div'] + daily['div'].shift(fill_value=0).where(consecutive, 0)
+    daily['div_total'] = daily.groupby('name', sort=False)['div'].cumsum()
+    return daily[DAILY_COLUMNS]
@@ -0,0 +1,119 @@
+'''
+Local SQLite store of synced values (see sync_type_data).
+'''
+
+import pandas as pd
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from .config import DEVICE_LABEL, SYNC_DB, VARIABLE_LABEL
+from .frames import _merge_var_dfs, _values_df_from_rows
+
+class SyncStore:
+    '''
+    Local SQLite store of synced values, with a high-water mark (last timestamp seen) per
+    variable so that each sync only downloads values newer than the previous run.
+    Safe to share between the threads and tasks of one process.
+    :param path: path of the SQLite file (see Global variables); created if missing
+    '''
+    def __init__(self, path=SYNC_DB):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS var_values (
+                                      variable TEXT NOT NULL,
+                                      timestamp INTEGER NOT NULL,
+                                      value REAL,
+                                      context TEXT,
+                                      PRIMARY KEY (variable, timestamp))''')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS watermarks (
+                                      variable TEXT PRIMARY KEY,
+                                      device TEXT,
+                                      label TEXT,
+                                      last_timestamp INTEGER,
+                                      synced_at TEXT)''')
+
+    def get_watermark(self, variable=VARIABLE_LABEL):
+        '''
+        :param variable: individual variable label as created by Ubidots
+        :return: last synced timestamp (epoch ms) of the variable, or None if never synced
+        '''
+        with self._lock:
+            row = self._conn.execute('SELECT last_timestamp FROM watermarks WHERE variable = ?',
+                                     (variable,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, variable=VARIABLE_LABEL, device_id=DEVICE_LABEL, label=None, timestamp=None):
+        '''
+        Records the last synced timestamp (epoch ms) of a variable.
+        '''
+        with self._lock, self._conn:
+            self._conn.execute('''INSERT INTO watermarks (variable, device, label, last_timestamp, synced_at)
+                                  VALUES (?, ?, ?, ?, ?)
+                                  ON CONFLICT(variable) DO UPDATE SET
+                                      device = excluded.device,
+                                      label = excluded.label,
+                                      last_timestamp = excluded.last_timestamp,
+                                      synced_at = excluded.synced_at''',
+                               (variable, device_id, label, timestamp,
+                                datetime.now(timezone.utc).isoformat()))
+
+    def append(self, variable, values_df):
+        '''
+        Appends a chunk of values; values already stored for the same timestamp are skipped.
+        :param variable: individual variable label as created by Ubidots
+        :param values_df: DataFrame as yielded by iter_var_values
+        :return: number of values actually added
+        '''
+        value_column = values_df.columns[2]
+        rows = zip([variable] * len(values_df),
+                   values_df['Timestamp'].astype('int64').tolist(),
+                   values_df[value_column].tolist(),
+                   values_df['Context'].tolist())
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany('INSERT OR IGNORE INTO var_values VALUES (?, ?, ?, ?)', rows)
+            return self._conn.total_changes - before
+
+    def get_var_df(self, variable=VARIABLE_LABEL, label=None):
+        '''
+        :param variable: individual variable label as created by Ubidots
+        :param label: name of the value column (defaults to the label recorded at sync time)
+        :return: pandas.core.frame.DataFrame of the stored values in the same layout as get_var_df
+        '''
+        with self._lock:
+            if label is None:
+                row = self._conn.execute('SELECT label FROM watermarks WHERE variable = ?',
+                                         (variable,)).fetchone()
+                label = row[0] if row and row[0] else variable
+            rows = self._conn.execute('''SELECT timestamp, value, context FROM var_values
+                                         WHERE variable = ? ORDER BY timestamp DESC''',
+                                      (variable,)).fetchall()
+        return _values_df_from_rows(rows, label=label)
+
+    def get_device_data(self, device_id=DEVICE_LABEL):
+        '''
+        :param device_id: individual device label as created by Ubidots
+        :return: pandas.core.frame.DataFrame of the device's stored values in the same layout as get_device_data
+        '''
+        with self._lock:
+            variables = self._conn.execute('SELECT variable, label FROM watermarks WHERE device = ?',
+                                           (device_id,)).fetchall()
+        dfs = [self.get_var_df(variable, label=label) for variable, label in variables]
+        return _merge_var_dfs(dfs) if dfs else pd.DataFrame()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,562 @@
+'''
+HTTP transport: pooled sync and async sessions with retries and backoff, the
+per-token request throttle, and request instrumentation.
+
+Imports requests (and httpx when installed) but not pandas.
+'''
+
+import asyncio
+import bisect
+import logging
+import random
+import re
+import threading
+import time
+import requests
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+try:
+    import httpx # optional async backend; falls back to the pooled requests session in threads
+except ImportError:
+    httpx = None
+
+from .config import (BACKOFF, HEADERS, MAX_ATTEMPTS, MAX_BACKOFF, MAX_CONNECTIONS, RATE_LIMIT,
+                     RETRY_STATUSES, TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+class _Throttle:
+    '''
+    Thread-safe request pacer, shared by worker threads and event loops so that concurrent
+    downloads stay under the per-account rate limit and connection cap.
+    Use as a context manager around each request (async with from a coroutine).
+    :param rate_limit: max requests per second (None or 0 disables pacing)
+    :param max_connections: max number of requests in flight at the same time (None for no cap)
+    '''
+    SLOT_POLL = 0.005 # Seconds between two tries of a coroutine waiting for a free connection slot
+
+    def __init__(self, rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS):
+        self.interval = 1.0 / rate_limit if rate_limit else 0
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max_connections) if max_connections else None
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def reserve(self):
+        '''
+        Books the caller's next request slot.
+        :return: how long in seconds the caller must wait before sending it
+        '''
+        if not self.interval:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def wait(self):
+        '''
+        Blocks until the caller is allowed to send its next request.
+        '''
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def __enter__(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self.wait()
+        except BaseException:
+            self._release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+    async def __aenter__(self):
+        if self._slots is not None:
+            # The slots are shared with threads and other event loops: poll rather than block this loop
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(self.SLOT_POLL)
+        delay = self.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled while paced: __aexit__ won't run, and the slot is shared by every client
+                self._release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+    def _release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+_NO_THROTTLE = _Throttle(rate_limit=None, max_connections=None)
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def _get_throttle(headers=HEADERS, rate_limit=RATE_LIMIT, max_connections=MAX_CONNECTIONS):
+    '''
+    Returns the _Throttle shared by every request made with the same token.
+    :private function (should not need to run, but used in main fxns)
+    :param headers: http headers to use when making HTTP query (see Global variables)
+    :param rate_limit: max requests per second for this token
+    :param max_connections: max number of requests in flight at the same time for this token
+    :return: _Throttle instance
+    '''
+    key = (headers.get("X-Auth-Token"), rate_limit, max_connections)
+    with _throttles_lock:
+        if key not in _throttles:
+            _throttles[key] = _Throttle(rate_limit=rate_limit, max_connections=max_connections)
+        return _throttles[key]
+
+class Instrumentation:
+    '''
+    Collects metrics of the requests and work done by the client: per-request latency
+    histograms, retry and 429 counters, bytes downloaded, and span timings per device,
+    variable or bulk batch. Every event is also logged at DEBUG level, with its fields in
+    the record's "ubidots" attribute, and passed to the sinks (e.g. PrometheusSink,
+    OpenTelemetrySink); a sink is any object with on_request, on_retry and on_span methods.
+    :param sinks: list of sinks receiving every event
+    '''
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf')) # Upper bounds in seconds
+
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {} # route -> {'count', 'seconds', 'bytes', 'statuses', 'buckets'}
+            self.retries = {} # reason (status code or exception name) -> count
+            self.throttled = 0
+            self.spans = {} # (kind, name) -> {'count', 'seconds', 'max', 'errors'}
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def record_request(self, method, url, status, seconds, nbytes=0, attempt=0):
+        '''
+        Records one HTTP attempt.
+        :param method: HTTP method
+        :param url: full url of the request
+        :param status: HTTP status code, or None if no response was received
+        :param seconds: time until the response (or the error)
+        :param nbytes: size of the response body
+        :param attempt: number of the attempt, starting at 0
+        '''
+        event = {'method': method, 'route': _route(url), 'status': status, 'seconds': seconds,
+                 'bytes': nbytes, 'attempt': attempt}
+        with self._lock:
+            stats = self.requests.setdefault(event['route'], {'count': 0, 'seconds': 0.0, 'bytes': 0,
+                                                              'statuses': {},
+                                                              'buckets': [0] * len(self.LATENCY_BUCKETS)})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['bytes'] += nbytes
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            stats['buckets'][bisect.bisect_left(self.LATENCY_BUCKETS, seconds)] += 1
+            if status == 429:
+                self.throttled += 1
+        logger.debug("%s %s -> %s in %.3f s, %d bytes (attempt %d)", method, event['route'], status,
+                     seconds, nbytes, attempt, extra={'ubidots': event})
+        self._emit('on_request', event)
+
+    def record_retry(self, method, url, reason, delay, attempt=0):
+        '''
+        Records that a request is retried after a failed attempt.
+        :param reason: HTTP status code or exception of the failed attempt
+        :param delay: seconds waited before the next attempt
+        '''
+        if isinstance(reason, Exception):
+            reason = type(reason).__name__
+        event = {'method': method, 'route': _route(url), 'reason': reason, 'delay': delay,
+                 'attempt': attempt}
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+        logger.info("Retrying %s %s after %s in %.2f s (attempt %d)", method, event['route'], reason,
+                    delay, attempt, extra={'ubidots': event})
+        self._emit('on_retry', event)
+
+    @contextmanager
+    def span(self, kind, name):
+        '''
+        Times a unit of work, e.g. with INSTRUMENTATION.span('device', device_id): ...
+        :param kind: kind of work, e.g. 'device', 'variable', 'batch' or 'type'
+        :param name: what the work is about, e.g. the device id
+        '''
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record_span(kind, name, time.perf_counter() - start, error=error, start_ns=start_ns)
+
+    def record_span(self, kind, name, seconds, error=None, start_ns=None):
+        event = {'kind': kind, 'name': str(name), 'seconds': seconds, 'error': error,
+                 'start_ns': start_ns}
+        with self._lock:
+            stats = self.spans.setdefault((kind, event['name']), {'count': 0, 'seconds': 0.0, 'max': 0.0,
+                                                                  'errors': 0})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['errors'] += error is not None
+        logger.debug("%s %s took %.3f s%s", kind, name, seconds, f" ({error})" if error else "",
+                     extra={'ubidots': event})
+        self._emit('on_span', event)
+
+    def snapshot(self):
+        '''
+        :return: dict with the request stats per route, the retry counts per reason, the number
+                 of 429 responses and the total bytes downloaded
+        '''
+        with self._lock:
+            requests_stats = {route: dict(stats, statuses=dict(stats['statuses']),
+                                          buckets=list(stats['buckets']))
+                              for route, stats in self.requests.items()}
+            return {'requests': requests_stats,
+                    'retries': dict(self.retries),
+                    'throttled': self.throttled,
+                    'bytes': sum(stats['bytes'] for stats in requests_stats.values())}
+
+    def spans_df(self, kind=None):
+        '''
+        Span timings, slowest first, to see which devices or variables dominate a pull.
+        :param kind: only return spans of this kind
+        :return: pandas.core.frame.DataFrame with kind, name, count, seconds, mean, max and errors columns
+        '''
+        import pandas as pd
+        with self._lock:
+            rows = [{'kind': k, 'name': name, **stats} for (k, name), stats in self.spans.items()
+                    if kind is None or k == kind]
+        spans_df = pd.DataFrame(rows, columns=['kind', 'name', 'count', 'seconds', 'max', 'errors'])
+        spans_df.insert(4, 'mean', spans_df['seconds'] / spans_df['count'])
+        return spans_df.sort_values('seconds', ascending=False).reset_index(drop=True)
+
+    def _emit(self, method, event):
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(event)
+            except Exception:
+                # A broken exporter must never fail the download itself
+                logger.exception("Instrumentation sink %r failed", sink)
+
+class PrometheusSink:
+    '''
+    Exports the Instrumentation events as Prometheus metrics (requires prometheus_client):
+    ubidots_request_seconds (histogram by method, route and status), ubidots_response_bytes_total,
+    ubidots_retries_total (by reason), ubidots_throttled_total and ubidots_span_seconds
+    (histogram by kind; names are left out to keep the label cardinality bounded).
+    Usage: INSTRUMENTATION.add_sink(PrometheusSink()); prometheus_client.start_http_server(9100)
+    :param registry: prometheus_client registry (default: the global registry)
+    '''
+    def __init__(self, registry=None):
+        try:
+            import prometheus_client
+        except ImportError as e:
+            raise ImportError("PrometheusSink requires prometheus_client: pip install prometheus-client") from e
+        kwargs = {'registry': registry} if registry is not None else {}
+        buckets = Instrumentation.LATENCY_BUCKETS
+        self.request_seconds = prometheus_client.Histogram('ubidots_request_seconds', 'Ubidots request latency',
+                                                           ['method', 'route', 'status'], buckets=buckets,
+                                                           **kwargs)
+        self.response_bytes = prometheus_client.Counter('ubidots_response_bytes', 'Bytes downloaded from Ubidots',
+                                                        ['route'], **kwargs)
+        self.retries = prometheus_client.Counter('ubidots_retries', 'Retried Ubidots requests', ['reason'],
+                                                 **kwargs)
+        self.throttled = prometheus_client.Counter('ubidots_throttled', 'Ubidots 429 responses', **kwargs)
+        self.span_seconds = prometheus_client.Histogram('ubidots_span_seconds', 'Time per unit of work',
+                                                        ['kind'], buckets=buckets, **kwargs)
+
+    def on_request(self, event):
+        self.request_seconds.labels(event['method'], event['route'], str(event['status'])).observe(event['seconds'])
+        self.response_bytes.labels(event['route']).inc(event['bytes'])
+        if event['status'] == 429:
+            self.throttled.inc()
+
+    def on_retry(self, event):
+        self.retries.labels(str(event['reason'])).inc()
+
+    def on_span(self, event):
+        self.span_seconds.labels(event['kind']).observe(event['seconds'])
+
+class OpenTelemetrySink:
+    '''
+    Exports the Instrumentation events through the OpenTelemetry API (requires opentelemetry-api):
+    the same metrics as PrometheusSink, and one trace span per device, variable or batch span.
+    The configured OpenTelemetry SDK and exporters decide where they go.
+    :param meter: opentelemetry Meter (default: metrics.get_meter(__name__))
+    :param tracer: opentelemetry Tracer (default: trace.get_tracer(__name__))
+    '''
+    def __init__(self, meter=None, tracer=None):
+        try:
+            from opentelemetry import metrics, trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetrySink requires opentelemetry-api: pip install opentelemetry-api") from e
+        meter = meter if meter is not None else metrics.get_meter(__name__)
+        self.tracer = tracer if tracer is not None else trace.get_tracer(__name__)
+        self.request_seconds = meter.create_histogram('ubidots.request.duration', unit='s')
+        self.response_bytes = meter.create_counter('ubidots.response.bytes', unit='By')
+        self.retries = meter.create_counter('ubidots.retries')
+        self.throttled = meter.create_counter('ubidots.throttled')
+        self.span_seconds = meter.create_histogram('ubidots.span.duration', unit='s')
+
+    def on_request(self, event):
+        attributes = {'method': event['method'], 'route': event['route'], 'status': str(event['status'])}
+        self.request_seconds.record(event['seconds'], attributes)
+        self.response_bytes.add(event['bytes'], {'route': event['route']})
+        if event['status'] == 429:
+            self.throttled.add(1)
+
+    def on_retry(self, event):
+        self.retries.add(1, {'reason': str(event['reason'])})
+
+    def on_span(self, event):
+        self.span_seconds.record(event['seconds'], {'kind': event['kind']})
+        if event['start_ns'] is not None:
+            span = self.tracer.start_span(f"ubidots.{event['kind']}", start_time=event['start_ns'],
+                                          attributes={'ubidots.name': event['name']})
+            span.end(end_time=event['start_ns'] + int(event['seconds'] * 1e9))
+
+def _route(url):
+    '''
+    Url path with the device and variable ids replaced, so that metrics group by endpoint.
+    :private function (should not need to run, but used in main fxns)
+    '''
+    path = urlparse(url).path
+    return re.sub(r'/(devices|variables|datasources)/[^/]+', r'/\1/{id}', path)
+
+def _mask(token):
+    '''
+    Shortens a token for logs and reports, so that it is recognizable but not usable.
+    :private function (should not need to run, but used in main fxns)
+    '''
+    if not token:
+        return repr(token)
+    return f"{token[:4]}...{token[-4:]}" if len(token) > 16 else f"{token[:4]}..."
+
+class UbidotsSession:
+    '''
+    Pooled keep-alive HTTP session shared by all helpers, so that requests to Ubidots
+    reuse open TLS connections instead of opening a new one per call.
+    Failed requests (connection errors and RETRY_STATUSES) are retried with exponential
+    backoff and full jitter; a 429/503 Retry-After header is honored. Successful
+    requests return immediately.
+    :param pool_size: max number of keep-alive connections kept open per host
+    :param timeout: (connect, read) timeout in seconds, or a single number for both
+    :param max_attempts: max number of attempts per request
+    :param backoff: base delay in seconds of the exponential backoff
+    :param max_backoff: longest delay in seconds between two attempts
+    :param instrumentation: Instrumentation recording every attempt (default: INSTRUMENTATION)
+    '''
+    def __init__(self, pool_size=MAX_CONNECTIONS, timeout=TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF, max_backoff=MAX_BACKOFF, instrumentation=None):
+        self.timeout = timeout
+        self.instrumentation = instrumentation if instrumentation is not None else INSTRUMENTATION
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, headers=HEADERS, throttle=None, **kwargs):
+        '''
+        Sends a GET request, retrying transient failures.
+        :param url: full url of the request
+        :param headers: http headers to use when making HTTP query (see Global variables)
+        :param throttle: optional _Throttle shared between threads to respect the account rate limit
+        :return: requests.Response of the last attempt
+        '''
+        return self.request("GET", url, headers=headers, throttle=throttle, **kwargs)
+
+    def request(self, method, url, headers=HEADERS, throttle=None, idempotent=True, **kwargs):
+        '''
+        Sends a request, retrying transient failures.
+        :param method: HTTP method, e.g. 'GET' or 'POST'
+        :param url: full url of the request
+        :param headers: http headers to use when making HTTP query (see Global variables)
+        :param throttle: optional _Throttle shared between threads to respect the account rate limit
+        :param idempotent: if False (e.g. a write), only a 429 answer is retried, since after a
+                           connection error, a timeout or a 5xx the request may have been applied
+        :return: requests.Response of the last attempt
+        '''
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            try:
+                with throttle or _NO_THROTTLE:
+                    start = time.perf_counter()
+                    resp = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.instrumentation.record_request(method, url, None, time.perf_counter() - start,
+                                                    attempt=attempt)
+                if last_attempt or not idempotent:
+                    raise
+                delay = _backoff_delay(attempt, backoff=self.backoff, max_backoff=self.max_backoff)
+                self.instrumentation.record_retry(method, url, e, delay, attempt=attempt)
+                time.sleep(delay)
+                continue
+            self.instrumentation.record_request(method, url, resp.status_code, time.perf_counter() - start,
+                                                len(resp.content), attempt=attempt)
+            if resp.status_code not in RETRY_STATUSES or last_attempt or \
+                    (not idempotent and resp.status_code != 429):
+                return resp
+            delay = _backoff_delay(attempt, resp, backoff=self.backoff, max_backoff=self.max_backoff)
+            self.instrumentation.record_retry(method, url, resp.status_code, delay, attempt=attempt)
+            time.sleep(delay)
+        return resp
+
+    def close(self):
+        self.session.close()
+
+class AsyncUbidotsSession:
+    '''
+    Async counterpart of UbidotsSession with the same retry, backoff and throttling rules.
+    Uses an httpx.AsyncClient when httpx is installed; otherwise each request runs the
+    pooled requests session of sync_session on a worker thread.
+    Must be used (and closed with aclose) from a single event loop. A request's throttle caps
+    the requests in flight for its token across all sessions and threads, on top of pool_size.
+    :param pool_size: max number of requests in flight for this session (and keep-alive connections)
+    :param timeout: (connect, read) timeout in seconds, or a single number for both
+    :param max_attempts: max number of attempts per request
+    :param backoff: base delay in seconds of the exponential backoff
+    :param max_backoff: longest delay in seconds between two attempts
+    :param sync_session: UbidotsSession used when httpx is not installed
+    :param instrumentation: Instrumentation recording every attempt (default: that of sync_session)
+    '''
+    def __init__(self, pool_size=MAX_CONNECTIONS, timeout=TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF, max_backoff=MAX_BACKOFF, sync_session=None, instrumentation=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sync_session = sync_session if sync_session is not None else SESSION
+        self.instrumentation = instrumentation if instrumentation is not None else self.sync_session.instrumentation
+        self._client = None
+        self._slots = None
+
+    async def get(self, url, headers=HEADERS, throttle=None, **kwargs):
+        '''
+        Sends a GET request, retrying transient failures.
+        :return: httpx.Response (or requests.Response without httpx) of the last attempt
+        '''
+        return await self.request("GET", url, headers=headers, throttle=throttle, **kwargs)
+
+    async def request(self, method, url, headers=HEADERS, throttle=None, idempotent=True, **kwargs):
+        '''
+        Sends a request, retrying transient failures (see UbidotsSession.request for idempotent).
+        :return: httpx.Response (or requests.Response without httpx) of the last attempt
+        '''
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        throttle = throttle or _NO_THROTTLE
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            try:
+                async with self._slots, throttle:
+                    start = time.perf_counter()
+                    resp = await self._send(method, url, headers=headers, **kwargs)
+            except _TRANSIENT_ERRORS as e:
+                self.instrumentation.record_request(method, url, None, time.perf_counter() - start,
+                                                    attempt=attempt)
+                if last_attempt or not idempotent:
+                    raise
+                delay = _backoff_delay(attempt, backoff=self.backoff, max_backoff=self.max_backoff)
+                self.instrumentation.record_retry(method, url, e, delay, attempt=attempt)
+                await asyncio.sleep(delay)
+                continue
+            self.instrumentation.record_request(method, url, resp.status_code, time.perf_counter() - start,
+                                                len(resp.content), attempt=attempt)
+            if resp.status_code not in RETRY_STATUSES or last_attempt or \
+                    (not idempotent and resp.status_code != 429):
+                return resp
+            delay = _backoff_delay(attempt, resp, backoff=self.backoff, max_backoff=self.max_backoff)
+            self.instrumentation.record_retry(method, url, resp.status_code, delay, attempt=attempt)
+            await asyncio.sleep(delay)
+        return resp
+
+    async def _send(self, method, url, headers=HEADERS, **kwargs):
+        if httpx is None:
+            kwargs.setdefault("timeout", self.timeout)
+            if "content" in kwargs: # httpx name of a raw body
+                kwargs["data"] = kwargs.pop("content")
+            return await asyncio.to_thread(self.sync_session.session.request, method, url,
+                                           headers=headers, **kwargs)
+        if self._client is None:
+            connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(read, connect=connect),
+                                             limits=httpx.Limits(max_connections=self.pool_size,
+                                                                 max_keepalive_connections=self.pool_size))
+        return await self._client.request(method, url, headers=headers, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout) + \
+                    ((httpx.TransportError,) if httpx is not None else ())
+
+_HTTP_STATUS_ERRORS = (requests.HTTPError,) + ((httpx.HTTPStatusError,) if httpx is not None else ())
+
+def _backoff_delay(attempt, resp=None, backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+    '''
+    Returns how long to wait before the next attempt: the server's Retry-After
+    when given, otherwise a random delay up to backoff * 2**attempt (full jitter).
+    :private function (should not need to run, but used in main fxns)
+    :param attempt: number of the attempt that just failed, starting at 0
+    :param resp: response of the failed attempt, or None after a connection error
+    :param backoff: base delay in seconds
+    :param max_backoff: longest delay in seconds
+    :return: delay in seconds
+    '''
+    retry_after = _parse_retry_after(resp.headers.get("Retry-After")) if resp is not None else None
+    if retry_after is not None:
+        return min(retry_after, max_backoff)
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+def _parse_retry_after(value):
+    '''
+    Converts a Retry-After header (seconds or HTTP date) to a delay in seconds.
+    :private function (should not need to run, but used in main fxns)
+    :param value: Retry-After header value, or None
+    :return: delay in seconds, or None if the header is missing or malformed
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+INSTRUMENTATION = Instrumentation() # Shared metrics of all sessions (add sinks to export them)
+SESSION = UbidotsSession() # Shared session used by all helpers
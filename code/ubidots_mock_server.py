@@ -0,0 +1,533 @@
+'''
+Ubidots mock server
+Local stand-in for the parts of the Ubidots HTTP API used by
+ubidots_python_api_test_HTTP.py, so the client can be run and benchmarked
+without a token or network access.
+
+Implemented endpoints:
+    GET  /api/v2.0/devices/                       (paginated, properties___device_type filter, fields projection)
+    GET  /api/v2.0/devices/<id>/variables/        (paginated; also accepts the device's own token)
+    GET  /api/v1.6/datasources/<id>/tokens/       (paginated device tokens)
+    GET  /api/v1.6/variables/<id>/values/         (format=csv last values, or paginated JSON; both take start/end)
+    POST /api/v1.6/data/raw/series                (bulk values)
+    POST /api/v1.6/data/stats/resample/           (aggregated values; fixed-length periods only)
+    POST /api/v1.6/devices/<label>/               (writes {variable label: [dots]}; kept in written)
+
+The fleet is synthetic and deterministic (see MockFleet); values are generated
+on request, so large fleets cost no memory. Latency, page sizes and random
+429/5xx responses can be configured, and every request is counted in stats.
+Written values are kept apart from the fleet (they are not returned by reads).
+
+Usage from Python:
+    with MockUbidotsServer(MockFleet(devices=20), latency=0.05) as server:
+        client = UbidotsClient(token='any', endpoint=server.url)
+
+Usage from the terminal (from the 'code' folder):
+    python ubidots_mock_server.py --port 8000 --devices 20 --latency 0.05
+    then point ENDPOINT (or UbidotsClient(endpoint=...)) at http://127.0.0.1:8000
+'''
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEVICE_TYPES = ['pile-temp-and-cercospora-monitor', 'low-cost-water-sampler']
+VARIABLE_LABELS = ['air-temperature', 'relative-humidity', 'leaf-wetness', 'dew-point',
+                   'pile-temperature', 'battery-voltage', 'rssi', 'solar-radiation',
+                   'rainfall', 'wind-speed', 'soil-moisture', 'soil-temperature',
+                   'infection-risk', 'daily-infection-value', 'signal-quality']
+START_MS = 1717200000000 # 1 June 2024 00:00 UTC, time of the first synthetic value
+DEVICE_PAGE_SIZE = 100 # Default and max page size of the v2.0 listings
+VALUES_PAGE_SIZE = 1000 # Max page size of the v1.6 values endpoint
+PERIOD_MS = {'S': 1000, 'T': 60000, 'H': 3600000, 'D': 86400000} # Resample period units served
+
+class MockFleet:
+    '''
+    Deterministic synthetic fleet: devices of several types, each with the same number of
+    variables, each reporting at a fixed interval. Every device has one token, except every
+    tokenless_every-th device (none) and every revoked_every-th device (listed but rejected).
+    '''
+    def __init__(self, devices=10, variables=15, values=5000, device_types=None,
+                 interval_ms=60000, seed=0, tokenless_every=7, revoked_every=5):
+        '''
+        :param devices: number of devices
+        :param variables: number of variables per device
+        :param values: number of values per variable
+        :param device_types: device type labels, assigned to devices in turn
+        :param interval_ms: time between two values of a variable
+        :param seed: seed of the device locations
+        :param tokenless_every: every n-th device has no token (0 = all devices have one)
+        :param revoked_every: every n-th device has a revoked token (0 = none revoked)
+        '''
+        rng = random.Random(seed)
+        device_types = list(device_types or DEVICE_TYPES)
+        self.values_count = values
+        self.interval_ms = interval_ms
+        self.devices = []
+        self.variables = {} # device id -> list of variable dictionaries
+        self.variable_index = {} # variable id -> position of the variable in the fleet
+        self.variable_labels = {} # variable id -> variable label
+        self.tokens = {} # device id -> list of token dictionaries
+        self.token_devices = {} # device token -> device id
+        self.revoked_tokens = set()
+        for d in range(devices):
+            device_id = f'{d:024x}'
+            device = {
+                'id': device_id,
+                'label': f'device-{d}',
+                'name': f'Device {d}',
+                'isActive': True,
+                'properties': {
+                    '_device_type': device_types[d % len(device_types)],
+                    '_location_type': 'manual',
+                    '_location_fixed': {'lat': round(rng.uniform(40, 46), 6),
+                                        'lng': round(rng.uniform(-109, -103), 6)},
+                },
+            }
+            self.devices.append(device)
+            var_list = []
+            for v in range(variables):
+                variable_id = f'{d:012x}{v:012x}'
+                label = VARIABLE_LABELS[v % len(VARIABLE_LABELS)]
+                if v >= len(VARIABLE_LABELS):
+                    label = f'{label}-{v // len(VARIABLE_LABELS)}'
+                var_list.append({
+                    'id': variable_id,
+                    'label': label,
+                    'name': label.replace('-', ' ').title(),
+                    'device': {'id': device_id, 'label': device['label'], 'name': device['name']},
+                })
+                self.variable_index[variable_id] = len(self.variable_index)
+                self.variable_labels[variable_id] = label
+            self.variables[device_id] = var_list
+            self.tokens[device_id] = []
+            if not (tokenless_every and d % tokenless_every == tokenless_every - 1):
+                token = f'BBFF-mock{d:08d}{hashlib.sha1(device_id.encode()).hexdigest()[:18]}'
+                self.tokens[device_id].append({'id': f'{d:024x}', 'name': 'Default token', 'token': token})
+                self.token_devices[token] = device_id
+                if revoked_every and d % revoked_every == revoked_every - 1:
+                    self.revoked_tokens.add(token)
+
+    def find_device(self, key):
+        '''
+        :param key: device id or label
+        :return: device dictionary, or None
+        '''
+        for device in self.devices:
+            if key in (device['id'], device['label']):
+                return device
+        return None
+
+    def values(self, variable_id, start=None, end=None, offset=0, limit=None):
+        '''
+        Values of a variable, newest first, generated on the fly.
+        :param variable_id: variable id
+        :param start: only values at or after this epoch ms
+        :param end: only values at or before this epoch ms
+        :param offset: number of values to skip (after the time filter)
+        :param limit: max number of values to return
+        :return: tuple of (total count within [start, end], list of (timestamp, value) tuples)
+        '''
+        first, last = 0, self.values_count - 1
+        if start is not None:
+            first = max(first, math.ceil((start - START_MS) / self.interval_ms))
+        if end is not None:
+            last = min(last, math.floor((end - START_MS) / self.interval_ms))
+        count = max(0, last - first + 1)
+        top = last - offset
+        bottom = first if limit is None else max(first, top - limit + 1)
+        phase = self.variable_index[variable_id]
+        rows = [(START_MS + i * self.interval_ms, round(20 + 5 * math.sin(i / 60 + phase), 3))
+                for i in range(top, bottom - 1, -1)]
+        return count, rows
+
+class MockStats:
+    '''
+    Thread-safe counters of the requests served by a MockUbidotsServer.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.routes = Counter()
+            self.statuses = Counter()
+
+    def record(self, route, status, bytes_in, bytes_out):
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.routes[route] += 1
+            self.statuses[status] += 1
+
+    def snapshot(self):
+        '''
+        :return: dict of the counters
+        '''
+        with self._lock:
+            return {'requests': self.requests,
+                    'bytes_in': self.bytes_in,
+                    'bytes_out': self.bytes_out,
+                    'routes': dict(self.routes),
+                    'statuses': dict(self.statuses)}
+
+class MockUbidotsServer:
+    '''
+    Threaded HTTP server serving a MockFleet in the background.
+    '''
+    def __init__(self, fleet=None, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1, device_page_size=DEVICE_PAGE_SIZE,
+                 values_page_size=VALUES_PAGE_SIZE, reject_filters=False, resample=True, token=None,
+                 write_max_bytes=None, seed=0):
+        '''
+        :param fleet: MockFleet to serve (default: MockFleet())
+        :param host: interface to listen on
+        :param port: port to listen on (0 = any free port, see url)
+        :param latency: seconds added to every response
+        :param error_rate: fraction of requests answered with a random 5xx
+        :param throttle_rate: fraction of requests answered with 429 and a Retry-After header
+        :param retry_after: Retry-After seconds sent with the 429 responses
+        :param device_page_size: default and max page size of the v2.0 listings
+        :param values_page_size: max page size of the v1.6 values endpoint
+        :param reject_filters: if True, answer 400 to device type filters and field projections
+        :param resample: if False, answer 404 to resample requests, like a server without the endpoint
+        :param token: if given, requests with another X-Auth-Token get 401
+        :param write_max_bytes: if given, larger write bodies get 413
+        :param seed: seed of the error injection
+        '''
+        self.fleet = fleet if fleet is not None else MockFleet()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.device_page_size = device_page_size
+        self.values_page_size = values_page_size
+        self.reject_filters = reject_filters
+        self.resample = resample
+        self.token = token
+        self.write_max_bytes = write_max_bytes
+        self.written = {} # device label -> variable label -> {timestamp: value}
+        self._written_lock = threading.Lock()
+        self.stats = MockStats()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _MockHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        '''
+        Base url to use as the client endpoint.
+        '''
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        '''
+        Serves in the calling thread until interrupted.
+        '''
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def injected_error(self):
+        '''
+        :return: (status, extra headers) of an injected error, or None
+        '''
+        with self._rng_lock:
+            draw = self._rng.random()
+            status = self._rng.choice([500, 502, 503, 504])
+        if draw < self.throttle_rate:
+            return 429, {'Retry-After': str(self.retry_after)}
+        if draw < self.throttle_rate + self.error_rate:
+            return status, {}
+        return None
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        route, status, payload, content_type, headers = self._route(method, parsed.path, query, body)
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        etag = None
+        if status == 200 and method == 'GET' and route.startswith('v2.0'):
+            etag = '"{}"'.format(hashlib.sha1(payload).hexdigest())
+            if self.headers.get('If-None-Match') == etag:
+                status, payload = 304, b''
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.mock.stats.record(route, status, len(self.requestline) + length, len(payload))
+
+    def _route(self, method, path, query, body):
+        '''
+        :return: tuple of (route name, status, body bytes, content type, extra headers)
+        '''
+        m = re.fullmatch(r'/api/v2\.0/devices/?', path)
+        route = 'v2.0 devices'
+        handler = self._devices
+        args = ()
+        if not m:
+            m = re.fullmatch(r'/api/v2\.0/devices/([^/]+)/variables/?', path)
+            route, handler, args = 'v2.0 variables', self._variables, m.groups() if m else ()
+        if not m:
+            m = re.fullmatch(r'/api/v1\.6/datasources/([^/]+)/tokens/?', path)
+            route, handler, args = 'v1.6 tokens', self._tokens, m.groups() if m else ()
+        if not m:
+            m = re.fullmatch(r'/api/v1\.6/variables/([^/]+)/values/?', path)
+            route, handler, args = 'v1.6 values', self._values, m.groups() if m else ()
+        if not m:
+            m = re.fullmatch(r'/api/v1\.6/data/raw/series/?', path)
+            route, handler, args = 'v1.6 raw series', self._raw_series, ()
+        if not m and self.mock.resample:
+            m = re.fullmatch(r'/api/v1\.6/data/stats/resample/?', path)
+            route, handler, args = 'v1.6 resample', self._resample, ()
+        if not m:
+            m = re.fullmatch(r'/api/v1\.6/devices/([^/]+)/?', path)
+            route, handler, args = 'v1.6 device write', self._write, m.groups() if m else ()
+        if not m:
+            return 'unknown', 404, b'{"detail": "Not found."}', 'application/json', {}
+        expected = 'POST' if route in ('v1.6 raw series', 'v1.6 resample', 'v1.6 device write') else 'GET'
+        if method != expected:
+            return route, 405, b'{"detail": "Method not allowed."}', 'application/json', {}
+        token = self.headers.get('X-Auth-Token')
+        fleet = self.mock.fleet
+        if token in fleet.token_devices:
+            # A device token may only read its own device's variables, unless it was revoked
+            device = fleet.find_device(args[0]) if route == 'v2.0 variables' else None
+            denied = token in fleet.revoked_tokens or device is None or \
+                     fleet.token_devices[token] != device['id']
+        else:
+            denied = not token or (self.mock.token is not None and token != self.mock.token)
+        if denied:
+            return route, 401, b'{"detail": "Authentication credentials were not provided."}', \
+                   'application/json', {}
+        error = self.mock.injected_error()
+        if error is not None:
+            status, headers = error
+            return route, status, json.dumps({'detail': 'Injected error.'}).encode(), 'application/json', headers
+        status, data, content_type = handler(query, body, *args)
+        if isinstance(data, str):
+            data = data.encode()
+        elif not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        return route, status, data, content_type, {}
+
+    def _page_url(self, query, page):
+        '''
+        :return: absolute url of another page of the current listing
+        '''
+        query = dict(query, page=page)
+        return 'http://{}{}?{}'.format(self.headers.get('Host'), urlparse(self.path).path, urlencode(query))
+
+    def _listing(self, query, items, page_size):
+        page_size = min(int(query.get('page_size', page_size)), page_size)
+        page = int(query.get('page', 1))
+        results = items[(page - 1) * page_size:page * page_size]
+        return {'count': len(items),
+                'next': self._page_url(query, page + 1) if page * page_size < len(items) else None,
+                'previous': self._page_url(query, page - 1) if page > 1 else None,
+                'results': results}
+
+    def _devices(self, query, body):
+        device_type = query.get('properties___device_type')
+        fields = query.get('fields')
+        if self.mock.reject_filters and (device_type or fields):
+            return 400, {'detail': 'Invalid filter.'}, 'application/json'
+        devices = self.mock.fleet.devices
+        if device_type:
+            devices = [d for d in devices if d['properties']['_device_type'] == device_type]
+        if fields:
+            keys = fields.split(',')
+            devices = [{k: d[k] for k in keys if k in d} for d in devices]
+        return 200, self._listing(query, devices, self.mock.device_page_size), 'application/json'
+
+    def _tokens(self, query, body, device_key):
+        device = self.mock.fleet.find_device(device_key)
+        if device is None:
+            return 404, {'detail': 'Not found.'}, 'application/json'
+        return 200, self._listing(query, self.mock.fleet.tokens[device['id']], self.mock.device_page_size), \
+               'application/json'
+
+    def _variables(self, query, body, device_key):
+        device = self.mock.fleet.find_device(device_key)
+        if device is None:
+            return 404, {'detail': 'Not found.'}, 'application/json'
+        var_list = self.mock.fleet.variables[device['id']]
+        return 200, self._listing(query, var_list, self.mock.device_page_size), 'application/json'
+
+    def _values(self, query, body, variable_id):
+        fleet = self.mock.fleet
+        if variable_id not in fleet.variable_index:
+            return 404, {'detail': 'Not found.'}, 'application/json'
+        page_size = int(query.get('page_size', 50))
+        start = int(query['start']) if 'start' in query else None
+        end = int(query['end']) if 'end' in query else None
+        if query.get('format') == 'csv':
+            # The CSV export returns the most recent page_size values in a single response
+            _, rows = fleet.values(variable_id, start=start, end=end, limit=page_size)
+            label = fleet.variable_labels[variable_id]
+            lines = [f'Timestamp,Human readable date (UTC),{label},Context']
+            for timestamp, value in rows:
+                date = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                lines.append(f'{timestamp},{date},{value},{{}}')
+            return 200, '\n'.join(lines) + '\n', 'text/csv'
+        page_size = min(page_size, self.mock.values_page_size)
+        page = int(query.get('page', 1))
+        count, rows = fleet.values(variable_id, start=start, end=end,
+                                   offset=(page - 1) * page_size, limit=page_size)
+        return 200, {'count': count,
+                     'next': self._page_url(query, page + 1) if page * page_size < count else None,
+                     'previous': self._page_url(query, page - 1) if page > 1 else None,
+                     'results': [{'timestamp': t, 'value': v, 'context': {}} for t, v in rows]}, \
+               'application/json'
+
+    def _write(self, query, body, device_key):
+        if self.mock.write_max_bytes is not None and len(body or b'') > self.mock.write_max_bytes:
+            return 413, {'detail': 'Request entity too large.'}, 'application/json'
+        device = self.mock.fleet.find_device(device_key)
+        if device is None:
+            return 404, {'detail': 'Not found.'}, 'application/json'
+        try:
+            request = json.loads(body or b'{}')
+            dots = {label: [d if isinstance(d, dict) else {'value': d} for d in
+                            (values if isinstance(values, list) else [values])]
+                    for label, values in request.items()}
+            now = int(time.time() * 1000)
+            rows = {label: {int(d.get('timestamp', now)): float(d['value']) for d in values}
+                    for label, values in dots.items()}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {'detail': 'Invalid body.'}, 'application/json'
+        with self.mock._written_lock:
+            variables = self.mock.written.setdefault(device['label'], {})
+            for label, values in rows.items():
+                variables.setdefault(label, {}).update(values)
+        return 200, {label: [{'status_code': 201}] * len(values) for label, values in dots.items()}, \
+               'application/json'
+
+    def _raw_series(self, query, body, *args):
+        fleet = self.mock.fleet
+        try:
+            request = json.loads(body or b'{}')
+            variables = list(request['variables'])
+        except (ValueError, KeyError, TypeError):
+            return 400, {'detail': 'Invalid body.'}, 'application/json'
+        unknown = [v for v in variables if v not in fleet.variable_index]
+        if unknown:
+            return 400, {'detail': f'Unknown variables: {unknown}'}, 'application/json'
+        columns = request.get('columns') or ['timestamp', 'value.value']
+        results = []
+        for variable_id in variables:
+            _, rows = fleet.values(variable_id, start=request.get('start'), end=request.get('end'),
+                                   limit=request.get('limit'))
+            results.append([[t, v, {}][:len(columns)] for t, v in rows])
+        return 200, {'columns': [columns] * len(results), 'results': results}, 'application/json'
+
+    def _resample(self, query, body, *args):
+        fleet = self.mock.fleet
+        try:
+            request = json.loads(body or b'{}')
+            variables = list(request['variables'])
+            aggregation = request.get('aggregation', 'mean')
+            match = re.fullmatch(r'(\d*)([A-Z]+)', str(request.get('period', '1H')).upper())
+            length = int(match.group(1) or 1) * PERIOD_MS[match.group(2).replace('MIN', 'T')]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {'detail': 'Invalid body or unsupported period.'}, 'application/json'
+        if any(v not in fleet.variable_index for v in variables):
+            return 400, {'detail': 'Unknown variables.'}, 'application/json'
+        functions = {'mean': lambda v: sum(v) / len(v), 'min': min, 'max': max, 'sum': sum, 'count': len,
+                     'first': lambda v: v[0], 'last': lambda v: v[-1]}
+        if aggregation not in functions:
+            return 400, {'detail': f'Unknown aggregation {aggregation}.'}, 'application/json'
+        table = {}
+        for i, variable_id in enumerate(variables):
+            _, rows = fleet.values(variable_id, start=request.get('start'), end=request.get('end'))
+            periods = {}
+            for timestamp, value in reversed(rows): # oldest first
+                periods.setdefault(timestamp - timestamp % length, []).append(value)
+            for start, values in periods.items():
+                table.setdefault(start, [None] * len(variables))[i] = functions[aggregation](values)
+        results = [[start] + table[start] for start in sorted(table)]
+        columns = ['timestamp'] + [f'{v}.value' for v in variables]
+        return 200, {'columns': columns, 'results': results}, 'application/json'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--devices', type=int, default=10)
+    parser.add_argument('--variables', type=int, default=15)
+    parser.add_argument('--values', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 5xx responses')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of 429 responses')
+    parser.add_argument('--page-size', type=int, default=DEVICE_PAGE_SIZE, help='page size of the v2.0 listings')
+    args = parser.parse_args()
+
+    fleet = MockFleet(devices=args.devices, variables=args.variables, values=args.values)
+    server = MockUbidotsServer(fleet, host=args.host, port=args.port, latency=args.latency,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                               device_page_size=args.page_size)
+    print(f"Serving {args.devices} mock devices on {server.url} (Ctrl+C to stop)")
+    server.serve_forever()
+    print(server.stats.snapshot())
+
+if __name__ == '__main__':
+    main()